@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+长音频分片转写
+在静音处把WAV切成有上限的分片，并发转写（失败的分片由转写函数自行重试），
+最后按分片起始时间把各段时间戳拼接成完整转写。
+"""
+
+import os
+import re
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+# 加载环境变量
+load_dotenv()
+
+# 分片配置
+ASR_CHUNK_MAX_SECONDS = int(os.getenv('ASR_CHUNK_MAX_SECONDS', 300))   # 单片最长时长
+ASR_CHUNK_MIN_SECONDS = int(os.getenv('ASR_CHUNK_MIN_SECONDS', 60))    # 在此之后才开始找静音点
+ASR_SILENCE_DB = os.getenv('ASR_SILENCE_DB', '-35dB')                  # 静音阈值
+ASR_SILENCE_SECONDS = float(os.getenv('ASR_SILENCE_SECONDS', 0.5))     # 最短静音时长
+ASR_CHUNK_WORKERS = int(os.getenv('ASR_CHUNK_WORKERS', 4))             # 单条录制内的分片并发数
+ASR_CHUNK_RETRIES = int(os.getenv('ASR_CHUNK_RETRIES', 3))             # 单片最大尝试次数（供转写函数的重试策略使用）
+
+_SILENCE_START = re.compile(r"silence_start: (-?[\d.]+)")
+_SILENCE_END = re.compile(r"silence_end: (-?[\d.]+)")
+
+
+def probe_duration(audio_path):
+    """获取音频时长(秒)"""
+    result = subprocess.run([
+        "ffprobe", "-v", "error", "-show_entries", "format=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1", audio_path
+    ], capture_output=True, text=True, check=True)
+    return float(result.stdout.strip())
+
+
+def detect_silences(audio_path):
+    """用ffmpeg silencedetect找出静音区间，返回各静音段中点(秒)列表"""
+    result = subprocess.run([
+        "ffmpeg", "-hide_banner", "-nostats", "-i", audio_path,
+        "-af", f"silencedetect=noise={ASR_SILENCE_DB}:d={ASR_SILENCE_SECONDS}",
+        "-f", "null", "-"
+    ], capture_output=True, text=True)
+
+    points = []
+    start = None
+    for line in result.stderr.splitlines():
+        match = _SILENCE_START.search(line)
+        if match:
+            start = max(0.0, float(match.group(1)))
+            continue
+        match = _SILENCE_END.search(line)
+        if match and start is not None:
+            points.append((start + float(match.group(1))) / 2)
+            start = None
+    return points
+
+
+def plan_chunks(duration, silence_points, max_seconds=None, min_seconds=None):
+    """规划分片边界，返回 [(start, end), ...]
+
+    每片在 [min_seconds, max_seconds] 内取最靠后的静音点切开，
+    找不到静音点时在 max_seconds 处硬切。每片至少 1 秒，配置为0时也保证向前推进。
+    """
+    max_seconds = max(1, max_seconds or ASR_CHUNK_MAX_SECONDS)
+    min_seconds = max(1, min_seconds or ASR_CHUNK_MIN_SECONDS)
+
+    chunks = []
+    start = 0.0
+    while duration - start > max_seconds:
+        candidates = [p for p in silence_points
+                      if p > start and start + min_seconds <= p <= start + max_seconds]
+        end = candidates[-1] if candidates else start + max_seconds
+        chunks.append((start, end))
+        start = end
+    chunks.append((start, duration))
+    return chunks
+
+
+def split_audio(audio_path, chunks):
+    """按分片边界切出WAV文件，返回分片路径列表"""
+    base = os.path.splitext(audio_path)[0]
+    paths = []
+    for index, (start, end) in enumerate(chunks):
+        chunk_path = f"{base}.part{index:03d}.wav"
+        subprocess.run([
+            "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+            "-ss", f"{start:.3f}", "-t", f"{end - start:.3f}",
+            "-i", audio_path, "-c", "copy", chunk_path
+        ], check=True)
+        paths.append(chunk_path)
+    return paths
+
+
+def _transcribe_chunk(transcribe_fn, chunk_path, index):
+    """转写单个分片，失败时记录分片序号后抛出"""
+    try:
+        return transcribe_fn(chunk_path)
+    except Exception as e:
+        print(f"❌ 分片 {index} 转写失败: {e}")
+        raise
+
+
+def stitch_segments(chunks, chunk_results):
+    """把各分片的转写结果按分片起始时间平移后拼接
+
+    chunk_results[i] 为分片 i 的分段列表 [{"start", "end", "text"}]，
+    时间相对分片起点；返回相对整段音频的分段列表。
+    """
+    segments = []
+    for (offset, chunk_end), result in zip(chunks, chunk_results):
+        if not result:
+            continue
+        for seg in result:
+            text = (seg.get("text") or "").strip()
+            if not text:
+                continue
+            segments.append({
+                "start": offset + float(seg.get("start", 0.0)),
+                "end": min(chunk_end, offset + float(seg.get("end", chunk_end - offset))),
+                "text": text
+            })
+    return segments
+
+
+def format_timestamp(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def format_transcript(segments):
+    """分段列表转为带时间戳的文本，每段一行"""
+    return "\n".join(f"[{format_timestamp(seg['start'])}] {seg['text']}" for seg in segments)
+
+
+def transcribe_in_chunks(audio_path, transcribe_fn, workers=None):
+    """分片并发转写整段音频
+
+    transcribe_fn(chunk_path) 返回该分片的分段列表，失败时抛异常（重试由 transcribe_fn 负责）。
+    任一分片失败后整体抛异常；分片文件在结束后删除。
+    """
+    duration = probe_duration(audio_path)
+    silences = detect_silences(audio_path) if duration > ASR_CHUNK_MAX_SECONDS else []
+    chunks = plan_chunks(duration, silences)
+
+    if len(chunks) == 1:
+        return stitch_segments(chunks, [_transcribe_chunk(transcribe_fn, audio_path, 0)])
+
+    paths = split_audio(audio_path, chunks)
+    try:
+        with ThreadPoolExecutor(max_workers=workers or ASR_CHUNK_WORKERS) as executor:
+            futures = [
+                executor.submit(_transcribe_chunk, transcribe_fn, path, index)
+                for index, path in enumerate(paths)
+            ]
+            results = [future.result() for future in futures]
+    finally:
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+    return stitch_segments(chunks, results)
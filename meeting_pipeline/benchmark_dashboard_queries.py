@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+可视化后台查询的执行计划与耗时测试
+- 对 dashboard_queries.py 中的每条查询执行 EXPLAIN QUERY PLAN（SQLite）/ EXPLAIN（MySQL）并计时
+- 明细表（recordings、process_logs、student_stats）出现全表扫描或临时排序即视为回归，退出码为1
+- SQLite 默认生成大规模合成库；同时给出改写前的旧查询（在列上套 DATE()/strftime()）的耗时作对比
+- MySQL 只读取当前配置的库（DB_NAME），不写入数据
+
+用法：
+    python benchmark_dashboard_queries.py --records 500000
+    python benchmark_dashboard_queries.py --backend mysql
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sqlite3
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+from dashboard_queries import LARGE_TABLES, MYSQL_QUERIES, SQLITE_QUERIES
+
+# 改写前的查询，只用于对比耗时（执行计划有问题的标⚠️，不计入回归）
+LEGACY_SQLITE_QUERIES = {
+    'total_records': "SELECT COUNT(*) FROM recordings",
+    'today_records': "SELECT COUNT(*) FROM recordings WHERE DATE(created_at) = DATE('now')",
+    'week_records': "SELECT COUNT(*) FROM recordings WHERE strftime('%Y-%W', created_at) = strftime('%Y-%W', 'now')",
+    'month_records': "SELECT COUNT(*) FROM recordings WHERE strftime('%Y-%m', created_at) = strftime('%Y-%m', 'now')",
+    'phase_stats': "SELECT phase, COUNT(*) FROM recordings GROUP BY phase",
+    'daily_progress': """
+        SELECT DATE(created_at), COUNT(*) FROM recordings
+        WHERE created_at >= datetime('now', '-30 days')
+        GROUP BY DATE(created_at)
+    """,
+}
+
+PHASES = ['简历优化', '项目深挖', '面试模拟', 'Offer后续', '其他']
+
+
+def build_sqlite(path, records, days):
+    """生成合成库：records 条录制均匀分布在最近 days 天，每条一条处理日志，汇总表由明细重建"""
+    from demo_sqlite import create_schema
+
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    create_schema(cursor)
+
+    rng = random.Random(0)
+    now = datetime.now()
+    students = [f"student_{i:05d}" for i in range(max(50, records // 20))]
+
+    def recording_rows():
+        for i in range(records):
+            created = now - timedelta(seconds=rng.randint(0, days * 86400))
+            start = created - timedelta(hours=rng.randint(1, 48))
+            yield (
+                i + 1, f"meeting_{i + 1}", start.strftime('%Y-%m-%d %H:%M:%S'),
+                (start + timedelta(minutes=rng.randint(30, 180))).strftime('%Y-%m-%d %H:%M:%S'),
+                json.dumps(rng.sample(students, rng.randint(1, 3))), rng.choice(PHASES),
+                "转写" * 20, "摘要" * 10, f"https://demo.com/play/{i + 1}", f"https://demo.com/download/{i + 1}",
+                created.strftime('%Y-%m-%d %H:%M:%S')
+            )
+
+    started = time.perf_counter()
+    cursor.executemany('''
+        INSERT INTO recordings
+        (id, meeting_id, start_ts, end_ts, student_ids, phase,
+         transcript, summary, play_url, download_url, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', recording_rows())
+    cursor.execute('''
+        INSERT INTO process_logs (record_id, status, error_message, process_time, created_at)
+        SELECT id, CASE WHEN id % 10 = 0 THEN 'failed' ELSE 'completed' END, NULL, id % 180, created_at
+        FROM recordings
+    ''')
+    cursor.execute('''
+        INSERT INTO daily_phase_stats (day, phase, record_cnt)
+        SELECT DATE(created_at), phase, COUNT(*) FROM recordings GROUP BY DATE(created_at), phase
+    ''')
+    cursor.execute('''
+        INSERT INTO daily_status_stats (day, status, log_cnt)
+        SELECT DATE(created_at), status, COUNT(*) FROM process_logs GROUP BY DATE(created_at), status
+    ''')
+    cursor.execute('''
+        INSERT INTO student_stats (student_id, record_cnt, total_duration, last_record_at)
+        SELECT s.value, COUNT(*),
+               SUM(CAST((julianday(r.end_ts) - julianday(r.start_ts)) * 86400 AS INTEGER)), MAX(r.start_ts)
+        FROM recordings r, json_each(r.student_ids) s
+        GROUP BY s.value
+    ''')
+    conn.commit()
+    cursor.execute("ANALYZE")
+    conn.close()
+    print(f"🧪 合成库 {path}: {records} 条录制，{days} 天，用时 {time.perf_counter() - started:.1f}秒")
+
+
+def time_query(run, repeat):
+    """执行 repeat 次，返回耗时中位数(毫秒)"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def sqlite_plan_problems(sql, plan):
+    """从 EXPLAIN QUERY PLAN 的 detail 中找出明细表的全表扫描和临时排序
+
+    按索引顺序扫描只允许出现在带 LIMIT 的"最近N条"查询中（读到N条即停止）。
+    临时排序归属于它之前最近扫描的表（与 MySQL EXPLAIN 中 filesort 所在的行一致），
+    对子查询结果（如汇总表与明细表 UNION ALL 后）的 GROUP BY 不算明细表的临时排序。
+    """
+    has_limit = re.search(r'\bLIMIT\b', sql, re.I) is not None
+    problems = []
+    last_table = None
+    for detail in plan:
+        match = re.match(r'(SCAN|SEARCH) (\w+)', detail)
+        if match:
+            last_table = match.group(2)
+            if last_table in LARGE_TABLES and match.group(1) == 'SCAN' and not ('USING' in detail and has_limit):
+                problems.append(detail)
+        elif 'TEMP B-TREE' in detail and last_table in LARGE_TABLES:
+            problems.append(detail)
+    return problems
+
+
+def run_sqlite(path, repeat):
+    conn = sqlite3.connect(path)
+    failures = 0
+    print("📋 看板查询（执行计划 / 耗时中位数）:")
+    for name, sql in SQLITE_QUERIES.items():
+        plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+        problems = sqlite_plan_problems(sql, plan)
+        elapsed = time_query(lambda: conn.execute(sql).fetchall(), repeat)
+        mark = "❌" if problems else "✅"
+        print(f"   {mark} {name:<18} {elapsed:8.2f}ms  {' | '.join(plan)}")
+        for problem in problems:
+            print(f"      ↳ 明细表全表扫描/临时排序: {problem}")
+        failures += bool(problems)
+
+    print("🐢 改写前的查询（对比用）:")
+    for name, sql in LEGACY_SQLITE_QUERIES.items():
+        elapsed = time_query(lambda: conn.execute(sql).fetchall(), repeat)
+        plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+        mark = "⚠️" if sqlite_plan_problems(sql, plan) else "  "
+        print(f"   {mark} {name:<18} {elapsed:8.2f}ms  {' | '.join(plan)}")
+    conn.close()
+    return failures
+
+
+def run_mysql(repeat):
+    from db_pool import get_db_manager
+
+    failures = 0
+    print("📋 看板查询（EXPLAIN / 耗时中位数）:")
+    with get_db_manager().connection() as conn:
+        with conn.cursor() as cursor:
+            for name, sql in MYSQL_QUERIES.items():
+                cursor.execute(f"EXPLAIN {sql}")
+                columns = [d[0] for d in cursor.description]
+                plan = [dict(zip(columns, row)) for row in cursor.fetchall()]
+                has_limit = re.search(r'\bLIMIT\b', sql, re.I) is not None
+                problems = [
+                    row for row in plan
+                    if row.get('table') in LARGE_TABLES and (
+                        row.get('type') == 'ALL'
+                        or (row.get('type') == 'index' and not has_limit)
+                        or 'filesort' in (row.get('Extra') or '')
+                    )
+                ]
+
+                def run():
+                    cursor.execute(sql)
+                    cursor.fetchall()
+
+                elapsed = time_query(run, repeat)
+                summary = ' | '.join(
+                    f"{row.get('table')}:{row.get('type')}/{row.get('key')}/{row.get('Extra') or ''}" for row in plan
+                )
+                mark = "❌" if problems else "✅"
+                print(f"   {mark} {name:<18} {elapsed:8.2f}ms  {summary}")
+                failures += bool(problems)
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="可视化后台查询的执行计划与耗时测试")
+    parser.add_argument("--backend", choices=["sqlite", "mysql"], default="sqlite")
+    parser.add_argument("--db", default="/tmp/dashboard_benchmark.db", help="SQLite 合成库路径")
+    parser.add_argument("--records", type=int, default=200000, help="合成录制条数")
+    parser.add_argument("--days", type=int, default=365, help="合成数据覆盖的天数")
+    parser.add_argument("--reuse", action="store_true", help="复用已存在的合成库")
+    parser.add_argument("--repeat", type=int, default=5, help="每条查询执行次数")
+    args = parser.parse_args()
+
+    if args.backend == "mysql":
+        failed = run_mysql(args.repeat)
+    else:
+        if not (args.reuse and os.path.exists(args.db)):
+            build_sqlite(args.db, args.records, args.days)
+        failed = run_sqlite(args.db, args.repeat)
+
+    if failed:
+        print(f"❌ {failed} 条查询出现明细表全表扫描或临时排序")
+        sys.exit(1)
+    print("✅ 所有看板查询均使用索引或汇总表")
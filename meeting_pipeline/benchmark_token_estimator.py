@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地token估算的校准与性能测试
+- 准确度：用 TOKEN_USAGE_LOG 中真实调用的 usage.prompt_tokens 评估当前权重的误差
+- 校准：--fit 时按 8:2 划分训练/验证集拟合权重，验证集误差更小则写入 TOKEN_WEIGHTS_FILE
+- 性能：逐条估算与批量估算的吞吐对比（转写来自 SQLite 演示库或随机生成）
+
+用法：
+    TOKEN_USAGE_LOG=/tmp/token_usage.jsonl python record_worker.py ...   # 先积累真实用量
+    python benchmark_token_estimator.py --fit
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import time
+
+import numpy as np
+
+from token_estimator import (
+    FEATURES, TOKEN_USAGE_LOG, TOKEN_WEIGHTS_FILE,
+    estimate_tokens, estimate_tokens_batch, fit_weights, load_weights, save_weights,
+)
+
+
+def load_usage(path):
+    """读取真实用量记录，返回 (特征矩阵, 真实token数)"""
+    features, actual = [], []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            features.append([row['features'].get(name, 0.0) for name in FEATURES])
+            actual.append(row['prompt_tokens'])
+    return np.array(features, dtype=np.float64), np.array(actual, dtype=np.float64)
+
+
+def error_report(features, actual, weights):
+    """相对误差统计：平均绝对误差、P50/P95、偏差（正值为高估）"""
+    vector = np.array([weights[name] for name in FEATURES])
+    predicted = np.ceil(features @ vector)
+    relative = (predicted - actual) / np.maximum(actual, 1)
+    return {
+        'samples': len(actual),
+        'mape': round(float(np.abs(relative).mean()) * 100, 2),
+        'p50': round(float(np.percentile(np.abs(relative), 50)) * 100, 2),
+        'p95': round(float(np.percentile(np.abs(relative), 95)) * 100, 2),
+        'bias': round(float(relative.mean()) * 100, 2),
+        'underestimated': int((predicted < actual).sum()),
+    }
+
+
+def calibrate(usage_path, fit):
+    features, actual = load_usage(usage_path)
+    if len(actual) == 0:
+        print("❌ 用量记录为空")
+        return
+    weights = load_weights()
+    print(f"📏 当前权重误差(%): {error_report(features, actual, weights)}")
+    if not fit:
+        return
+
+    index = np.random.default_rng(0).permutation(len(actual))
+    split = max(1, int(len(actual) * 0.8))
+    train, test = index[:split], index[split:] if len(actual) > split else index[:split]
+    fitted = fit_weights(features[train], actual[train])
+    before = error_report(features[test], actual[test], weights)
+    after = error_report(features[test], actual[test], fitted)
+    print(f"🧮 拟合权重: {fitted}")
+    print(f"📏 验证集误差(%): 拟合前 {before}")
+    print(f"📏 验证集误差(%): 拟合后 {after}")
+    if after['mape'] < before['mape']:
+        save_weights(fitted)
+        print(f"💾 已写入 {TOKEN_WEIGHTS_FILE}")
+    else:
+        print("⏭️ 拟合后误差未降低，保留当前权重")
+
+
+def sample_texts(count, db_file):
+    """取演示库中的转写，不足时随机生成中英混合文本"""
+    texts = []
+    if db_file and os.path.exists(db_file):
+        conn = sqlite3.connect(db_file)
+        try:
+            rows = conn.execute(
+                "SELECT transcript FROM recordings WHERE transcript IS NOT NULL LIMIT ?", (count,)
+            ).fetchall()
+            texts = [row[0] for row in rows]
+        except sqlite3.Error as e:
+            print(f"⚠️ 读取演示库失败: {e}")
+        finally:
+            conn.close()
+
+    rng = random.Random(0)
+    words = ['简历', '项目', '面试', '算法', '系统设计', 'Offer', 'Java', 'Redis', 'Kafka', 'STAR',
+             '我们', '这个', '然后', '你可以', '数据库', 'LeetCode', '薪资', '反馈', '。', '，', '？']
+    while len(texts) < count:
+        lines = []
+        for second in range(0, 3600, 15):
+            line = ''.join(rng.choice(words) for _ in range(rng.randint(8, 30)))
+            lines.append(f"[{second // 3600:02d}:{second % 3600 // 60:02d}:{second % 60:02d}] {line}")
+        texts.append('\n'.join(lines))
+    return texts[:count]
+
+
+def throughput(count, db_file):
+    texts = sample_texts(count, db_file)
+    chars = sum(len(t) for t in texts)
+    print(f"⏱️ 样本 {len(texts)} 条，共 {chars} 字符")
+
+    started = time.perf_counter()
+    single = [estimate_tokens(t) for t in texts]
+    single_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    batch = estimate_tokens_batch(texts)
+    batch_seconds = time.perf_counter() - started
+
+    assert list(batch) == single, "批量估算与逐条估算结果不一致"
+    print(f"   - 逐条: {single_seconds * 1000:.1f}ms（{chars / single_seconds / 1e6:.1f}M 字符/秒）")
+    print(f"   - 批量: {batch_seconds * 1000:.1f}ms（{chars / batch_seconds / 1e6:.1f}M 字符/秒）")
+    print(f"   - 估算总token数: {int(batch.sum())}，平均每字符 {batch.sum() / chars:.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地token估算的校准与性能测试")
+    parser.add_argument("--usage-log", default=TOKEN_USAGE_LOG, help="真实用量记录（默认读取 TOKEN_USAGE_LOG）")
+    parser.add_argument("--fit", action="store_true", help="拟合权重，验证集误差降低时写入 TOKEN_WEIGHTS_FILE")
+    parser.add_argument("--count", type=int, default=200, help="性能测试的转写条数")
+    parser.add_argument("--db", default="meeting_data.db", help="取转写样本的SQLite演示库")
+    args = parser.parse_args()
+
+    if args.usage_log and os.path.exists(args.usage_log):
+        calibrate(args.usage_log, args.fit)
+    else:
+        print("⚠️ 未找到真实用量记录（设置 TOKEN_USAGE_LOG 后运行处理流程即可积累），跳过校准")
+    throughput(args.count, args.db)
@@ -2,7 +2,8 @@
 # -*- coding: utf-8 -*-
 """
 定时增量处理脚本
-每天凌晨3点运行，处理前一天的会议记录
+基于水位线增量处理，可每小时运行：从上次成功的水位线（减去重叠窗口）处理到当前时间，
+已入库的录制会被跳过
 """
 
 import sys
@@ -5,39 +5,48 @@
 """
 
 import os
-import json
-import sqlite3
-from datetime import datetime, timedelta
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, Response, render_template, jsonify
 from dotenv import load_dotenv
-import pymysql
+import http_client
+from dashboard_queries import MYSQL_QUERIES
+from response_cache import ResponseCache
+from dashboard_stream import VersionWatcher
+from db_pool import get_db_manager
 
 # 加载环境变量
 load_dotenv()
 
 app = Flask(__name__)
 
-# 数据库配置
-DB_CONFIG = {
-    'host': os.getenv("DB_HOST", "127.0.0.1"),
-    'port': int(os.getenv("DB_PORT", "3306")),
-    'user': os.getenv("DB_USER", "meeting"),
-    'password': os.getenv("DB_PASS", "VeryStrongPwd"),
-    'database': os.getenv("DB_NAME", "meeting_db"),
-    'charset': 'utf8mb4'
-}
-
 
 def get_db_connection():
-    """获取数据库连接"""
+    """从共享连接池借出数据库连接，conn.close() 即归还"""
     try:
-        conn = pymysql.connect(**DB_CONFIG)
+        conn = get_db_manager().connect()
         return conn
     except Exception as e:
         print(f"数据库连接失败: {e}")
         return None
 
 
+def read_data_version():
+    """worker 每次提交时加一的数据版本"""
+    conn = get_db_connection()
+    if not conn:
+        return None
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT version FROM data_version WHERE name = 'recordings'")
+            row = cursor.fetchone()
+            return row[0] if row else 0
+    finally:
+        conn.close()
+
+
+# 各接口共用的响应缓存
+response_cache = ResponseCache(read_data_version)
+
+
 @app.route('/')
 def index():
     """主页"""
@@ -45,6 +54,7 @@ def index():
 
 
 @app.route('/api/stats')
+@response_cache.cached_view
 def get_stats():
     """获取统计信息"""
     conn = get_db_connection()
@@ -53,46 +63,22 @@ def get_stats():
     
     try:
         with conn.cursor() as cursor:
-            # 总记录数
-            cursor.execute("SELECT COUNT(*) FROM recordings")
-            total_records = cursor.fetchone()[0]
-            
-            # 今日处理数
-            cursor.execute("SELECT COUNT(*) FROM recordings WHERE DATE(created_at) = CURDATE()")
-            today_records = cursor.fetchone()[0]
-            
-            # 本周处理数
-            cursor.execute("SELECT COUNT(*) FROM recordings WHERE YEARWEEK(created_at) = YEARWEEK(NOW())")
-            week_records = cursor.fetchone()[0]
-            
-            # 本月处理数
-            cursor.execute("SELECT COUNT(*) FROM recordings WHERE YEAR(created_at) = YEAR(NOW()) AND MONTH(created_at) = MONTH(NOW())")
-            month_records = cursor.fetchone()[0]
+            # 总数、今日、本周（周日起，与 YEARWEEK 一致）、本月处理数：读按天汇总表
+            cursor.execute(MYSQL_QUERIES['totals'])
+            total_records, today_records, week_records, month_records = (
+                int(value) for value in cursor.fetchone()
+            )
             
             # 处理状态统计
-            cursor.execute("""
-                SELECT status, COUNT(*) as count 
-                FROM process_logs 
-                WHERE created_at >= DATE_SUB(NOW(), INTERVAL 7 DAY)
-                GROUP BY status
-            """)
-            status_stats = dict(cursor.fetchall())
+            cursor.execute(MYSQL_QUERIES['status_stats'])
+            status_stats = {status: int(count) for status, count in cursor.fetchall()}
             
             # 分类统计
-            cursor.execute("""
-                SELECT phase, COUNT(*) as count 
-                FROM recordings 
-                GROUP BY phase
-            """)
-            phase_stats = dict(cursor.fetchall())
+            cursor.execute(MYSQL_QUERIES['phase_stats'])
+            phase_stats = {phase: int(count) for phase, count in cursor.fetchall()}
             
             # 最近处理记录
-            cursor.execute("""
-                SELECT id, meeting_id, phase, created_at, summary
-                FROM recordings 
-                ORDER BY created_at DESC 
-                LIMIT 10
-            """)
+            cursor.execute(MYSQL_QUERIES['recent_records'])
             recent_records = []
             for row in cursor.fetchall():
                 recent_records.append({
@@ -104,12 +90,7 @@ def get_stats():
                 })
             
             # 学生参与统计
-            cursor.execute("""
-                SELECT student_id, record_cnt, total_duration
-                FROM student_stats 
-                ORDER BY record_cnt DESC 
-                LIMIT 10
-            """)
+            cursor.execute(MYSQL_QUERIES['top_students'])
             student_stats = []
             for row in cursor.fetchall():
                 student_stats.append({
@@ -137,6 +118,7 @@ def get_stats():
 
 
 @app.route('/api/process_logs')
+@response_cache.cached_view
 def get_process_logs():
     """获取处理日志"""
     conn = get_db_connection()
@@ -145,12 +127,7 @@ def get_process_logs():
     
     try:
         with conn.cursor() as cursor:
-            cursor.execute("""
-                SELECT record_id, status, error_message, process_time, created_at
-                FROM process_logs 
-                ORDER BY created_at DESC 
-                LIMIT 50
-            """)
+            cursor.execute(MYSQL_QUERIES['process_logs'])
             logs = []
             for row in cursor.fetchall():
                 logs.append({
@@ -170,6 +147,7 @@ def get_process_logs():
 
 
 @app.route('/api/daily_progress')
+@response_cache.cached_view
 def get_daily_progress():
     """获取每日处理进度"""
     conn = get_db_connection()
@@ -179,18 +157,12 @@ def get_daily_progress():
     try:
         with conn.cursor() as cursor:
             # 获取最近30天的处理数据
-            cursor.execute("""
-                SELECT DATE(created_at) as date, COUNT(*) as count
-                FROM recordings 
-                WHERE created_at >= DATE_SUB(NOW(), INTERVAL 30 DAY)
-                GROUP BY DATE(created_at)
-                ORDER BY date
-            """)
+            cursor.execute(MYSQL_QUERIES['daily_progress'])
             daily_data = []
             for row in cursor.fetchall():
                 daily_data.append({
                     'date': row[0].strftime('%Y-%m-%d'),
-                    'count': row[1]
+                    'count': int(row[1])
                 })
         
         conn.close()
@@ -201,6 +173,70 @@ def get_daily_progress():
         return jsonify({'error': str(e)})
 
 
+@app.route('/api/phase_distribution')
+@response_cache.cached_view
+def get_phase_distribution():
+    """获取会议分类分布"""
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': '数据库连接失败'})
+    
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(MYSQL_QUERIES['phase_stats'])
+            phase_data = [{'phase': row[0], 'count': int(row[1])} for row in cursor.fetchall()]
+        
+        conn.close()
+        return jsonify({'phase_data': phase_data})
+        
+    except Exception as e:
+        conn.close()
+        return jsonify({'error': str(e)})
+
+
+def build_stream_snapshot():
+    """推送快照：统计信息和每日进度（数据版本已变化，先让响应缓存失效）"""
+    response_cache.invalidate()
+    snapshot = {}
+    for section, view, path in (('stats', get_stats, '/api/stats'),
+                                ('daily_progress', get_daily_progress, '/api/daily_progress')):
+        with app.test_request_context(path):
+            payload = view().get_json()
+        if 'error' in payload:
+            raise RuntimeError(payload['error'])
+        snapshot[section] = payload
+    return snapshot
+
+
+# 所有推送连接共用一个数据版本监视线程
+stream_watcher = VersionWatcher(read_data_version, build_stream_snapshot)
+
+
+@app.route('/api/stream')
+def get_stream():
+    """服务端推送：连接时推完整快照，worker 写入新数据后推变化的字段"""
+    return Response(stream_watcher.stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
+@app.route('/api/health')
+def get_health():
+    """健康检查：数据库及外部API连通性（复用共享HTTP连接池）"""
+    conn = get_db_connection()
+    db_ok = conn is not None
+    if conn:
+        conn.close()
+    upstreams = http_client.check_upstreams()
+    healthy = db_ok and all(item['ok'] for item in upstreams.values())
+    return jsonify({
+        'status': 'ok' if healthy else 'degraded',
+        'database': db_ok,
+        'upstreams': upstreams
+    })
+
+
 if __name__ == '__main__':
     # 创建模板目录
     os.makedirs('templates', exist_ok=True)
@@ -378,17 +414,8 @@ if __name__ == '__main__':
                         console.error('Error:', data.error);
                         return;
                     }
-                    
-                    // 更新统计数据
-                    document.getElementById('total-records').textContent = data.total_records;
-                    document.getElementById('today-records').textContent = data.today_records;
-                    document.getElementById('week-records').textContent = data.week_records;
-                    document.getElementById('month-records').textContent = data.month_records;
-                    
-                    // 更新图表
-                    updateStatusChart(data.status_stats);
-                    updatePhaseChart(data.phase_stats);
-                    updateRecentRecords(data.recent_records);
+                    stats = data;
+                    renderStats(data);
                 });
             
             fetch('/api/daily_progress')
@@ -398,10 +425,28 @@ if __name__ == '__main__':
                         console.error('Error:', data.error);
                         return;
                     }
-                    updateDailyChart(data.daily_data);
+                    daily = data;
+                    renderDaily(data);
                 });
         }
         
+        function renderStats(data) {
+            // 更新统计数据
+            document.getElementById('total-records').textContent = data.total_records;
+            document.getElementById('today-records').textContent = data.today_records;
+            document.getElementById('week-records').textContent = data.week_records;
+            document.getElementById('month-records').textContent = data.month_records;
+            
+            // 更新图表
+            updateStatusChart(data.status_stats);
+            updatePhaseChart(data.phase_stats);
+            updateRecentRecords(data.recent_records);
+        }
+        
+        function renderDaily(data) {
+            updateDailyChart(data.daily_data);
+        }
+        
         function updateStatusChart(statusStats) {
             const ctx = document.getElementById('statusChart').getContext('2d');
             
@@ -521,11 +566,49 @@ if __name__ == '__main__':
             });
         }
         
-        // 页面加载时获取数据
-        loadData();
+        // 优先使用服务端推送（有新数据时才更新）；浏览器不支持或连接中断时每30秒轮询
+        let stats = {}, daily = {};
+        let pollTimer = null;
+        
+        function startPolling() {
+            if (!pollTimer) {
+                loadData();
+                pollTimer = setInterval(loadData, 30000);
+            }
+        }
+        
+        function stopPolling() {
+            if (pollTimer) {
+                clearInterval(pollTimer);
+                pollTimer = null;
+            }
+        }
         
-        // 每30秒自动刷新
-        setInterval(loadData, 30000);
+        function applyMessage(message) {
+            if (message.stats) {
+                stats = Object.assign({}, stats, message.stats);
+                renderStats(stats);
+            }
+            if (message.daily_progress) {
+                daily = Object.assign({}, daily, message.daily_progress);
+                renderDaily(daily);
+            }
+        }
+        
+        if (window.EventSource) {
+            const source = new EventSource('/api/stream');
+            source.addEventListener('snapshot', event => {
+                stopPolling();
+                stats = {};
+                daily = {};
+                applyMessage(JSON.parse(event.data));
+            });
+            source.addEventListener('delta', event => applyMessage(JSON.parse(event.data)));
+            // 断线期间 EventSource 自动重连，先轮询兜底，重连后收到 snapshot 即停止
+            source.onerror = startPolling;
+        } else {
+            startPolling();
+        }
     </script>
 </body>
 </html>
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+可视化后台的统计查询（MySQL / SQLite 各一套）
+- 时间条件一律写成列上的半开区间（col >= 起点 AND col < 终点），不在列上套 DATE()/YEARWEEK()/strftime()，
+  否则索引无法使用
+- 总数、今日/本周/本月、分类和状态统计读按天汇总表，代价与天数成正比，与明细表大小无关
+  （状态统计是滚动7×24小时窗口，起点所在那一天不完整的部分按索引读明细，最多一天的日志）
+- 明细表只用于"最近N条"，按 created_at 索引倒序读取
+benchmark_dashboard_queries.py 对这里的每条查询检查执行计划，防止全表扫描再次出现。
+"""
+
+# 明细表：执行计划中不允许出现全表扫描或临时排序
+LARGE_TABLES = ('recordings', 'process_logs', 'student_stats')
+
+MYSQL_QUERIES = {
+    # 总数、今日、本周（周日起，与 YEARWEEK 一致）、本月
+    'totals': """
+        SELECT COALESCE(SUM(record_cnt), 0),
+               COALESCE(SUM(CASE WHEN day >= CURDATE() AND day < CURDATE() + INTERVAL 1 DAY
+                                 THEN record_cnt END), 0),
+               COALESCE(SUM(CASE WHEN day >= CURDATE() - INTERVAL (DAYOFWEEK(CURDATE()) - 1) DAY
+                                  AND day < CURDATE() + INTERVAL 1 DAY
+                                 THEN record_cnt END), 0),
+               COALESCE(SUM(CASE WHEN day >= CURDATE() - INTERVAL (DAYOFMONTH(CURDATE()) - 1) DAY
+                                  AND day < CURDATE() + INTERVAL 1 DAY
+                                 THEN record_cnt END), 0)
+        FROM daily_phase_stats
+    """,
+    # 最近7×24小时：窗口内的整天读汇总表，起点所在那一天的剩余部分按 created_at 索引读明细
+    'status_stats': """
+        SELECT status, SUM(cnt) as count
+        FROM (
+            SELECT status, log_cnt AS cnt
+            FROM daily_status_stats
+            WHERE day > DATE(NOW() - INTERVAL 7 DAY) AND day < CURDATE() + INTERVAL 1 DAY
+            UNION ALL
+            SELECT status, 1
+            FROM process_logs
+            WHERE created_at >= NOW() - INTERVAL 7 DAY
+              AND created_at < DATE(NOW() - INTERVAL 7 DAY) + INTERVAL 1 DAY
+        ) AS last_7_days
+        GROUP BY status
+    """,
+    'phase_stats': """
+        SELECT phase, SUM(record_cnt) as count
+        FROM daily_phase_stats
+        GROUP BY phase
+        HAVING count > 0
+        ORDER BY count DESC
+    """,
+    'recent_records': """
+        SELECT id, meeting_id, phase, created_at, summary
+        FROM recordings
+        ORDER BY created_at DESC
+        LIMIT 10
+    """,
+    'top_students': """
+        SELECT student_id, record_cnt, total_duration
+        FROM student_stats
+        ORDER BY record_cnt DESC
+        LIMIT 10
+    """,
+    'process_logs': """
+        SELECT record_id, status, error_message, process_time, created_at
+        FROM process_logs
+        ORDER BY created_at DESC
+        LIMIT 50
+    """,
+    'daily_progress': """
+        SELECT day as date, SUM(record_cnt) as count
+        FROM daily_phase_stats
+        WHERE day >= CURDATE() - INTERVAL 30 DAY AND day < CURDATE() + INTERVAL 1 DAY
+        GROUP BY day
+        ORDER BY day
+    """,
+}
+
+SQLITE_QUERIES = {
+    # 总数、今日、本周（周一起，与 %W 一致）、本月
+    'totals': """
+        SELECT COALESCE(SUM(record_cnt), 0),
+               COALESCE(SUM(CASE WHEN day >= DATE('now') AND day < DATE('now', '+1 day')
+                                 THEN record_cnt END), 0),
+               COALESCE(SUM(CASE WHEN day >= DATE('now', 'weekday 0', '-6 days') AND day < DATE('now', '+1 day')
+                                 THEN record_cnt END), 0),
+               COALESCE(SUM(CASE WHEN day >= DATE('now', 'start of month') AND day < DATE('now', '+1 day')
+                                 THEN record_cnt END), 0)
+        FROM daily_phase_stats
+    """,
+    # 最近7×24小时：窗口内的整天读汇总表，起点所在那一天的剩余部分按 created_at 索引读明细
+    'status_stats': """
+        SELECT status, SUM(cnt) as count
+        FROM (
+            SELECT status, log_cnt AS cnt
+            FROM daily_status_stats
+            WHERE day > DATE('now', '-7 days') AND day < DATE('now', '+1 day')
+            UNION ALL
+            SELECT status, 1
+            FROM process_logs
+            WHERE created_at >= datetime('now', '-7 days') AND created_at < DATE('now', '-6 days')
+        ) AS last_7_days
+        GROUP BY status
+    """,
+    'phase_stats': """
+        SELECT phase, SUM(record_cnt) as count
+        FROM daily_phase_stats
+        GROUP BY phase
+        HAVING count > 0
+        ORDER BY count DESC
+    """,
+    'recent_records': """
+        SELECT id, meeting_id, phase, created_at, summary
+        FROM recordings
+        ORDER BY created_at DESC
+        LIMIT 10
+    """,
+    'top_students': """
+        SELECT student_id, record_cnt, total_duration
+        FROM student_stats
+        ORDER BY record_cnt DESC
+        LIMIT 10
+    """,
+    'student_activity': """
+        SELECT student_id, record_cnt, total_duration
+        FROM student_stats
+        ORDER BY record_cnt DESC
+        LIMIT 20
+    """,
+    'process_logs': """
+        SELECT record_id, status, error_message, process_time, created_at
+        FROM process_logs
+        ORDER BY created_at DESC
+        LIMIT 50
+    """,
+    'daily_progress': """
+        SELECT day as date, SUM(record_cnt) as count
+        FROM daily_phase_stats
+        WHERE day >= DATE('now', '-30 days') AND day < DATE('now', '+1 day')
+        GROUP BY day
+        ORDER BY day
+    """,
+}
+
+# SQLite 明细表索引（MySQL 的索引定义在 sql/init.sql）
+SQLITE_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_recordings_created_at ON recordings(created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_process_logs_created_at ON process_logs(created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_student_stats_record_cnt ON student_stats(record_cnt)",
+]
@@ -5,11 +5,13 @@
 """
 
 import os
-import json
 import sqlite3
-from datetime import datetime, timedelta
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, Response, render_template, jsonify
 from dotenv import load_dotenv
+import http_client
+from dashboard_queries import SQLITE_INDEXES, SQLITE_QUERIES
+from response_cache import ResponseCache
+from dashboard_stream import VersionWatcher
 
 # 加载环境变量
 load_dotenv()
@@ -31,6 +33,37 @@ def get_db_connection():
         return None
 
 
+def read_data_version():
+    """演示数据写入时加一的数据版本"""
+    conn = get_db_connection()
+    if not conn:
+        return None
+    try:
+        row = conn.execute("SELECT version FROM data_version WHERE name = 'recordings'").fetchone()
+        return row[0] if row else 0
+    finally:
+        conn.close()
+
+
+def ensure_indexes():
+    """为旧版演示库补建明细表索引"""
+    conn = get_db_connection()
+    if not conn:
+        return
+    try:
+        for index_sql in SQLITE_INDEXES:
+            conn.execute(index_sql)
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"⚠️ 创建索引失败: {e}")
+    finally:
+        conn.close()
+
+
+# 各接口共用的响应缓存
+response_cache = ResponseCache(read_data_version)
+
+
 @app.route('/')
 def index():
     """主页"""
@@ -38,6 +71,7 @@ def index():
 
 
 @app.route('/api/stats')
+@response_cache.cached_view
 def get_stats():
     """获取统计信息"""
     conn = get_db_connection()
@@ -47,46 +81,20 @@ def get_stats():
     try:
         cursor = conn.cursor()
         
-        # 总记录数
-        cursor.execute("SELECT COUNT(*) FROM recordings")
-        total_records = cursor.fetchone()[0]
-        
-        # 今日处理数
-        cursor.execute("SELECT COUNT(*) FROM recordings WHERE DATE(created_at) = DATE('now')")
-        today_records = cursor.fetchone()[0]
-        
-        # 本周处理数
-        cursor.execute("SELECT COUNT(*) FROM recordings WHERE strftime('%Y-%W', created_at) = strftime('%Y-%W', 'now')")
-        week_records = cursor.fetchone()[0]
-        
-        # 本月处理数
-        cursor.execute("SELECT COUNT(*) FROM recordings WHERE strftime('%Y-%m', created_at) = strftime('%Y-%m', 'now')")
-        month_records = cursor.fetchone()[0]
+        # 总数、今日、本周（周一起，与 %W 一致）、本月处理数：读按天汇总表
+        cursor.execute(SQLITE_QUERIES['totals'])
+        total_records, today_records, week_records, month_records = cursor.fetchone()
         
         # 处理状态统计
-        cursor.execute("""
-            SELECT status, COUNT(*) as count 
-            FROM process_logs 
-            WHERE created_at >= datetime('now', '-7 days')
-            GROUP BY status
-        """)
+        cursor.execute(SQLITE_QUERIES['status_stats'])
         status_stats = dict(cursor.fetchall())
         
         # 分类统计
-        cursor.execute("""
-            SELECT phase, COUNT(*) as count 
-            FROM recordings 
-            GROUP BY phase
-        """)
+        cursor.execute(SQLITE_QUERIES['phase_stats'])
         phase_stats = dict(cursor.fetchall())
         
         # 最近处理记录
-        cursor.execute("""
-            SELECT id, meeting_id, phase, created_at, summary
-            FROM recordings 
-            ORDER BY created_at DESC 
-            LIMIT 10
-        """)
+        cursor.execute(SQLITE_QUERIES['recent_records'])
         recent_records = []
         for row in cursor.fetchall():
             recent_records.append({
@@ -98,12 +106,7 @@ def get_stats():
             })
         
         # 学生参与统计
-        cursor.execute("""
-            SELECT student_id, record_cnt, total_duration
-            FROM student_stats 
-            ORDER BY record_cnt DESC 
-            LIMIT 10
-        """)
+        cursor.execute(SQLITE_QUERIES['top_students'])
         student_stats = []
         for row in cursor.fetchall():
             student_stats.append({
@@ -131,6 +134,7 @@ def get_stats():
 
 
 @app.route('/api/process_logs')
+@response_cache.cached_view
 def get_process_logs():
     """获取处理日志"""
     conn = get_db_connection()
@@ -139,12 +143,7 @@ def get_process_logs():
     
     try:
         cursor = conn.cursor()
-        cursor.execute("""
-            SELECT record_id, status, error_message, process_time, created_at
-            FROM process_logs 
-            ORDER BY created_at DESC 
-            LIMIT 50
-        """)
+        cursor.execute(SQLITE_QUERIES['process_logs'])
         logs = []
         for row in cursor.fetchall():
             logs.append({
@@ -164,6 +163,7 @@ def get_process_logs():
 
 
 @app.route('/api/daily_progress')
+@response_cache.cached_view
 def get_daily_progress():
     """获取每日处理进度"""
     conn = get_db_connection()
@@ -173,13 +173,7 @@ def get_daily_progress():
     try:
         cursor = conn.cursor()
         # 获取最近30天的处理数据
-        cursor.execute("""
-            SELECT DATE(created_at) as date, COUNT(*) as count
-            FROM recordings 
-            WHERE created_at >= datetime('now', '-30 days')
-            GROUP BY DATE(created_at)
-            ORDER BY date
-        """)
+        cursor.execute(SQLITE_QUERIES['daily_progress'])
         daily_data = []
         for row in cursor.fetchall():
             daily_data.append({
@@ -196,6 +190,7 @@ def get_daily_progress():
 
 
 @app.route('/api/phase_distribution')
+@response_cache.cached_view
 def get_phase_distribution():
     """获取会议分类分布"""
     conn = get_db_connection()
@@ -204,12 +199,7 @@ def get_phase_distribution():
     
     try:
         cursor = conn.cursor()
-        cursor.execute("""
-            SELECT phase, COUNT(*) as count
-            FROM recordings 
-            GROUP BY phase
-            ORDER BY count DESC
-        """)
+        cursor.execute(SQLITE_QUERIES['phase_stats'])
         phase_data = []
         for row in cursor.fetchall():
             phase_data.append({
@@ -226,6 +216,7 @@ def get_phase_distribution():
 
 
 @app.route('/api/student_activity')
+@response_cache.cached_view
 def get_student_activity():
     """获取学生活跃度"""
     conn = get_db_connection()
@@ -234,12 +225,7 @@ def get_student_activity():
     
     try:
         cursor = conn.cursor()
-        cursor.execute("""
-            SELECT student_id, record_cnt, total_duration
-            FROM student_stats 
-            ORDER BY record_cnt DESC 
-            LIMIT 20
-        """)
+        cursor.execute(SQLITE_QUERIES['student_activity'])
         student_data = []
         for row in cursor.fetchall():
             student_data.append({
@@ -256,6 +242,49 @@ def get_student_activity():
         return jsonify({'error': str(e)})
 
 
+def build_stream_snapshot():
+    """推送快照：统计信息和每日进度（数据版本已变化，先让响应缓存失效）"""
+    response_cache.invalidate()
+    snapshot = {}
+    for section, view, path in (('stats', get_stats, '/api/stats'),
+                                ('daily_progress', get_daily_progress, '/api/daily_progress')):
+        with app.test_request_context(path):
+            payload = view().get_json()
+        if 'error' in payload:
+            raise RuntimeError(payload['error'])
+        snapshot[section] = payload
+    return snapshot
+
+
+# 所有推送连接共用一个数据版本监视线程
+stream_watcher = VersionWatcher(read_data_version, build_stream_snapshot)
+
+
+@app.route('/api/stream')
+def get_stream():
+    """服务端推送：连接时推完整快照，worker 写入新数据后推变化的字段"""
+    return Response(stream_watcher.stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
+@app.route('/api/health')
+def get_health():
+    """健康检查：数据库及外部API连通性（复用共享HTTP连接池）"""
+    conn = get_db_connection()
+    db_ok = conn is not None
+    if conn:
+        conn.close()
+    upstreams = http_client.check_upstreams()
+    healthy = db_ok and all(item['ok'] for item in upstreams.values())
+    return jsonify({
+        'status': 'ok' if healthy else 'degraded',
+        'database': db_ok,
+        'upstreams': upstreams
+    })
+
+
 if __name__ == '__main__':
     # 创建模板目录
     os.makedirs('templates', exist_ok=True)
@@ -443,17 +472,8 @@ if __name__ == '__main__':
                         console.error('Error:', data.error);
                         return;
                     }
-                    
-                    // 更新统计数据
-                    document.getElementById('total-records').textContent = data.total_records;
-                    document.getElementById('today-records').textContent = data.today_records;
-                    document.getElementById('week-records').textContent = data.week_records;
-                    document.getElementById('month-records').textContent = data.month_records;
-                    
-                    // 更新图表
-                    updateStatusChart(data.status_stats);
-                    updatePhaseChart(data.phase_stats);
-                    updateRecentRecords(data.recent_records);
+                    stats = data;
+                    renderStats(data);
                 });
             
             fetch('/api/daily_progress')
@@ -463,10 +483,28 @@ if __name__ == '__main__':
                         console.error('Error:', data.error);
                         return;
                     }
-                    updateDailyChart(data.daily_data);
+                    daily = data;
+                    renderDaily(data);
                 });
         }
         
+        function renderStats(data) {
+            // 更新统计数据
+            document.getElementById('total-records').textContent = data.total_records;
+            document.getElementById('today-records').textContent = data.today_records;
+            document.getElementById('week-records').textContent = data.week_records;
+            document.getElementById('month-records').textContent = data.month_records;
+            
+            // 更新图表
+            updateStatusChart(data.status_stats);
+            updatePhaseChart(data.phase_stats);
+            updateRecentRecords(data.recent_records);
+        }
+        
+        function renderDaily(data) {
+            updateDailyChart(data.daily_data);
+        }
+        
         function updateStatusChart(statusStats) {
             const ctx = document.getElementById('statusChart').getContext('2d');
             
@@ -591,11 +629,49 @@ if __name__ == '__main__':
             });
         }
         
-        // 页面加载时获取数据
-        loadData();
+        // 优先使用服务端推送（有新数据时才更新）；浏览器不支持或连接中断时每30秒轮询
+        let stats = {}, daily = {};
+        let pollTimer = null;
+        
+        function startPolling() {
+            if (!pollTimer) {
+                loadData();
+                pollTimer = setInterval(loadData, 30000);
+            }
+        }
+        
+        function stopPolling() {
+            if (pollTimer) {
+                clearInterval(pollTimer);
+                pollTimer = null;
+            }
+        }
         
-        // 每30秒自动刷新
-        setInterval(loadData, 30000);
+        function applyMessage(message) {
+            if (message.stats) {
+                stats = Object.assign({}, stats, message.stats);
+                renderStats(stats);
+            }
+            if (message.daily_progress) {
+                daily = Object.assign({}, daily, message.daily_progress);
+                renderDaily(daily);
+            }
+        }
+        
+        if (window.EventSource) {
+            const source = new EventSource('/api/stream');
+            source.addEventListener('snapshot', event => {
+                stopPolling();
+                stats = {};
+                daily = {};
+                applyMessage(JSON.parse(event.data));
+            });
+            source.addEventListener('delta', event => applyMessage(JSON.parse(event.data)));
+            // 断线期间 EventSource 自动重连，先轮询兜底，重连后收到 snapshot 即停止
+            source.onerror = startPolling;
+        } else {
+            startPolling();
+        }
     </script>
 </body>
 </html>
@@ -605,6 +681,7 @@ if __name__ == '__main__':
     with open('templates/dashboard.html', 'w', encoding='utf-8') as f:
         f.write(html_template)
     
+    ensure_indexes()
     print("🚀 启动可视化后台...")
     print("📊 访问地址: http://localhost:5000")
     print("📈 实时监控会议记录处理进度")
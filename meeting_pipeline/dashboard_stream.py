@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+可视化后台的服务端推送（SSE）
+一个共享的监视线程按 DASHBOARD_STREAM_POLL_INTERVAL 读取数据版本（单行主键查询），
+版本变化（worker 提交了新记录/处理日志）或跨天时重新生成一次快照，只把变化的字段推送给所有连接的页面。
+没有页面连接时监视线程不查询数据库；连接再多，每次变化也只生成一次快照。
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from datetime import date
+
+from dotenv import load_dotenv
+
+# 加载环境变量
+load_dotenv()
+
+DASHBOARD_STREAM_POLL_INTERVAL = float(os.getenv('DASHBOARD_STREAM_POLL_INTERVAL', 1))  # 数据版本查询间隔(秒)
+DASHBOARD_STREAM_HEARTBEAT = float(os.getenv('DASHBOARD_STREAM_HEARTBEAT', 15))          # 无变化时的心跳间隔(秒)
+
+
+def diff_snapshot(old, new):
+    """逐个分区比较两次快照，返回 {分区: {变化的字段: 新值}}"""
+    delta = {}
+    for section, values in new.items():
+        previous = old.get(section) or {}
+        changed = {key: value for key, value in values.items() if previous.get(key) != value}
+        if changed:
+            delta[section] = changed
+    return delta
+
+
+def format_event(event, payload):
+    """SSE 消息格式"""
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+class VersionWatcher:
+    """数据版本监视器
+
+    read_version() 返回当前数据版本；build_snapshot() 返回 {分区: dict} 形式的完整快照。
+    每个连接 subscribe() 得到一个队列，先收到完整快照（snapshot），之后只收到变化（delta）。
+    """
+
+    def __init__(self, read_version, build_snapshot, poll_interval=None, heartbeat=None):
+        self.read_version = read_version
+        self.build_snapshot = build_snapshot
+        self.poll_interval = DASHBOARD_STREAM_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.heartbeat = DASHBOARD_STREAM_HEARTBEAT if heartbeat is None else heartbeat
+        self.pushes = 0
+        self._subscribers = set()
+        self._version = None
+        self._day = None
+        self._snapshot = None
+        self._cond = threading.Condition()
+        self._refresh_lock = threading.RLock()
+        self._thread = None
+
+    def _refresh(self, version):
+        """重新生成快照并把差异推给所有连接；失败时保留原快照，下次重试"""
+        with self._refresh_lock:
+            try:
+                snapshot = self.build_snapshot()
+            except Exception as e:
+                print(f"⚠️ 生成推送快照失败: {e}")
+                return
+            with self._cond:
+                delta = diff_snapshot(self._snapshot or {}, snapshot) if self._snapshot else None
+                self._snapshot = snapshot
+                self._version = version
+                self._day = date.today()
+                # 与 subscribe 在同一把锁内：新连接要么拿到新快照，要么收到这次差异
+                if delta:
+                    self.pushes += 1
+                    for messages in self._subscribers:
+                        messages.put(('delta', delta))
+
+    def subscribe(self):
+        """新连接：返回消息队列，队列中第一条是完整快照"""
+        with self._refresh_lock:
+            if self._snapshot is None:
+                self._refresh(self._read_version())
+
+        messages = queue.Queue()
+        with self._cond:
+            if self._snapshot is not None:
+                messages.put(('snapshot', self._snapshot))
+            self._subscribers.add(messages)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="dashboard-stream", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+        return messages
+
+    def unsubscribe(self, messages):
+        with self._cond:
+            self._subscribers.discard(messages)
+
+    def _read_version(self):
+        try:
+            return self.read_version()
+        except Exception as e:
+            print(f"⚠️ 读取数据版本失败: {e}")
+            return None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                # 没有连接时不查询数据库
+                while not self._subscribers:
+                    self._cond.wait()
+            time.sleep(self.poll_interval)
+
+            version = self._read_version()
+            with self._cond:
+                unchanged = (version is None or version == self._version) and self._day == date.today()
+            if not unchanged:
+                self._refresh(version)
+
+    def stream(self):
+        """SSE 响应体生成器：先推完整快照，之后推变化，空闲时发心跳注释保持连接"""
+        messages = self.subscribe()
+        try:
+            while True:
+                try:
+                    event, payload = messages.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    yield ": ping\n\n"
+                    continue
+                yield format_event(event, payload)
+        finally:
+            self.unsubscribe(messages)
+
+    def stats(self):
+        with self._cond:
+            return {'subscribers': len(self._subscribers), 'version': self._version, 'pushes': self.pushes}
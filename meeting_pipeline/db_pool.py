@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MySQL连接池
+worker、可视化后台和演示脚本共用，避免每次操作都重新 pymysql.connect。
+- 最小/最大连接数，连接用尽时等待
+- 借出前健康检查（ping），超过最长存活时间的连接重建
+- 按线程借出：同一线程嵌套获取得到同一个连接
+- 借出的连接调用 close() 即归还连接池，原有 conn.close() 写法无需修改
+"""
+
+import os
+import threading
+import time
+from collections import deque
+import pymysql
+from dotenv import load_dotenv
+
+# 加载环境变量
+load_dotenv()
+
+# 数据库配置
+DB_CONFIG = {
+    'host': os.getenv('DB_HOST', '127.0.0.1'),
+    'port': int(os.getenv('DB_PORT', 3306)),
+    'user': os.getenv('DB_USER', 'meeting'),
+    'password': os.getenv('DB_PASS', 'VeryStrongPwd'),
+    'database': os.getenv('DB_NAME', 'meeting_db'),
+    'charset': 'utf8mb4'
+}
+
+# 连接池配置
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', 1))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', 10))
+DB_POOL_MAX_LIFETIME = int(os.getenv('DB_POOL_MAX_LIFETIME', 3600))  # 连接最长存活时间(秒)
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))            # 等待空闲连接的超时(秒)
+
+
+class PooledConnection:
+    """借出的连接；close() 归还连接池，其余属性转发给 pymysql 连接"""
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def close(self):
+        self._pool._release(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class DatabaseManager:
+    """pymysql 连接池"""
+
+    def __init__(self, config=None, min_size=None, max_size=None, max_lifetime=None, timeout=None):
+        self.config = config or DB_CONFIG
+        self.min_size = DB_POOL_MIN_SIZE if min_size is None else min_size
+        self.max_size = max(1, max_size or DB_POOL_MAX_SIZE)
+        self.max_lifetime = max_lifetime or DB_POOL_MAX_LIFETIME
+        self.timeout = timeout or DB_POOL_TIMEOUT
+        self._idle = deque()
+        self._size = 0
+        self._cond = threading.Condition()
+        self._local = threading.local()
+
+        try:
+            for _ in range(min(self.min_size, self.max_size)):
+                raw = self._create()
+                with self._cond:
+                    self._size += 1
+                    self._idle.append(raw)
+        except Exception as e:
+            print(f"⚠️ 连接池预建连接失败: {e}")
+
+    def _create(self):
+        raw = pymysql.connect(**self.config, autocommit=False)
+        raw._pool_created_at = time.time()
+        return raw
+
+    def _expired(self, raw):
+        return time.time() - raw._pool_created_at > self.max_lifetime
+
+    def _discard(self, raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def _borrow(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            raw = None
+            create = False
+            with self._cond:
+                while raw is None and not create:
+                    if self._idle:
+                        raw = self._idle.pop()
+                    elif self._size < self.max_size:
+                        self._size += 1
+                        create = True
+                    else:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise TimeoutError(f"等待数据库连接超时（连接池上限 {self.max_size}）")
+                        self._cond.wait(remaining)
+
+            if create:
+                try:
+                    return self._create()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+
+            # 借出前检查：过期或已断开的连接丢弃后重新获取
+            if self._expired(raw):
+                self._discard(raw)
+                continue
+            try:
+                raw.ping(reconnect=False)
+                return raw
+            except Exception:
+                self._discard(raw)
+
+    def connect(self):
+        """借出连接；同一线程未归还前再次调用返回同一连接"""
+        local = self._local
+        if getattr(local, 'conn', None) is not None:
+            local.depth += 1
+            return local.conn
+        local.conn = PooledConnection(self, self._borrow())
+        local.depth = 1
+        return local.conn
+
+    # 与 with 语句配合使用：with db.connection() as conn: ...
+    connection = connect
+
+    def _release(self, pooled):
+        local = self._local
+        if getattr(local, 'conn', None) is not pooled:
+            return
+        local.depth -= 1
+        if local.depth > 0:
+            return
+        local.conn = None
+
+        raw = pooled._raw
+        try:
+            # 结束未提交的事务，下次借出时读到最新数据
+            raw.rollback()
+        except Exception:
+            self._discard(raw)
+            return
+        if self._expired(raw):
+            self._discard(raw)
+            return
+        with self._cond:
+            self._idle.append(raw)
+            self._cond.notify()
+
+    def close_all(self):
+        """关闭所有空闲连接"""
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+        for raw in idle:
+            try:
+                raw.close()
+            except Exception:
+                pass
+
+    def stats(self):
+        with self._cond:
+            return {'size': self._size, 'idle': len(self._idle), 'max_size': self.max_size}
+
+
+_default_manager = None
+_default_lock = threading.Lock()
+
+
+def get_db_manager():
+    """进程内共享的默认连接池"""
+    global _default_manager
+    with _default_lock:
+        if _default_manager is None:
+            _default_manager = DatabaseManager()
+        return _default_manager
@@ -6,12 +6,11 @@
 """
 
 import os
-import time
-import json
 import random
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
-import pymysql
+from db_pool import get_db_manager
+from record_worker import write_records
 from loguru import logger
 
 # 加载环境变量
@@ -20,16 +19,6 @@ load_dotenv()
 # 配置日志
 logger.add("logs/demo_processing.log", rotation="1 day", retention="7 days", level="INFO")
 
-# 数据库配置
-DB_CONFIG = {
-    'host': os.getenv("DB_HOST"),
-    'port': int(os.getenv("DB_PORT", 3306)),
-    'user': os.getenv("DB_USER"),
-    'password': os.getenv("DB_PASS"),
-    'database': os.getenv("DB_NAME"),
-    'charset': 'utf8mb4'
-}
-
 # Kimi API配置
 KIMI_API_KEY = os.getenv("KIMI_API_KEY")
 KIMI_BASE_URL = os.getenv("KIMI_BASE_URL", "https://kimi.moonshot.cn/api")
@@ -103,17 +92,16 @@ def generate_mock_meetings(count=10):
         participants.extend(random.sample(teacher_ids, random.randint(1, 2)))
         
         meeting = {
-            "id": f"mock_record_{1000000 + i}",
+            "id": 1000000 + i,
             "meeting_id": f"meeting_{1000000 + i}",
-            "start_ts": meeting_start.strftime("%Y-%m-%d %H:%M:%S"),
-            "end_ts": meeting_end.strftime("%Y-%m-%d %H:%M:%S"),
+            "start_ts": meeting_start,
+            "end_ts": meeting_end,
             "student_ids": participants,
             "phase": template["phase"],
             "transcript": template["transcript"],
             "summary": template["summary"],
             "play_url": f"https://demo.com/play/{1000000 + i}",
-            "download_url": f"https://demo.com/download/{1000000 + i}",
-            "status": "completed"
+            "download_url": f"https://demo.com/download/{1000000 + i}"
         }
         
         meetings.append(meeting)
@@ -121,47 +109,18 @@ def generate_mock_meetings(count=10):
     return meetings
 
 def save_to_database(meetings):
-    """保存会议数据到数据库"""
+    """保存会议数据到数据库
+
+    与 worker 共用 write_records：录制记录、学生统计、按天汇总表、处理日志和数据版本在同一事务内写入，
+    看板统计与明细保持一致。学生统计只计学生，教师ID不写入 student_ids。
+    """
+    records = [
+        dict(meeting, student_ids=[sid for sid in meeting['student_ids'] if not sid.startswith('teacher_')])
+        for meeting in meetings
+    ]
     try:
-        conn = pymysql.connect(**DB_CONFIG, autocommit=True)
-        
-        with conn.cursor() as cursor:
-            for meeting in meetings:
-                # 插入会议记录
-                insert_sql = """
-                INSERT IGNORE INTO recordings 
-                (id, meeting_id, start_ts, end_ts, student_ids, phase, transcript, summary, 
-                 play_url, download_url, status)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """
-                
-                cursor.execute(insert_sql, (
-                    meeting['id'],
-                    meeting['meeting_id'],
-                    meeting['start_ts'],
-                    meeting['end_ts'],
-                    json.dumps(meeting['student_ids'], ensure_ascii=False),
-                    meeting['phase'],
-                    meeting['transcript'],
-                    meeting['summary'],
-                    meeting['play_url'],
-                    meeting['download_url'],
-                    meeting['status']
-                ))
-                
-                # 更新学生统计
-                for student_id in meeting['student_ids']:
-                    if not student_id.startswith('teacher_'):
-                        update_sql = """
-                        INSERT INTO student_stats (student_id, record_cnt, last_record_at)
-                        VALUES (%s, 1, %s)
-                        ON DUPLICATE KEY UPDATE 
-                        record_cnt = record_cnt + 1,
-                        last_record_at = VALUES(last_record_at)
-                        """
-                        cursor.execute(update_sql, (student_id, meeting['start_ts']))
-        
-        conn.close()
+        with get_db_manager().connection() as conn:
+            write_records(conn, records)
         logger.info(f"成功保存 {len(meetings)} 条会议记录到数据库")
         
     except Exception as e:
@@ -207,7 +166,7 @@ def main():
     
     # 测试数据库连接
     try:
-        conn = pymysql.connect(**DB_CONFIG)
+        conn = get_db_manager().connect()
         conn.close()
         logger.info("✅ 数据库连接成功")
     except Exception as e:
@@ -13,6 +13,7 @@ import sqlite3
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from loguru import logger
+from dashboard_queries import SQLITE_INDEXES
 
 # 加载环境变量
 load_dotenv()
@@ -28,54 +29,94 @@ PHASES = ['简历优化', '项目深挖', '面试模拟', 'Offer后续', '其他
 STUDENT_IDS = [f"student_{i:03d}" for i in range(1, 51)]
 TEACHER_IDS = [f"teacher_{i:02d}" for i in range(1, 11)]
 
+def create_schema(cursor):
+    """创建演示库的表和索引（已存在则跳过）"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS recordings (
+            id INTEGER PRIMARY KEY,
+            meeting_id TEXT NOT NULL,
+            start_ts DATETIME NOT NULL,
+            end_ts DATETIME NOT NULL,
+            student_ids TEXT,
+            phase TEXT DEFAULT '其他',
+            transcript TEXT,
+            summary TEXT,
+            play_url TEXT,
+            download_url TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS student_stats (
+            student_id TEXT PRIMARY KEY,
+            record_cnt INTEGER DEFAULT 0,
+            total_duration INTEGER DEFAULT 0,
+            last_record_at DATETIME,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS process_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            record_id INTEGER,
+            status TEXT DEFAULT 'pending',
+            error_message TEXT,
+            process_time INTEGER,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # 汇总表：按天×分类、按天×状态（与明细在同一事务内更新，看板直接读取）
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS daily_phase_stats (
+            day TEXT NOT NULL,
+            phase TEXT NOT NULL,
+            record_cnt INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, phase)
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS daily_status_stats (
+            day TEXT NOT NULL,
+            status TEXT NOT NULL,
+            log_cnt INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, status)
+        )
+    ''')
+    
+    # 明细表索引（看板按 created_at 倒序读取最近记录）
+    for index_sql in SQLITE_INDEXES:
+        cursor.execute(index_sql)
+    
+    # 数据版本：每次写入加一，可视化后台据此让响应缓存失效
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS data_version (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+
 def init_sqlite_database():
     """初始化SQLite数据库"""
     try:
         conn = sqlite3.connect(DB_FILE)
         cursor = conn.cursor()
         
-        # 创建表
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS recordings (
-                id INTEGER PRIMARY KEY,
-                meeting_id TEXT NOT NULL,
-                start_ts DATETIME NOT NULL,
-                end_ts DATETIME NOT NULL,
-                student_ids TEXT,
-                phase TEXT DEFAULT '其他',
-                transcript TEXT,
-                summary TEXT,
-                play_url TEXT,
-                download_url TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS student_stats (
-                student_id TEXT PRIMARY KEY,
-                record_cnt INTEGER DEFAULT 0,
-                total_duration INTEGER DEFAULT 0,
-                last_record_at DATETIME,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS process_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                record_id INTEGER,
-                status TEXT DEFAULT 'pending',
-                error_message TEXT,
-                process_time INTEGER,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
+        create_schema(cursor)
         
         # 清空现有数据
         cursor.execute("DELETE FROM recordings")
         cursor.execute("DELETE FROM student_stats")
         cursor.execute("DELETE FROM process_logs")
+        cursor.execute("DELETE FROM daily_phase_stats")
+        cursor.execute("DELETE FROM daily_status_stats")
+        cursor.execute('''
+            INSERT INTO data_version(name, version) VALUES('recordings', 1)
+            ON CONFLICT(name) DO UPDATE SET version = version + 1
+        ''')
         
         conn.commit()
         conn.close()
@@ -158,15 +199,26 @@ def save_records(records):
                 record['download_url'], record['created_at']
             ))
             
+            # 按天分类汇总
+            cursor.execute('''
+                INSERT INTO daily_phase_stats(day, phase, record_cnt)
+                VALUES(?, ?, 1)
+                ON CONFLICT(day, phase) DO UPDATE SET
+                record_cnt = record_cnt + 1
+            ''', (record['created_at'].date().isoformat(), record['phase']))
+            
             # 更新学生统计
             student_ids = json.loads(record['student_ids'])
+            duration = int((record['end_ts'] - record['start_ts']).total_seconds())
             for student_id in student_ids:
                 cursor.execute('''
-                    INSERT INTO student_stats(student_id, record_cnt)
-                    VALUES(?, 1) 
+                    INSERT INTO student_stats(student_id, record_cnt, total_duration, last_record_at)
+                    VALUES(?, 1, ?, ?) 
                     ON CONFLICT(student_id) DO UPDATE SET 
-                    record_cnt = record_cnt + 1
-                ''', (student_id,))
+                    record_cnt = record_cnt + 1,
+                    total_duration = total_duration + excluded.total_duration,
+                    last_record_at = MAX(COALESCE(last_record_at, excluded.last_record_at), excluded.last_record_at)
+                ''', (student_id, duration, record['start_ts']))
             
             # 记录处理日志
             process_time = random.randint(30, 180)  # 30-180秒
@@ -178,7 +230,19 @@ def save_records(records):
                 (record_id, status, error_message, process_time)
                 VALUES (?, ?, ?, ?)
             ''', (record['id'], status, error_msg, process_time))
+            
+            # 按天状态汇总（日期与 process_logs.created_at 的默认值一致）
+            cursor.execute('''
+                INSERT INTO daily_status_stats(day, status, log_cnt)
+                VALUES(DATE('now'), ?, 1)
+                ON CONFLICT(day, status) DO UPDATE SET
+                log_cnt = log_cnt + 1
+            ''', (status,))
         
+        cursor.execute('''
+            INSERT INTO data_version(name, version) VALUES('recordings', 1)
+            ON CONFLICT(name) DO UPDATE SET version = version + 1
+        ''')
         conn.commit()
         conn.close()
         logger.info(f"成功保存 {len(records)} 条记录")
@@ -230,28 +294,22 @@ def get_statistics():
         conn = sqlite3.connect(DB_FILE)
         cursor = conn.cursor()
         
-        # 总记录数
-        cursor.execute("SELECT COUNT(*) FROM recordings")
-        total_records = cursor.fetchone()[0]
-        
-        # 今日处理数
-        cursor.execute("SELECT COUNT(*) FROM recordings WHERE DATE(created_at) = DATE('now')")
-        today_records = cursor.fetchone()[0]
-        
-        # 本周处理数
-        cursor.execute("SELECT COUNT(*) FROM recordings WHERE strftime('%Y-%W', created_at) = strftime('%Y-%W', 'now')")
-        week_records = cursor.fetchone()[0]
-        
-        # 本月处理数
-        cursor.execute("SELECT COUNT(*) FROM recordings WHERE strftime('%Y-%m', created_at) = strftime('%Y-%m', 'now')")
-        month_records = cursor.fetchone()[0]
+        # 总数、今日、本周（周一起）、本月处理数：读按天汇总表
+        cursor.execute('''
+            SELECT COALESCE(SUM(record_cnt), 0),
+                   COALESCE(SUM(CASE WHEN day = DATE('now') THEN record_cnt END), 0),
+                   COALESCE(SUM(CASE WHEN day >= DATE('now', 'weekday 0', '-6 days') THEN record_cnt END), 0),
+                   COALESCE(SUM(CASE WHEN day >= DATE('now', 'start of month') THEN record_cnt END), 0)
+            FROM daily_phase_stats
+        ''')
+        total_records, today_records, week_records, month_records = cursor.fetchone()
         
         # 分类统计
-        cursor.execute("SELECT phase, COUNT(*) FROM recordings GROUP BY phase")
+        cursor.execute("SELECT phase, SUM(record_cnt) FROM daily_phase_stats GROUP BY phase")
         phase_stats = dict(cursor.fetchall())
         
         # 处理状态统计
-        cursor.execute("SELECT status, COUNT(*) FROM process_logs GROUP BY status")
+        cursor.execute("SELECT status, SUM(log_cnt) FROM daily_status_stats GROUP BY status")
         status_stats = dict(cursor.fetchall())
         
         conn.close()
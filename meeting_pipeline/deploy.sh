@@ -175,10 +175,10 @@ EOF
     
     chmod +x /tmp/meeting_cron.sh
     
-    # 添加到crontab（每天凌晨3点执行）
-    (crontab -l 2>/dev/null; echo "0 3 * * * /tmp/meeting_cron.sh") | crontab -
+    # 添加到crontab（每小时执行，基于水位线增量处理；flock 防止上一轮未结束时重复启动）
+    (crontab -l 2>/dev/null; echo "0 * * * * flock -n /tmp/meeting_cron.lock /tmp/meeting_cron.sh") | crontab -
     
-    log_success "定时任务配置完成（每天凌晨3点执行）"
+    log_success "定时任务配置完成（每小时执行）"
 }
 
 # 测试API连接
@@ -238,7 +238,7 @@ main() {
     log_info "使用说明："
     log_info "1. 手动测试: python3 record_worker.py <start_timestamp> <end_timestamp>"
     log_info "2. 查看日志: tail -f logs/record_worker.log"
-    log_info "3. 定时任务: 每天凌晨3点自动执行"
+    log_info "3. 定时任务: 每小时自动增量执行"
     log_info "4. 监控状态: tail -f logs/cron_incremental.log"
 }
 
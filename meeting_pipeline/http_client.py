@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享HTTP连接池
+按目标主机复用连接（腾讯会议API、Kimi API），避免每次请求重新建立TCP+TLS连接。
+每个主机一个线程安全的连接池（HTTPAdapter），每个线程一个 Session 挂载这些连接池。
+"""
+
+import os
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from dotenv import load_dotenv
+
+# 加载环境变量
+load_dotenv()
+
+# 连接池配置
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 16))          # 每个主机的最大连接数
+HTTP_POOL_BLOCK = os.getenv('HTTP_POOL_BLOCK', 'true').lower() == 'true'  # 连接用尽时等待而不是新建
+HTTP_KEEPALIVE = os.getenv('HTTP_KEEPALIVE', 'true').lower() == 'true'
+HTTP_KEEPALIVE_IDLE = int(os.getenv('HTTP_KEEPALIVE_IDLE', 60))          # 空闲多久后开始发 keepalive 探测(秒)
+HTTP_KEEPALIVE_INTERVAL = int(os.getenv('HTTP_KEEPALIVE_INTERVAL', 10))  # 未收到应答时的探测间隔(秒)
+HTTP_KEEPALIVE_COUNT = int(os.getenv('HTTP_KEEPALIVE_COUNT', 3))         # 连续多少次探测无应答后断开
+
+# 健康检查目标
+HEALTH_CHECK_TARGETS = {
+    'tencent_meeting': os.getenv('TQM_API_BASE', 'https://api.meeting.qq.com'),
+    'kimi': os.getenv('KIMI_API_URL', 'https://api.moonshot.cn/v1'),
+}
+
+_adapters = {}
+_adapters_lock = threading.Lock()
+_local = threading.local()
+
+
+class KeepAliveAdapter(HTTPAdapter):
+    """开启TCP keepalive的连接池适配器"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        if HTTP_KEEPALIVE:
+            options = list(HTTPConnection.default_socket_options)
+            options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+            # 空闲 IDLE 秒后开始探测，每 INTERVAL 秒一次，COUNT 次无应答即断开（约 IDLE + INTERVAL*COUNT 秒发现死连接）
+            if hasattr(socket, 'TCP_KEEPIDLE'):
+                options.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, HTTP_KEEPALIVE_IDLE))
+            if hasattr(socket, 'TCP_KEEPINTVL'):
+                options.append((socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, HTTP_KEEPALIVE_INTERVAL))
+            if hasattr(socket, 'TCP_KEEPCNT'):
+                options.append((socket.IPPROTO_TCP, socket.TCP_KEEPCNT, HTTP_KEEPALIVE_COUNT))
+            kwargs['socket_options'] = options
+        super().init_poolmanager(*args, **kwargs)
+
+
+def _origin(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}/"
+
+
+def _get_adapter(origin):
+    """获取主机对应的共享连接池（所有线程共用）"""
+    with _adapters_lock:
+        adapter = _adapters.get(origin)
+        if adapter is None:
+            adapter = KeepAliveAdapter(
+                pool_connections=1,
+                pool_maxsize=HTTP_POOL_SIZE,
+                pool_block=HTTP_POOL_BLOCK
+            )
+            _adapters[origin] = adapter
+        return adapter
+
+
+def get_session(url):
+    """获取当前线程用于访问 url 所在主机的 Session"""
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        if not HTTP_KEEPALIVE:
+            session.headers['Connection'] = 'close'
+        _local.session = session
+        _local.mounted = set()
+
+    origin = _origin(url)
+    if origin not in _local.mounted:
+        session.mount(origin, _get_adapter(origin))
+        _local.mounted.add(origin)
+    return session
+
+
+def request(method, url, **kwargs):
+    """通过共享连接池发送请求"""
+    return get_session(url).request(method, url, **kwargs)
+
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
+
+
+def close_all():
+    """关闭所有连接池（进程退出前调用）"""
+    with _adapters_lock:
+        for adapter in _adapters.values():
+            adapter.close()
+        _adapters.clear()
+
+
+def check_upstreams(timeout=5):
+    """检查外部API连通性，返回 {名称: {"ok": bool, "latency_ms": int, ...}}"""
+    results = {}
+    for name, base_url in HEALTH_CHECK_TARGETS.items():
+        started = time.time()
+        try:
+            if name == 'kimi':
+                headers = {"Authorization": f"Bearer {os.getenv('KIMI_API_KEY', '')}"}
+                response = get(f"{base_url.rstrip('/')}/models", headers=headers, timeout=timeout)
+                ok = response.status_code == 200
+            else:
+                # 腾讯会议根路径无业务接口，能收到非5xx响应即视为可达
+                response = get(base_url, timeout=timeout)
+                ok = response.status_code < 500
+            results[name] = {
+                'ok': ok,
+                'status_code': response.status_code,
+                'latency_ms': int((time.time() - started) * 1000)
+            }
+        except Exception as e:
+            results[name] = {'ok': False, 'error': str(e)}
+    return results
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+持久化录制任务队列
+每条录制一行任务，按状态机推进：
+    listed → address_resolved → downloaded → transcribed → summarized → stored
+任一阶段失败记为 failed（记录尝试次数和失败前所处状态），按指数退避等待后重试，从该状态继续。
+工作线程通过租约领取任务；进程崩溃后，同一主机重启时立即收回已退出进程的租约，
+其他主机上的租约到期后可被重新领取；
+列表的时间范围和是否已列完也落库，重启后沿用首次运行的结束时间。
+"""
+
+import json
+import os
+import socket
+from dotenv import load_dotenv
+
+# 加载环境变量
+load_dotenv()
+
+# 队列配置
+JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', 3600))   # 领取后的租约时长
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 3))        # 失败任务的最大尝试次数
+JOB_CLAIM_RETRY_DELAY = float(os.getenv('JOB_CLAIM_RETRY_DELAY', 0.5))  # 候选任务都被他人锁住时的重试间隔(秒)
+JOB_RETRY_BASE_DELAY = int(os.getenv('JOB_RETRY_BASE_DELAY', 30))       # 失败任务首次重试前的等待(秒)，之后每次翻倍
+JOB_RETRY_MAX_DELAY = int(os.getenv('JOB_RETRY_MAX_DELAY', 600))        # 失败任务重试等待上限(秒)
+
+# 状态机顺序
+JOB_STATES = ['listed', 'address_resolved', 'downloaded', 'transcribed', 'summarized', 'stored']
+JOB_FAILED = 'failed'
+
+_CREATE_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS record_jobs (
+        record_id BIGINT PRIMARY KEY COMMENT '会议录制ID',
+        record_info JSON NOT NULL COMMENT '列表接口返回的原始记录',
+        state ENUM('listed','address_resolved','downloaded','transcribed','summarized','stored','failed')
+            NOT NULL DEFAULT 'listed' COMMENT '任务状态',
+        resume_state VARCHAR(32) COMMENT '失败前所处状态，重试时从此继续',
+        payload JSON COMMENT '各阶段产出（下载地址、音频路径、转写、摘要等）',
+        attempts INT NOT NULL DEFAULT 0 COMMENT '失败次数',
+        last_error TEXT COMMENT '最近一次错误',
+        not_before DATETIME COMMENT '失败后最早可重试的时间',
+        claimed_by VARCHAR(64) COMMENT '领取者',
+        claimed_until DATETIME COMMENT '租约到期时间',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        INDEX idx_state_claim (state, claimed_until),
+        INDEX idx_state_record (state, record_id)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS listing_cursors (
+        range_key VARCHAR(64) PRIMARY KEY COMMENT '列表任务标识（默认为 start-end）',
+        start_time BIGINT NOT NULL COMMENT '开始时间戳',
+        end_time BIGINT NOT NULL COMMENT '结束时间戳（首次运行时确定，重启沿用）',
+        done TINYINT NOT NULL DEFAULT 0 COMMENT '是否已列完',
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+    """,
+]
+
+# 已有表补建的列：(表, 列名, ALTER 语句)
+_ENSURE_COLUMNS = [
+    ('record_jobs', 'not_before',
+     "ALTER TABLE record_jobs ADD COLUMN not_before DATETIME COMMENT '失败后最早可重试的时间' AFTER last_error"),
+]
+
+# 已有表补建的索引：(表, 索引名, ALTER 语句)
+_ENSURE_INDEXES = [
+    ('record_jobs', 'idx_state_record',
+     "ALTER TABLE record_jobs ADD INDEX idx_state_record (state, record_id)"),
+]
+
+# 领取顺序：越接近完成的状态越先领取，同一状态内按 record_id
+_CLAIM_STATES = list(reversed(JOB_STATES[:-1]))
+
+_CLAIM_SQL = """
+    SELECT record_id, record_info, state, resume_state, payload, attempts
+    FROM record_jobs
+    WHERE state = %s
+      AND (claimed_until IS NULL OR claimed_until < NOW())
+    ORDER BY record_id
+    LIMIT %s
+    FOR UPDATE SKIP LOCKED
+"""
+
+_CLAIM_FAILED_SQL = """
+    SELECT record_id, record_info, state, resume_state, payload, attempts
+    FROM record_jobs
+    WHERE state = 'failed' AND attempts < %s
+      AND (not_before IS NULL OR not_before <= NOW())
+      AND (claimed_until IS NULL OR claimed_until < NOW())
+    ORDER BY record_id
+    LIMIT %s
+    FOR UPDATE SKIP LOCKED
+"""
+
+
+def default_worker_id(suffix=""):
+    """主机名+进程号(+线程后缀)作为领取者标识"""
+    return f"{socket.gethostname()}:{os.getpid()}{suffix}"[:64]
+
+
+def _pid_alive(pid):
+    """本机进程是否仍在运行"""
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # 进程存在，只是属于其他用户
+        return True
+    return True
+
+
+class JobQueue:
+    """record_jobs / listing_cursors 两张表上的任务队列，连接从 DatabaseManager 借出"""
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self._execute_script(_CREATE_TABLES)
+        self._ensure_columns()
+        self._ensure_indexes()
+
+    def _connect(self):
+        return self.db_manager.connect()
+
+    def _execute_script(self, statements):
+        conn = self._connect()
+        try:
+            with conn.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _ensure_columns(self):
+        """已有库升级：补建缺少的列"""
+        for table, column, alter_sql in _ENSURE_COLUMNS:
+            rows = self._execute("""
+                SELECT COUNT(*) FROM information_schema.COLUMNS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+            """, (table, column))
+            if not rows[0][0]:
+                print(f"🔧 补建列 {table}.{column}")
+                self._execute(alter_sql)
+
+    def _ensure_indexes(self):
+        """已有库升级：补建缺少的索引"""
+        for table, index, alter_sql in _ENSURE_INDEXES:
+            rows = self._execute("""
+                SELECT COUNT(*) FROM information_schema.STATISTICS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+            """, (table, index))
+            if not rows[0][0]:
+                print(f"🔧 补建索引 {table}.{index}")
+                self._execute(alter_sql)
+
+    def _execute(self, sql, args=None):
+        conn = self._connect()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(sql, args)
+                rows = cursor.fetchall()
+            conn.commit()
+            return rows
+        finally:
+            conn.close()
+
+    # ---- 列表进度 ----
+
+    def get_cursor(self, range_key):
+        """返回 {"start_time", "end_time", "done"}，不存在返回None"""
+        rows = self._execute(
+            "SELECT start_time, end_time, done FROM listing_cursors WHERE range_key = %s",
+            (range_key,)
+        )
+        if not rows:
+            return None
+        start_time, end_time, done = rows[0]
+        return {"start_time": start_time, "end_time": end_time, "done": bool(done)}
+
+    def save_cursor(self, range_key, start_time, end_time, done=False):
+        """记录列表任务的时间范围（首次写入后不再改变）和是否已列完"""
+        self._execute("""
+            INSERT INTO listing_cursors (range_key, start_time, end_time, done)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE done = VALUES(done)
+        """, (range_key, start_time, end_time, int(done)))
+
+    # ---- 任务 ----
+
+    def enqueue(self, records, reset=False):
+        """登记列出的录制；已存在的任务保持原状态，reset 时重置为 listed 重新处理"""
+        if not records:
+            return
+        if reset:
+            sql = """
+                INSERT INTO record_jobs (record_id, record_info) VALUES (%s, %s)
+                ON DUPLICATE KEY UPDATE record_info = VALUES(record_info), state = 'listed',
+                    resume_state = NULL, payload = NULL, attempts = 0, last_error = NULL, not_before = NULL
+            """
+        else:
+            sql = "INSERT IGNORE INTO record_jobs (record_id, record_info) VALUES (%s, %s)"
+        conn = self._connect()
+        try:
+            with conn.cursor() as cursor:
+                cursor.executemany(
+                    sql, [(r["meeting_record_id"], json.dumps(r, ensure_ascii=False)) for r in records]
+                )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def claim(self, worker_id, limit=1, lease_seconds=None):
+        """领取可处理的任务（未完成且租约空闲，失败次数未超限）
+
+        每个状态单独查询，按 (state, record_id) 索引顺序读取，SKIP LOCKED 只锁住实际领取的行，
+        并发领取者各自拿到不同的任务；未完成的任务领完后才领取失败重试的任务。
+        返回 [{"record_id", "record_info", "state", "payload", "attempts"}]，
+        failed 任务的 state 已还原为失败前的状态。
+        """
+        lease_seconds = lease_seconds or JOB_LEASE_SECONDS
+        rows = []
+        conn = self._connect()
+        try:
+            with conn.cursor() as cursor:
+                for state in _CLAIM_STATES:
+                    cursor.execute(_CLAIM_SQL, (state, limit - len(rows)))
+                    rows.extend(cursor.fetchall())
+                    if len(rows) >= limit:
+                        break
+                if len(rows) < limit:
+                    cursor.execute(_CLAIM_FAILED_SQL, (JOB_MAX_ATTEMPTS, limit - len(rows)))
+                    rows.extend(cursor.fetchall())
+                if rows:
+                    cursor.executemany("""
+                        UPDATE record_jobs
+                        SET claimed_by = %s, claimed_until = NOW() + INTERVAL %s SECOND
+                        WHERE record_id = %s
+                    """, [(worker_id, lease_seconds, row[0]) for row in rows])
+            conn.commit()
+        finally:
+            conn.close()
+
+        jobs = []
+        for record_id, record_info, state, resume_state, payload, attempts in rows:
+            jobs.append({
+                "record_id": record_id,
+                "record_info": json.loads(record_info),
+                "state": (resume_state or 'listed') if state == JOB_FAILED else state,
+                "payload": json.loads(payload) if payload else {},
+                "attempts": attempts
+            })
+        return jobs
+
+    def release_dead_leases(self):
+        """收回本机已退出进程持有的租约，返回收回的任务数
+
+        领取者标识为 主机名:进程号(-线程后缀)；崩溃后重启时不必等 JOB_LEASE_SECONDS 到期。
+        其他主机的租约无法判断存活，仍按到期时间收回。
+        """
+        prefix = f"{socket.gethostname()}:"
+        rows = self._execute("""
+            SELECT DISTINCT claimed_by FROM record_jobs
+            WHERE claimed_by LIKE %s AND claimed_until >= NOW()
+        """, (prefix.replace('%', r'\%').replace('_', r'\_') + '%',))
+        dead = []
+        for (claimed_by,) in rows:
+            pid = claimed_by[len(prefix):].split('-', 1)[0]
+            if pid.isdigit() and not _pid_alive(int(pid)):
+                dead.append(claimed_by)
+        if not dead:
+            return 0
+        placeholders = ", ".join(["%s"] * len(dead))
+        conn = self._connect()
+        try:
+            with conn.cursor() as cursor:
+                released = cursor.execute(f"""
+                    UPDATE record_jobs SET claimed_by = NULL, claimed_until = NULL
+                    WHERE claimed_by IN ({placeholders})
+                """, dead)
+            conn.commit()
+        finally:
+            conn.close()
+        print(f"♻️ 收回已退出进程的租约 {released} 个: {', '.join(dead)}")
+        return released
+
+    def claimable_count(self):
+        """可领取（租约空闲）的任务数；一致性读，不加锁
+
+        claim 返回空可能只是候选行正被其他领取者锁住，此数为0才说明确实没有任务了。
+        退避中的失败任务也计入：工作线程等它到期后重试，而不是提前退出。
+        """
+        rows = self._execute("""
+            SELECT COUNT(*) FROM record_jobs
+            WHERE state <> 'stored'
+              AND (state <> 'failed' OR attempts < %s)
+              AND (claimed_until IS NULL OR claimed_until < NOW())
+        """, (JOB_MAX_ATTEMPTS,))
+        return rows[0][0]
+
+    def advance(self, record_id, state, payload, lease_seconds=None):
+        """推进到下一状态并保存阶段产出，同时续租"""
+        self._execute("""
+            UPDATE record_jobs
+            SET state = %s, resume_state = NULL, payload = %s,
+                claimed_until = NOW() + INTERVAL %s SECOND
+            WHERE record_id = %s
+        """, (state, json.dumps(payload, ensure_ascii=False, default=str),
+              lease_seconds or JOB_LEASE_SECONDS, record_id))
+
+    def complete(self, record_id, payload):
+        """标记为已入库并释放租约"""
+        self._execute("""
+            UPDATE record_jobs
+            SET state = 'stored', resume_state = NULL, payload = %s,
+                claimed_by = NULL, claimed_until = NULL
+            WHERE record_id = %s
+        """, (json.dumps(payload, ensure_ascii=False, default=str), record_id))
+
+    def fail(self, record_id, resume_state, error, payload=None):
+        """标记失败，记录失败前状态和错误，释放租约
+
+        第 n 次失败后等待 min(JOB_RETRY_MAX_DELAY, JOB_RETRY_BASE_DELAY * 2^(n-1)) 秒才可再次领取，
+        坏记录不会被立即反复重试。
+        """
+        # not_before 要在 attempts 加一之前计算（MySQL 按顺序赋值，后面的表达式看到的是新值）
+        self._execute("""
+            UPDATE record_jobs
+            SET not_before = NOW() + INTERVAL LEAST(%s, %s * POW(2, attempts)) SECOND,
+                state = 'failed', resume_state = %s, attempts = attempts + 1, last_error = %s,
+                payload = COALESCE(%s, payload), claimed_by = NULL, claimed_until = NULL
+            WHERE record_id = %s
+        """, (JOB_RETRY_MAX_DELAY, JOB_RETRY_BASE_DELAY, resume_state, str(error)[:2000],
+              json.dumps(payload, ensure_ascii=False, default=str) if payload is not None else None,
+              record_id))
+
+    def counts(self):
+        """各状态的任务数"""
+        return dict(self._execute("SELECT state, COUNT(*) FROM record_jobs GROUP BY state"))
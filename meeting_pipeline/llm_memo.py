@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM调用结果持久化记忆
+以 (输入文本哈希, 提示词版本, 模型, temperature) 为键保存结果，
+转写和提示词都没变时重复处理不再调用Kimi。支持MySQL和SQLite两种存储。
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from dotenv import load_dotenv
+
+# 加载环境变量
+load_dotenv()
+
+# 存储配置
+MEMO_BACKEND = os.getenv('MEMO_BACKEND', 'mysql')            # mysql / sqlite
+MEMO_SQLITE_FILE = os.getenv('MEMO_SQLITE_FILE', 'meeting_data.db')
+
+_CREATE_MYSQL = """
+CREATE TABLE IF NOT EXISTS llm_memo (
+    memo_key CHAR(64) PRIMARY KEY,
+    result JSON NOT NULL,
+    model VARCHAR(64) NOT NULL,
+    prompt_version VARCHAR(32) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
+_CREATE_SQLITE = """
+CREATE TABLE IF NOT EXISTS llm_memo (
+    memo_key TEXT PRIMARY KEY,
+    result TEXT NOT NULL,
+    model TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+class LLMMemo:
+    """LLM结果记忆表 llm_memo 的读写
+
+    backend 为 mysql 时从 db_manager（DatabaseManager 连接池）借连接，为 sqlite 时使用 sqlite_file。
+    """
+
+    def __init__(self, backend=None, db_manager=None, sqlite_file=None):
+        self.backend = backend or MEMO_BACKEND
+        self.db_manager = db_manager
+        self.sqlite_file = sqlite_file or MEMO_SQLITE_FILE
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._ensure_table()
+
+    @staticmethod
+    def make_key(text, prompt_version, model, temperature):
+        """输入文本 + 提示词版本 + 模型 + temperature 的 SHA-256"""
+        text_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        raw = f"{text_hash}\0{prompt_version}\0{model}\0{temperature}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _connect(self):
+        if self.backend == 'sqlite':
+            return sqlite3.connect(self.sqlite_file)
+        if self.db_manager is None:
+            from db_pool import get_db_manager
+            self.db_manager = get_db_manager()
+        return self.db_manager.connect()
+
+    @property
+    def _placeholder(self):
+        return '?' if self.backend == 'sqlite' else '%s'
+
+    def _ensure_table(self):
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(_CREATE_SQLITE if self.backend == 'sqlite' else _CREATE_MYSQL)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get(self, key):
+        """读取记忆结果（dict），未命中返回None"""
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT result FROM llm_memo WHERE memo_key = {self._placeholder}", (key,))
+            row = cursor.fetchone()
+        finally:
+            conn.close()
+        with self._lock:
+            if row:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return json.loads(row[0]) if row else None
+
+    def put(self, key, result, model, prompt_version):
+        """保存结果，已存在则覆盖"""
+        p = self._placeholder
+        if self.backend == 'sqlite':
+            sql = f"INSERT OR REPLACE INTO llm_memo (memo_key, result, model, prompt_version) VALUES ({p}, {p}, {p}, {p})"
+        else:
+            sql = f"""INSERT INTO llm_memo (memo_key, result, model, prompt_version) VALUES ({p}, {p}, {p}, {p})
+                      ON DUPLICATE KEY UPDATE result = VALUES(result)"""
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(sql, (key, json.dumps(result, ensure_ascii=False), model, prompt_version))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+腾讯会议API异步客户端
+基于aiohttp，复用连接，整页录制的下载地址并发获取
+"""
+
+import asyncio
+import os
+from urllib.parse import urlencode
+
+import aiohttp
+from dotenv import load_dotenv
+
+from record_worker import API_BASE, generate_signature, get_signer
+from rate_limit import get_limiter
+from resilience import (CircuitOpenError, PermanentError, RetryableError, RetryPolicy,
+                        get_breaker, is_retryable, parse_retry_after)
+
+# 加载环境变量
+load_dotenv()
+
+# 同时在途的请求数
+MEETING_API_CONCURRENCY = int(os.getenv('MEETING_API_CONCURRENCY', 20))
+
+
+class MeetingAPI:
+    """腾讯会议API异步客户端
+
+    用法：
+        async with MeetingAPI() as api:
+            records, total_pages = await api.list_records(start, end)
+            addresses = await api.get_record_addresses([r["meeting_record_id"] for r in records])
+    """
+
+    def __init__(self, concurrency=None, timeout=10):
+        self.concurrency = concurrency or MEETING_API_CONCURRENCY
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self._session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        self._ensure_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def _ensure_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.concurrency)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._session
+
+    async def close(self):
+        """关闭连接池"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def _get(self, path, params):
+        """签名并发送GET请求，失败返回None
+
+        与同步的 _tencent_get 相同的重试/熔断语义：共用 tencent_meeting 限流器和熔断器，
+        网络异常、超时、429、5xx 按 RetryPolicy 退避重试（429 至少等待 Retry-After），其余错误不重试。
+        """
+        session = self._ensure_session()
+        uri = path + "?" + urlencode(sorted(params.items()))
+        limiter = get_limiter('tencent_meeting')
+        breaker = get_breaker('tencent_meeting')
+        policy = RetryPolicy()
+        signer = get_signer()
+        if not signer.synced:
+            # 首次签名前测量服务端时间偏差（同步请求，放到线程中避免阻塞事件循环）
+            await asyncio.to_thread(signer.ensure_synced)
+        resynced = False
+        async with self._semaphore:
+            for attempt in range(1, policy.max_attempts + 1):
+                try:
+                    # 熔断期间等待恢复（阻塞等待放到线程中）
+                    await asyncio.to_thread(breaker.before_call)
+                except CircuitOpenError as e:
+                    print(f"❌ 请求失败 {path}: {e}")
+                    return None
+                await limiter.acquire_async()
+                status, retry_after, text, error = None, None, "", None
+                try:
+                    headers = generate_signature("GET", uri)
+                    async with session.get(API_BASE + uri, headers=headers) as response:
+                        status, retry_after = response.status, response.headers.get('Retry-After')
+                        if response.status == 200:
+                            data = await response.json(content_type=None)
+                        else:
+                            text = await response.text()
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    status, error = None, RetryableError(f"请求异常: {e}")
+                except Exception as e:
+                    status, error = None, e
+                finally:
+                    limiter.release(status, retry_after)
+                
+                if status == 200:
+                    breaker.record_success()
+                    return data
+                if error is None:
+                    if not resynced and signer.is_signature_rejection(status, text):
+                        # 时钟漂移导致签名被拒：重新测量时间偏差后重试
+                        print(f"🕒 签名被拒 {path}，重新同步服务端时间后重试")
+                        breaker.record_success()
+                        await asyncio.to_thread(signer.resync)
+                        resynced = True
+                        continue
+                    message = f"{status} - {text[:500]}"
+                    if status == 429 or status >= 500:
+                        error = RetryableError(message, parse_retry_after(retry_after))
+                    else:
+                        error = PermanentError(message)
+                
+                if not is_retryable(error):
+                    # 服务有响应，只是这次请求本身有问题，不计入熔断
+                    breaker.record_success()
+                    print(f"❌ 请求失败 {path}: {error}")
+                    return None
+                breaker.record_failure()
+                if attempt == policy.max_attempts:
+                    print(f"❌ 请求失败 {path}（共尝试 {attempt} 次）: {error}")
+                    return None
+                delay = policy.delay(attempt, getattr(error, 'retry_after', None))
+                print(f"⚠️ {path} 第 {attempt} 次请求失败，{delay:.1f}秒后重试: {error}")
+                await asyncio.sleep(delay)
+
+    async def _list_page(self, start_time, end_time, page, page_size):
+        """获取一页录制列表，返回接口原始数据，失败返回None"""
+        return await self._get("/v1/corp/records", {
+            "end_time": end_time,
+            "page": page,
+            "page_size": page_size,
+            "start_time": start_time
+        })
+
+    async def list_records(self, start_time, end_time, page=1, page_size=50):
+        """获取会议录制列表，返回 (records, total_pages)"""
+        data = await self._list_page(start_time, end_time, page, page_size)
+        if not data:
+            return [], 0
+        return data.get("records", []), data.get("total_pages", 1)
+
+    async def get_record_address(self, record_id):
+        """获取录制文件下载地址"""
+        return await self._get("/v1/corp/addresses", {"meeting_record_id": record_id})
+
+    async def get_record_addresses(self, record_ids):
+        """并发获取一批录制的下载地址，返回 {record_id: 地址数据或None}"""
+        results = await asyncio.gather(*(self.get_record_address(rid) for rid in record_ids))
+        return dict(zip(record_ids, results))
+
+    async def list_all_records(self, start_time, end_time, page_size=50, with_addresses=True):
+        """获取时间范围内的全部录制，任一页获取失败返回None（不把不完整的列表当成全部）
+
+        先取第一页得到总页数，其余页并发获取；with_addresses 时每条记录
+        附带 "address" 字段（下载地址接口的返回）。
+        """
+        first = await self._list_page(start_time, end_time, 1, page_size)
+        if not first:
+            return None
+        records, total_pages = first.get("records", []), first.get("total_pages", 1)
+        if total_pages > 1:
+            pages = await asyncio.gather(*(
+                self._list_page(start_time, end_time, page, page_size)
+                for page in range(2, total_pages + 1)
+            ))
+            if not all(pages):
+                return None
+            for data in pages:
+                records.extend(data.get("records", []))
+
+        if with_addresses and records:
+            addresses = await self.get_record_addresses([r["meeting_record_id"] for r in records])
+            for record in records:
+                record["address"] = addresses.get(record["meeting_record_id"])
+        return records
+
+
+def fetch_all_records(start_time, end_time, page_size=50, with_addresses=False):
+    """同步封装：并发获取时间范围内的全部录制，任一页失败返回None"""
+    async def _run():
+        async with MeetingAPI() as api:
+            return await api.list_all_records(start_time, end_time, page_size, with_addresses)
+    return asyncio.run(_run())
+
+
+def fetch_record_addresses(record_ids):
+    """同步封装：并发获取一批录制的下载地址，返回 {record_id: 地址数据或None}"""
+    async def _run():
+        async with MeetingAPI() as api:
+            return await api.get_record_addresses(record_ids)
+    return asyncio.run(_run())
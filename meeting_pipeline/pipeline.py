@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分阶段流水线
+各阶段之间用有界队列连接，每个阶段有独立的并发数；
+下游处理不过来时上游的 put 会阻塞（背压），避免快阶段把磁盘写满。
+"""
+
+import queue
+import threading
+import time
+
+# 队列结束标记
+_SENTINEL = object()
+
+
+class Stage:
+    """流水线中的一个阶段
+
+    func: 非批量阶段为 func(item) -> 新 item 或 None（None 表示该条失败）；
+          批量阶段为 func(items) -> 与 items 等长的结果列表
+    workers: 该阶段的并发线程数
+    queue_size: 该阶段输入队列容量
+    batch_size: 大于 1 时按批调用 func，凑满或等待 batch_timeout 秒后提交
+    """
+
+    def __init__(self, name, func, workers=1, queue_size=None, batch_size=1, batch_timeout=5.0):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.queue = queue.Queue(maxsize=queue_size or self.workers * 2)
+        self.batch_size = max(1, batch_size)
+        self.batch_timeout = batch_timeout
+        self.succeeded = 0
+        self.failed = 0
+
+
+class StagedPipeline:
+    """由多个 Stage 组成的流水线
+
+    submit() 把条目送入第一个阶段，close() 通知输入结束并等待所有阶段排空。
+    条目通过最后一个阶段记为成功，在任一阶段返回 None 或抛异常记为失败。
+    on_failure: 可选 on_failure(item)，条目失败时以该阶段的输入调用，用于释放其占用的资源。
+    """
+
+    def __init__(self, stages, on_failure=None):
+        self.stages = stages
+        self.on_failure = on_failure
+        self.succeeded = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+        self._alive = [stage.workers for stage in stages]
+        self._threads = []
+        for index, stage in enumerate(stages):
+            for n in range(stage.workers):
+                thread = threading.Thread(
+                    target=self._run_worker, args=(index,),
+                    name=f"{stage.name}-{n}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, item):
+        """提交条目，第一个阶段队列满时阻塞"""
+        self.stages[0].queue.put(item)
+
+    def close(self):
+        """结束输入并等待全部处理完成，返回 (成功数, 失败数)"""
+        for _ in range(self.stages[0].workers):
+            self.stages[0].queue.put(_SENTINEL)
+        for thread in self._threads:
+            thread.join()
+        return self.succeeded, self.failed
+
+    def stats(self):
+        """各阶段的成功/失败计数及当前队列长度"""
+        return {
+            stage.name: {
+                "succeeded": stage.succeeded,
+                "failed": stage.failed,
+                "queued": stage.queue.qsize()
+            }
+            for stage in self.stages
+        }
+
+    def _run_worker(self, index):
+        stage = self.stages[index]
+        try:
+            if stage.batch_size > 1:
+                self._run_batch_worker(index)
+            else:
+                while True:
+                    item = stage.queue.get()
+                    if item is _SENTINEL:
+                        break
+                    self._handle(index, [item], lambda items: [stage.func(items[0])])
+        finally:
+            self._worker_exit(index)
+
+    def _run_batch_worker(self, index):
+        stage = self.stages[index]
+        finished = False
+        while not finished:
+            batch = []
+            deadline = None
+            while len(batch) < stage.batch_size:
+                timeout = None if deadline is None else max(0, deadline - time.monotonic())
+                try:
+                    item = stage.queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is _SENTINEL:
+                    finished = True
+                    break
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + stage.batch_timeout
+            if batch:
+                self._handle(index, batch, stage.func)
+
+    def _handle(self, index, items, call):
+        stage = self.stages[index]
+        try:
+            results = call(items)
+        except Exception as e:
+            print(f"❌ 流水线阶段 {stage.name} 异常: {e}")
+            results = [None] * len(items)
+
+        is_last = index == len(self.stages) - 1
+        for item, result in zip(items, results):
+            if result is None:
+                with self._lock:
+                    stage.failed += 1
+                    self.failed += 1
+                self._notify_failure(item)
+                continue
+            with self._lock:
+                stage.succeeded += 1
+                if is_last:
+                    self.succeeded += 1
+            if not is_last:
+                # 下游队列满时在此阻塞，形成背压
+                self.stages[index + 1].queue.put(result)
+
+    def _notify_failure(self, item):
+        if self.on_failure is None:
+            return
+        try:
+            self.on_failure(item)
+        except Exception as e:
+            print(f"⚠️ 流水线失败回调异常: {e}")
+
+    def _worker_exit(self, index):
+        with self._lock:
+            self._alive[index] -= 1
+            last = self._alive[index] == 0
+        # 本阶段最后一个线程退出时通知下一阶段结束
+        if last and index + 1 < len(self.stages):
+            for _ in range(self.stages[index + 1].workers):
+                self.stages[index + 1].queue.put(_SENTINEL)
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+外部API自适应限流
+每个接口（腾讯会议、Kimi ASR、Kimi 对话）一个限流器：
+- 令牌桶限制请求速率（QPS 可配置）
+- AIMD 调整并发上限与速率：成功时线性增加，429/5xx 时减半
+- 429 按 Retry-After 暂停整个接口（所有线程），5xx 只减半
+限流器只负责"何时能发"，不重试：429/5xx 的重试统一由 resilience.RetryPolicy 处理（429 按 Retry-After 等待）。
+吞吐稳定在配额之下，而不是在超限和空闲之间来回震荡。
+"""
+
+import asyncio
+import os
+import threading
+import time
+
+import http_client
+from dotenv import load_dotenv
+from resilience import parse_retry_after
+
+# 加载环境变量
+load_dotenv()
+
+# 各接口的速率(次/秒)和最大并发
+RATE_LIMITS = {
+    'tencent_meeting': {
+        'qps': float(os.getenv('RATE_LIMIT_TENCENT_QPS', 10)),
+        'max_concurrency': int(os.getenv('RATE_LIMIT_TENCENT_CONCURRENCY', 20)),
+    },
+    'kimi_asr': {
+        'qps': float(os.getenv('RATE_LIMIT_KIMI_ASR_QPS', 2)),
+        'max_concurrency': int(os.getenv('RATE_LIMIT_KIMI_ASR_CONCURRENCY', 8)),
+    },
+    'kimi_chat': {
+        'qps': float(os.getenv('RATE_LIMIT_KIMI_CHAT_QPS', 3)),
+        'max_concurrency': int(os.getenv('RATE_LIMIT_KIMI_CHAT_CONCURRENCY', 8)),
+    },
+}
+RATE_LIMIT_BACKOFF = float(os.getenv('RATE_LIMIT_BACKOFF', 2))        # 429 无 Retry-After 时的暂停秒数
+
+# 两次减半之间的最短间隔，同一时刻返回的一批 429 只减半一次
+_DECREASE_COOLDOWN = 1.0
+
+
+class EndpointLimiter:
+    """单个接口的限流器
+
+    用法：
+        limiter.acquire()                     # 阻塞直到可以发请求
+        response = ...
+        limiter.release(response.status_code, response.headers.get('Retry-After'))
+    异步代码用 await limiter.acquire_async()。
+    """
+
+    def __init__(self, name, qps, max_concurrency):
+        self.name = name
+        self.max_qps = max(qps, 0.01)
+        self.max_concurrency = max(1, max_concurrency)
+        self.qps = self.max_qps
+        self.limit = max(1.0, self.max_concurrency / 2)   # 从一半并发开始线性增加
+        self.in_flight = 0
+        self.throttled = 0
+        self.server_errors = 0
+        self._tokens = 1.0
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    # ---- 获取 ----
+
+    def _try_acquire(self):
+        """可以发请求时占用并发和令牌并返回0，否则返回建议等待的秒数"""
+        with self._cond:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            if self.in_flight >= int(self.limit):
+                return None
+            self._tokens = min(1.0, self._tokens + (now - self._refilled_at) * self.qps)
+            self._refilled_at = now
+            if self._tokens < 1.0:
+                return (1.0 - self._tokens) / self.qps
+            self._tokens -= 1.0
+            self.in_flight += 1
+            return 0
+
+    def acquire(self):
+        """阻塞直到暂停结束、并发未满且有令牌"""
+        while True:
+            wait = self._try_acquire()
+            if wait == 0:
+                return
+            with self._cond:
+                # 并发已满时等待 release 唤醒（带超时兜底），否则按需要的时间等待
+                self._cond.wait(wait if wait is not None else 0.1)
+
+    async def acquire_async(self):
+        """acquire 的异步版本，等待时不阻塞事件循环"""
+        while True:
+            wait = self._try_acquire()
+            if wait == 0:
+                return
+            await asyncio.sleep(wait if wait is not None else 0.05)
+
+    # ---- 反馈 ----
+
+    def release(self, status_code=None, retry_after=None):
+        """归还并发并按响应调整：2xx/4xx 线性增加，429/5xx/异常(None) 减半
+
+        返回本次触发的暂停秒数（未暂停为0）。
+        """
+        pause = 0.0
+        with self._cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if status_code is not None and status_code != 429 and status_code < 500:
+                self.limit = min(self.max_concurrency, self.limit + 1.0 / self.limit)
+                self.qps = min(self.max_qps, self.qps + self.max_qps * 0.01)
+            else:
+                if status_code == 429:
+                    self.throttled += 1
+                    pause = parse_retry_after(retry_after)
+                    if pause is None:
+                        pause = RATE_LIMIT_BACKOFF
+                elif status_code is not None:
+                    # 5xx 不暂停，退避由调用方的重试策略负责，避免两层等待叠加
+                    self.server_errors += 1
+                if now - self._last_decrease > _DECREASE_COOLDOWN:
+                    self._last_decrease = now
+                    self.limit = max(1.0, self.limit / 2)
+                    self.qps = max(self.max_qps * 0.05, self.qps / 2)
+                if pause:
+                    self._paused_until = max(self._paused_until, now + pause)
+            self._cond.notify_all()
+        return pause
+
+    def stats(self):
+        with self._cond:
+            return {
+                'limit': round(self.limit, 2),
+                'qps': round(self.qps, 2),
+                'in_flight': self.in_flight,
+                'throttled': self.throttled,
+                'server_errors': self.server_errors
+            }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name):
+    """进程内共享的接口限流器（配置见 RATE_LIMITS）"""
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            config = RATE_LIMITS[name]
+            limiter = EndpointLimiter(name, config['qps'], config['max_concurrency'])
+            _limiters[name] = limiter
+        return limiter
+
+
+def _rewind_files(files):
+    for value in (files or {}).values():
+        fileobj = value[1] if isinstance(value, tuple) else value
+        if hasattr(fileobj, 'seek'):
+            fileobj.seek(0)
+
+
+def limited_request(name, method, url, **kwargs):
+    """经限流器发送一次请求并返回响应
+
+    429/5xx 只反馈给限流器（429 暂停整个接口），不在这里重试；
+    调用方用 check_response 转成 RetryableError，由 RetryPolicy 按 Retry-After 退避重试。
+    """
+    limiter = get_limiter(name)
+    limiter.acquire()
+    response = None
+    try:
+        _rewind_files(kwargs.get('files'))
+        response = http_client.request(method, url, **kwargs)
+    finally:
+        limiter.release(
+            response.status_code if response is not None else None,
+            response.headers.get('Retry-After') if response is not None else None
+        )
+    return response
+
+
+def limiter_stats():
+    """所有已创建限流器的状态"""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.stats() for limiter in limiters}
@@ -8,16 +8,23 @@
 import os
 import time
 import json
-import requests
-import pymysql
+from rate_limit import limited_request, limiter_stats
+from resilience import RetryPolicy, PermanentError, check_response, retrying, breaker_stats
+from asr_chunking import ASR_CHUNK_RETRIES, transcribe_in_chunks, format_transcript
+from transcript_cache import get_transcript_cache
+from llm_memo import LLMMemo
+from tencent_signer import SigningClient
+from token_estimator import estimate_tokens, estimate_tokens_batch, log_usage
+from db_pool import DB_CONFIG, DatabaseManager, get_db_manager
+from scratch import get_scratch_space, estimate_scratch_bytes
 import tempfile
 import subprocess
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from collections import Counter
 from datetime import datetime, timedelta
 from urllib.parse import urlencode
 from dotenv import load_dotenv
-import base64
-import hmac
-import hashlib
+import threading
 
 # 加载环境变量
 load_dotenv()
@@ -32,48 +39,119 @@ API_BASE = "https://api.meeting.qq.com"
 # Kimi API配置
 KIMI_API_KEY = "sk-reaTT6uRqEqQPZ7HMXp5gmoingV6cZ2dumU8Y4axl9DHN2Jw"
 KIMI_BASE_URL = "https://api.moonshot.cn/v1"
+ASR_MODEL = os.getenv('KIMI_ASR_MODEL', '')
+ASR_CHUNK_TIMEOUT = int(os.getenv('ASR_CHUNK_TIMEOUT', 120))  # 单个分片的转写超时(秒)
+# 转写流程（分片、拼接格式）变化时递增，使旧缓存失效
+ASR_PIPELINE_VERSION = "2"
 
-# 数据库配置
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST', '127.0.0.1'),
-    'port': int(os.getenv('DB_PORT', 3306)),
-    'user': os.getenv('DB_USER', 'meeting'),
-    'password': os.getenv('DB_PASS', 'VeryStrongPwd'),
-    'database': os.getenv('DB_NAME', 'meeting_db'),
-    'charset': 'utf8mb4'
+# 模型路由：按提示词估算的token数选择能容纳的最小模型 (模型, 上下文长度)
+LLM_MODELS = [
+    ("moonshot-v1-8k", 8192),
+    ("moonshot-v1-32k", 32768),
+    ("moonshot-v1-128k", 131072),
+]
+LLM_OUTPUT_RESERVE_TOKENS = int(os.getenv('LLM_OUTPUT_RESERVE_TOKENS', 1024))  # 为回复预留的token数
+# 各模型同时在途的请求数
+LLM_MODEL_CONCURRENCY = {
+    "moonshot-v1-8k": int(os.getenv('LLM_CONCURRENCY_8K', 4)),
+    "moonshot-v1-32k": int(os.getenv('LLM_CONCURRENCY_32K', 2)),
+    "moonshot-v1-128k": int(os.getenv('LLM_CONCURRENCY_128K', 1)),
 }
 
+# 摘要分类配置；修改提示词模板时递增 SUMMARY_PROMPT_VERSION，使记忆结果失效
+LLM_TEMPERATURE = 0.7
+SUMMARY_PROMPT_VERSION = "1"
+SUMMARY_PROMPT_TEMPLATE = """
+请对以下会议记录进行摘要和分类：
+
+会议内容：
+{transcript}
+
+请提供：
+1. 150字以内的摘要
+2. 会议类型分类（简历优化/项目深挖/面试模拟/Offer后续/其他）
+
+请以JSON格式返回：
+{{
+    "summary": "摘要内容",
+    "phase": "分类结果"
+}}
+"""
+
+# 长转写分段摘要（map-reduce）：超过 SUMMARY_MAX_INPUT_TOKENS 时按 SUMMARY_CHUNK_TOKENS 分段，
+# 各段并发概括（结果存入LLM结果记忆），再汇总成最终摘要和分类；
+# 未超过时整段交给能容纳的模型（见 LLM_MODELS）
+SUMMARY_MAX_INPUT_TOKENS = int(os.getenv('SUMMARY_MAX_INPUT_TOKENS', 30000))
+SUMMARY_CHUNK_TOKENS = int(os.getenv('SUMMARY_CHUNK_TOKENS', 4000))
+SUMMARY_MAP_WORKERS = int(os.getenv('SUMMARY_MAP_WORKERS', 4))
+# 修改分段/汇总提示词模板时递增
+MAP_REDUCE_PROMPT_VERSION = f"{SUMMARY_PROMPT_VERSION}-mr1"
+CHUNK_SUMMARY_PROMPT_TEMPLATE = """
+以下是一场会议记录的第 {index}/{total} 段：
+
+{text}
+
+请用300字以内概括这一段的要点（讨论的主题、学员的问题、老师的建议），只输出概括内容。
+"""
+REDUCE_SUMMARY_PROMPT_TEMPLATE = """
+以下是一场会议按时间顺序各段的要点：
+
+{summaries}
+
+请根据这些要点提供：
+1. 整场会议150字以内的摘要
+2. 会议类型分类（简历优化/项目深挖/面试模拟/Offer后续/其他）
+
+请以JSON格式返回：
+{{
+    "summary": "摘要内容",
+    "phase": "分类结果"
+}}
+"""
+
+# 音频获取方式：stream = ffmpeg直接读取下载地址只落盘WAV；aria2c = 先完整下载MP4再提取
+AUDIO_FETCH_MODE = os.getenv('AUDIO_FETCH_MODE', 'stream')
+
+# 启动时把全部已入库录制ID读入内存用于跳过（否则每页查询一次）
+STORED_ID_PRELOAD = os.getenv('STORED_ID_PRELOAD', 'false').lower() == 'true'
+
+# 批量入库：每批条数、最长攒批时间(秒)
+DB_BATCH_SIZE = int(os.getenv('DB_BATCH_SIZE', 50))
+DB_FLUSH_INTERVAL = float(os.getenv('DB_FLUSH_INTERVAL', 30))
+
+_llm_memo = None
+_llm_memo_lock = threading.Lock()
+_llm_model_slots = {model: threading.BoundedSemaphore(max(1, n)) for model, n in LLM_MODEL_CONCURRENCY.items()}
+
+# 并发配置：同时处理的记录数（1 表示串行）
+WORKER_COUNT = int(os.getenv('WORKER_COUNT', 1))
+
+_signer = SigningClient(APP_ID, SDK_ID, SECRET_ID, SECRET_KEY, API_BASE)
+
+def get_signer():
+    """进程内共享的腾讯会议签名器"""
+    return _signer
+
 def generate_signature(method, uri, body=""):
-    """生成腾讯会议API签名"""
-    ts = str(int(time.time()))
-    nonce = str(int(time.time() * 1000))
-    
-    # 按ASCII升序排列所有参与签名的header
-    hl_items = [
-        ("SdkId", SDK_ID),
-        ("X-TC-Key", SECRET_ID),
-        ("X-TC-Nonce", nonce),
-        ("X-TC-Timestamp", ts)
-    ]
-    hl = "&".join(f"{k}={v}" for k, v in hl_items)
-    
-    sts = f"{method}\n{hl}\n{uri}\n{body}"
-    signature = base64.b64encode(
-        hmac.new(SECRET_KEY.encode(), sts.encode(), hashlib.sha256).digest()
-    ).decode()
-    
-    return {
-        "AppId": APP_ID,
-        "SdkId": SDK_ID,
-        "X-TC-Key": SECRET_ID,
-        "X-TC-Nonce": nonce,
-        "X-TC-Timestamp": ts,
-        "X-TC-Signature": signature,
-        "Content-Type": "application/json"
-    }
+    """生成腾讯会议API签名（时间戳已按服务端时间补偿）"""
+    return _signer.sign(method, uri, body)
+
+@retrying('tencent_meeting')
+def _tencent_get(uri, what):
+    """签名并发送GET请求，返回JSON；失败按错误类型抛出，由重试/熔断层处理"""
+    # 每次尝试重新签名，避免重试时时间戳过期
+    headers = generate_signature("GET", uri)
+    response = limited_request('tencent_meeting', 'GET', API_BASE + uri, headers=headers, timeout=10)
+    if SigningClient.is_signature_rejection(response.status_code, response.text):
+        # 时钟漂移导致签名被拒：重新测量时间偏差后立即重试一次
+        print(f"🕒 {what}签名被拒，重新同步服务端时间后重试")
+        _signer.resync()
+        headers = generate_signature("GET", uri)
+        response = limited_request('tencent_meeting', 'GET', API_BASE + uri, headers=headers, timeout=10)
+    return check_response(response, what).json()
 
 def list_meeting_records(start_time, end_time, page=1, page_size=50):
-    """获取会议录制列表"""
+    """获取会议录制列表，重试耗尽后返回None"""
     try:
         params = {
             "end_time": end_time,
@@ -82,52 +160,42 @@ def list_meeting_records(start_time, end_time, page=1, page_size=50):
             "start_time": start_time
         }
         uri = "/v1/corp/records?" + urlencode(sorted(params.items()))
-        
-        headers = generate_signature("GET", uri)
-        response = requests.get(API_BASE + uri, headers=headers, timeout=10)
-        
-        if response.status_code == 200:
-            return response.json()
-        else:
-            print(f"❌ 获取会议记录失败: {response.status_code} - {response.text}")
-            return None
+        return _tencent_get(uri, "获取会议记录")
     except Exception as e:
         print(f"❌ 获取会议记录异常: {e}")
         return None
 
 def get_record_download_url(record_id):
-    """获取录制文件下载地址"""
+    """获取录制文件下载地址，重试耗尽后返回None"""
     try:
         params = {"meeting_record_id": record_id}
         uri = "/v1/corp/addresses?" + urlencode(sorted(params.items()))
-        
-        headers = generate_signature("GET", uri)
-        response = requests.get(API_BASE + uri, headers=headers, timeout=10)
-        
-        if response.status_code == 200:
-            return response.json()
-        else:
-            print(f"❌ 获取下载地址失败: {response.status_code} - {response.text}")
-            return None
+        return _tencent_get(uri, "获取下载地址")
     except Exception as e:
         print(f"❌ 获取下载地址异常: {e}")
         return None
 
-def download_and_extract_audio(download_url, record_id):
-    """下载并提取音频"""
+def download_video(download_url, record_id, temp_dir=None):
+    """使用aria2c下载录制文件，返回MP4路径"""
     try:
-        # 下载文件
-        temp_dir = tempfile.mkdtemp()
+        temp_dir = temp_dir or tempfile.mkdtemp()
         mp4_path = os.path.join(temp_dir, f"{record_id}.mp4")
-        wav_path = os.path.join(temp_dir, f"{record_id}.wav")
         
-        # 使用aria2c下载
         subprocess.run([
             "aria2c", "-x", "8", "-o", f"{record_id}.mp4",
             download_url, "-d", temp_dir
         ], check=True)
         
-        # 使用ffmpeg提取音频
+        return mp4_path
+    except Exception as e:
+        print(f"❌ 下载异常: {e}")
+        return None
+
+def extract_audio(mp4_path):
+    """使用ffmpeg从MP4中提取16kHz单声道WAV，返回WAV路径"""
+    try:
+        wav_path = os.path.splitext(mp4_path)[0] + ".wav"
+        
         subprocess.run([
             "ffmpeg", "-i", mp4_path, "-vn", "-ar", "16000", 
             "-ac", "1", wav_path
@@ -135,112 +203,374 @@ def download_and_extract_audio(download_url, record_id):
         
         return wav_path
     except Exception as e:
-        print(f"❌ 音频处理异常: {e}")
+        print(f"❌ 音频提取异常: {e}")
         return None
 
-def kimi_asr_transcribe(audio_path):
-    """使用Kimi进行语音转写"""
+def stream_extract_audio(download_url, record_id, temp_dir=None):
+    """ffmpeg直接读取下载地址提取音频，不落盘MP4，返回WAV路径"""
+    wav_path = None
     try:
-        # 读取音频文件
-        with open(audio_path, 'rb') as f:
-            audio_data = f.read()
+        temp_dir = temp_dir or tempfile.mkdtemp()
+        wav_path = os.path.join(temp_dir, f"{record_id}.wav")
         
-        # 调用Kimi ASR API
-        headers = {
-            "Authorization": f"Bearer {KIMI_API_KEY}",
-            "Content-Type": "audio/wav"
-        }
+        # -vn 只解复用音频轨，视频数据不解码也不写盘；断流时自动重连续传
+        subprocess.run([
+            "ffmpeg", "-y",
+            "-reconnect", "1", "-reconnect_streamed", "1", "-reconnect_delay_max", "30",
+            "-i", download_url, "-vn", "-ar", "16000", "-ac", "1", wav_path
+        ], check=True)
         
-        response = requests.post(
-            f"{KIMI_BASE_URL}/audio/transcriptions",
+        return wav_path
+    except Exception as e:
+        print(f"❌ 流式提取音频异常: {e}")
+        if wav_path and os.path.exists(wav_path):
+            os.remove(wav_path)
+        return None
+
+def download_and_extract_audio(download_url, record_id, scratch=None):
+    """下载并提取音频，文件写入 scratch（ScratchReservation）的目录
+
+    stream 模式下优先流式提取，失败时回退到 aria2c 完整下载再提取；
+    提取完成后立即删除MP4。
+    """
+    temp_dir = scratch.dir if scratch else None
+    if AUDIO_FETCH_MODE == 'stream':
+        wav_path = stream_extract_audio(download_url, record_id, temp_dir)
+        if wav_path:
+            return wav_path
+        print(f"⚠️ 记录 {record_id} 流式提取失败，回退到aria2c下载")
+    
+    mp4_path = download_video(download_url, record_id, temp_dir)
+    if not mp4_path:
+        return None
+    if scratch and AUDIO_FETCH_MODE == 'stream':
+        # 预留额度时未计入MP4，回退下载后按实际大小补记
+        scratch.grow(os.path.getsize(mp4_path))
+    wav_path = extract_audio(mp4_path)
+    _discard_scratch_file(scratch, mp4_path)
+    return wav_path
+
+def _discard_scratch_file(scratch, path):
+    """删除已用完的临时文件（有额度时同时归还额度）"""
+    if scratch:
+        scratch.discard(path)
+    elif path and os.path.exists(path):
+        os.remove(path)
+
+def reserve_scratch(record_info, download_info):
+    """按录制时长（及文件大小）预估磁盘占用并预留临时空间，额度不足时阻塞"""
+    file_info = download_info["record_file_list"][0]
+    nbytes = estimate_scratch_bytes(
+        record_info.get("end_time", 0) - record_info.get("start_time", 0),
+        with_video=AUDIO_FETCH_MODE != 'stream',
+        file_size=file_info.get("file_size")
+    )
+    return get_scratch_space().reserve(record_info["meeting_record_id"], nbytes)
+
+@retrying('kimi_asr', RetryPolicy(max_attempts=ASR_CHUNK_RETRIES))
+def _kimi_asr_request(audio_path):
+    """转写单个音频文件，返回分段列表 [{"start", "end", "text"}]，重试耗尽后抛异常"""
+    headers = {"Authorization": f"Bearer {KIMI_API_KEY}"}
+    data = {"response_format": "verbose_json"}
+    if ASR_MODEL:
+        data["model"] = ASR_MODEL
+    
+    with open(audio_path, 'rb') as f:
+        response = limited_request(
+            'kimi_asr', 'POST', f"{KIMI_BASE_URL}/audio/transcriptions",
             headers=headers,
-            files={"file": audio_data},
-            timeout=30
+            data=data,
+            files={"file": (os.path.basename(audio_path), f, "audio/wav")},
+            timeout=ASR_CHUNK_TIMEOUT
         )
+    
+    result = check_response(response, "Kimi ASR").json()
+    segments = result.get("segments")
+    if segments:
+        return segments
+    # 无分段信息时整片作为一段
+    return [{"start": 0.0, "end": result.get("duration", 0.0), "text": result.get("text", "")}]
+
+def kimi_asr_transcribe(audio_path):
+    """使用Kimi进行语音转写
+
+    长音频在静音处切片并发转写，返回带时间戳的完整转写文本。
+    先查CACHE_DIR中的转写缓存，同一音频重复处理不再调用ASR。
+    """
+    try:
+        cache = get_transcript_cache()
+        cache_key = cache.make_key(audio_path, ASR_MODEL or "default", ASR_PIPELINE_VERSION)
+        transcript = cache.get(cache_key)
+        if transcript:
+            print(f"♻️ 转写缓存命中: {os.path.basename(audio_path)}")
+            return transcript
         
-        if response.status_code == 200:
-            result = response.json()
-            return result.get("text", "")
-        else:
-            print(f"❌ Kimi ASR失败: {response.status_code} - {response.text}")
-            return ""
+        segments = transcribe_in_chunks(audio_path, _kimi_asr_request)
+        transcript = format_transcript(segments)
+        if transcript:
+            cache.put(cache_key, transcript)
+        return transcript
     except Exception as e:
         print(f"❌ Kimi ASR异常: {e}")
         return ""
 
-def kimi_summarize_and_classify(transcript):
-    """使用Kimi进行摘要和分类"""
-    try:
-        prompt = f"""
-请对以下会议记录进行摘要和分类：
-
-会议内容：
-{transcript}
-
-请提供：
-1. 150字以内的摘要
-2. 会议类型分类（简历优化/项目深挖/面试模拟/Offer后续/其他）
+def get_llm_memo():
+    """进程内共享的LLM结果记忆，存储不可用时返回None（直接调用API）"""
+    global _llm_memo
+    with _llm_memo_lock:
+        if _llm_memo is None:
+            try:
+                _llm_memo = LLMMemo(db_manager=get_db_manager())
+            except Exception as e:
+                print(f"⚠️ LLM结果记忆不可用: {e}")
+                _llm_memo = False
+        return _llm_memo or None
 
-请以JSON格式返回：
-{{
-    "summary": "摘要内容",
-    "phase": "分类结果"
-}}
-"""
-        
-        headers = {
-            "Authorization": f"Bearer {KIMI_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        
-        data = {
-            "model": "moonshot-v1-8k",
-            "messages": [{"role": "user", "content": prompt}],
-            "temperature": 0.7
-        }
-        
-        response = requests.post(
-            f"{KIMI_BASE_URL}/chat/completions",
+@retrying('kimi_chat')
+def _kimi_chat(model, messages, temperature):
+    """调用Kimi对话接口，返回回复内容；失败按错误类型抛出，由重试/熔断层处理"""
+    headers = {
+        "Authorization": f"Bearer {KIMI_API_KEY}",
+        "Content-Type": "application/json"
+    }
+    data = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature
+    }
+    with _llm_model_slots[model]:
+        response = limited_request(
+            'kimi_chat', 'POST', f"{KIMI_BASE_URL}/chat/completions",
             headers=headers,
             json=data,
             timeout=30
         )
-        
-        if response.status_code == 200:
-            result = response.json()
-            content = result["choices"][0]["message"]["content"]
-            
-            # 解析JSON响应
-            try:
-                parsed = json.loads(content)
-                return parsed.get("summary", ""), parsed.get("phase", "其他")
-            except:
-                # 如果JSON解析失败，返回默认值
-                return content[:150], "其他"
+    try:
+        result = check_response(response, "Kimi LLM").json()
+        content = result["choices"][0]["message"]["content"]
+    except (KeyError, IndexError, ValueError) as e:
+        raise PermanentError(f"Kimi LLM响应格式异常: {e}")
+    # 记录真实token用量，用于校准本地估算
+    log_usage("\n".join(m["content"] for m in messages), result.get("usage", {}).get("prompt_tokens"), model)
+    return content
+
+def route_model(prompt):
+    """返回 (模型, 估算token数)：能容纳提示词和回复预留的最小模型，都放不下时用最大的模型"""
+    tokens = estimate_tokens(prompt)
+    for model, context in LLM_MODELS:
+        if tokens + LLM_OUTPUT_RESERVE_TOKENS <= context:
+            return model, tokens
+    return LLM_MODELS[-1][0], tokens
+
+def split_transcript(transcript, max_tokens):
+    """按行把转写切成不超过 max_tokens 的段，单行过长时按字符切开"""
+    lines = transcript.splitlines()
+    chunks = []
+    current, current_tokens = [], 0
+    for line, tokens in zip(lines, estimate_tokens_batch(lines).tolist()):
+        if tokens > max_tokens:
+            # 先把已缓冲的行输出，保持原文顺序；再按每字符至少一个token的保守假设切开
+            if current:
+                chunks.append("\n".join(current))
+                current, current_tokens = [], 0
+            while len(line) > max_tokens:
+                chunks.append(line[:max_tokens])
+                line = line[max_tokens:]
+            tokens = estimate_tokens(line)
+        tokens += 1
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("\n".join(current))
+            current, current_tokens = [], 0
+        current.append(line)
+        current_tokens += tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+def _summarize_chunk(text, index, total):
+    """概括一段转写，结果按段内容记忆，重复处理不再调用API"""
+    memo = get_llm_memo()
+    prompt = CHUNK_SUMMARY_PROMPT_TEMPLATE.format(index=index, total=total, text=text)
+    model, _ = route_model(prompt)
+    memo_key = LLMMemo.make_key(prompt, MAP_REDUCE_PROMPT_VERSION, model, LLM_TEMPERATURE)
+    if memo:
+        try:
+            cached = memo.get(memo_key)
+            if cached:
+                return cached["summary"]
+        except Exception as e:
+            print(f"⚠️ 读取LLM结果记忆失败: {e}")
+    
+    summary = _kimi_chat(model, [{"role": "user", "content": prompt}], LLM_TEMPERATURE).strip()
+    if memo and summary:
+        try:
+            memo.put(memo_key, {"summary": summary}, model, MAP_REDUCE_PROMPT_VERSION)
+        except Exception as e:
+            print(f"⚠️ 保存LLM结果记忆失败: {e}")
+    return summary
+
+def _map_reduce_summary(transcript):
+    """分段并发概括后汇总，返回汇总调用的回复内容
+
+    各段要点合起来仍然过长时，对要点再分段概括一轮。
+    """
+    text = transcript
+    while True:
+        chunks = split_transcript(text, SUMMARY_CHUNK_TOKENS)
+        print(f"🧩 转写约 {estimate_tokens(text)} tokens，分 {len(chunks)} 段摘要")
+        with ThreadPoolExecutor(max_workers=SUMMARY_MAP_WORKERS) as executor:
+            summaries = list(executor.map(
+                _summarize_chunk, chunks, range(1, len(chunks) + 1), [len(chunks)] * len(chunks)
+            ))
+        text = "\n\n".join(f"第{index}段：{summary}" for index, summary in enumerate(summaries, 1))
+        if len(chunks) == 1 or estimate_tokens(text) <= SUMMARY_CHUNK_TOKENS:
+            break
+    
+    prompt = REDUCE_SUMMARY_PROMPT_TEMPLATE.format(summaries=text)
+    model, _ = route_model(prompt)
+    return _kimi_chat(model, [{"role": "user", "content": prompt}], LLM_TEMPERATURE)
+
+def kimi_summarize_and_classify(transcript, record_id=None):
+    """使用Kimi进行摘要和分类
+
+    按提示词长度路由到能容纳的最小模型；转写超过 SUMMARY_MAX_INPUT_TOKENS 时走分段摘要（map-reduce）。
+    结果按 (转写哈希, 提示词版本, 模型, temperature) 记忆，重复处理不再调用API。
+    返回 (摘要, 分类)；重试后仍调用失败返回 None，记录不入库，下次运行重新处理。
+    """
+    prompt = SUMMARY_PROMPT_TEMPLATE.format(transcript=transcript)
+    model, tokens = route_model(prompt)
+    map_reduce = estimate_tokens(transcript) > SUMMARY_MAX_INPUT_TOKENS
+    prompt_version = MAP_REDUCE_PROMPT_VERSION if map_reduce else SUMMARY_PROMPT_VERSION
+    print(f"🧭 记录 {record_id} 摘要路由: {'分段摘要' if map_reduce else model}（提示词约 {tokens} tokens）")
+    memo = get_llm_memo()
+    memo_key = LLMMemo.make_key(transcript, prompt_version, model, LLM_TEMPERATURE)
+    if memo:
+        try:
+            cached = memo.get(memo_key)
+            if cached:
+                return cached["summary"], cached["phase"]
+        except Exception as e:
+            print(f"⚠️ 读取LLM结果记忆失败: {e}")
+    
+    try:
+        if map_reduce:
+            content = _map_reduce_summary(transcript)
         else:
-            print(f"❌ Kimi LLM失败: {response.status_code} - {response.text}")
-            return "", "其他"
+            content = _kimi_chat(model, [{"role": "user", "content": prompt}], LLM_TEMPERATURE)
     except Exception as e:
         print(f"❌ Kimi LLM异常: {e}")
-        return "", "其他"
+        return None
+    
+    # 解析JSON响应
+    try:
+        parsed = json.loads(content)
+        summary, phase = parsed.get("summary", ""), parsed.get("phase", "其他")
+        well_formed = True
+    except:
+        # 如果JSON解析失败，返回默认值（不记忆，下次重新调用）
+        summary, phase = content[:150], "其他"
+        well_formed = False
+    
+    if memo and summary and well_formed:
+        try:
+            memo.put(memo_key, {"summary": summary, "phase": phase}, model, prompt_version)
+        except Exception as e:
+            print(f"⚠️ 保存LLM结果记忆失败: {e}")
+    return summary, phase
 
-def save_to_database(record_data):
-    """保存到数据库"""
+INSERT_RECORDING_SQL = """
+INSERT INTO recordings (
+    id, meeting_id, start_ts, end_ts, student_ids, 
+    phase, transcript, summary, play_url, download_url
+) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE
+    transcript = VALUES(transcript),
+    summary = VALUES(summary),
+    phase = VALUES(phase)
+"""
+
+UPSERT_STUDENT_STATS_SQL = """
+INSERT INTO student_stats(student_id, record_cnt, total_duration, last_record_at) 
+VALUES(%s, %s, %s, %s) 
+ON DUPLICATE KEY UPDATE
+    record_cnt = record_cnt + VALUES(record_cnt),
+    total_duration = total_duration + VALUES(total_duration),
+    last_record_at = GREATEST(COALESCE(last_record_at, VALUES(last_record_at)), VALUES(last_record_at))
+"""
+
+# 汇总表：按天×分类的记录数、按天×状态的处理日志数（day 为入库日期，与 recordings.created_at 一致）
+UPSERT_DAILY_PHASE_SQL = """
+INSERT INTO daily_phase_stats(day, phase, record_cnt) 
+VALUES(%s, %s, %s) 
+ON DUPLICATE KEY UPDATE record_cnt = record_cnt + VALUES(record_cnt)
+"""
+
+UPSERT_DAILY_STATUS_SQL = """
+INSERT INTO daily_status_stats(day, status, log_cnt) 
+VALUES(%s, %s, %s) 
+ON DUPLICATE KEY UPDATE log_cnt = log_cnt + VALUES(log_cnt)
+"""
+
+INSERT_PROCESS_LOG_SQL = """
+INSERT INTO process_logs(record_id, status, error_message, process_time) 
+VALUES(%s, %s, %s, %s)
+"""
+
+# 数据版本加一（可视化后台的响应缓存据此失效）
+BUMP_DATA_VERSION_SQL = """
+INSERT INTO data_version(name, version) 
+VALUES('recordings', 1) 
+ON DUPLICATE KEY UPDATE version = version + 1
+"""
+
+def _existing_recordings(cursor, record_ids):
+    """锁定并返回已入库记录 {id: (phase, 入库日期)}，重新处理时据此修正汇总表"""
+    if not record_ids:
+        return {}
+    placeholders = ", ".join(["%s"] * len(record_ids))
+    cursor.execute(
+        f"SELECT id, phase, DATE(created_at) FROM recordings WHERE id IN ({placeholders}) FOR UPDATE",
+        list(record_ids)
+    )
+    return {str(row[0]): (row[1], row[2]) for row in cursor.fetchall()}
+
+def write_records(conn, records):
+    """在一个事务内批量写入记录，并同步更新汇总表、处理日志和数据版本
+
+    汇总表（daily_phase_stats、daily_status_stats、student_stats）先在内存中聚合再写入：
+    新记录计入当天；已入库的记录重新处理时只在分类变化时把计数从旧分类移到新分类，
+    学生统计不重复累加。看板读取汇总表，不再扫描 recordings。
+    """
     try:
-        conn = pymysql.connect(**DB_CONFIG, autocommit=True)
         with conn.cursor() as cursor:
-            sql = """
-            INSERT INTO recordings (
-                id, meeting_id, start_ts, end_ts, student_ids, 
-                phase, transcript, summary, play_url, download_url
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-                transcript = VALUES(transcript),
-                summary = VALUES(summary),
-                phase = VALUES(phase)
-            """
+            cursor.execute("SELECT CURDATE()")
+            today = cursor.fetchone()[0]
+            existing = _existing_recordings(cursor, {str(r["id"]) for r in records})
+            phase_counts = Counter()
+            student_counts = Counter()
+            student_durations = Counter()
+            student_last = {}
+            seen = set()
+            for record_data in records:
+                record_id = str(record_data["id"])
+                if record_id in seen:
+                    continue
+                seen.add(record_id)
+                if record_id in existing:
+                    old_phase, day = existing[record_id]
+                    if old_phase != record_data["phase"]:
+                        phase_counts[(day, old_phase)] -= 1
+                        phase_counts[(day, record_data["phase"])] += 1
+                    continue
+                phase_counts[(today, record_data["phase"])] += 1
+                duration = int((record_data["end_ts"] - record_data["start_ts"]).total_seconds())
+                for student_id in record_data["student_ids"]:
+                    student_counts[student_id] += 1
+                    student_durations[student_id] += duration
+                    student_last[student_id] = max(student_last.get(student_id, record_data["start_ts"]),
+                                                   record_data["start_ts"])
             
-            cursor.execute(sql, (
+            cursor.executemany(INSERT_RECORDING_SQL, [(
                 record_data["id"],
                 record_data["meeting_id"],
                 record_data["start_ts"],
@@ -251,55 +581,163 @@ def save_to_database(record_data):
                 record_data["summary"],
                 record_data["play_url"],
                 record_data["download_url"]
-            ))
+            ) for record_data in records])
+            
+            # 处理日志与按天状态汇总
+            cursor.executemany(INSERT_PROCESS_LOG_SQL, [
+                (record_data["id"], 'success', None, None)
+                for record_data in records
+            ])
+            cursor.execute(UPSERT_DAILY_STATUS_SQL, (today, 'success', len(records)))
+            
+            # 按天分类汇总（按键排序写入，并发事务加锁顺序一致）
+            phase_rows = [(day, phase, cnt) for (day, phase), cnt in sorted(phase_counts.items()) if cnt]
+            if phase_rows:
+                cursor.executemany(UPSERT_DAILY_PHASE_SQL, phase_rows)
             
             # 更新学生统计
-            for student_id in record_data["student_ids"]:
-                cursor.execute("""
-                    INSERT INTO student_stats(student_id, record_cnt) 
-                    VALUES(%s, 1) 
-                    ON DUPLICATE KEY UPDATE record_cnt=record_cnt+1
-                """, (student_id,))
-        
-        conn.close()
-        print(f"✅ 记录 {record_data['id']} 已保存到数据库")
-        return True
-    except Exception as e:
-        print(f"❌ 数据库保存异常: {e}")
-        return False
+            if student_counts:
+                cursor.executemany(UPSERT_STUDENT_STATS_SQL, [
+                    (student_id, cnt, student_durations[student_id], student_last[student_id])
+                    for student_id, cnt in sorted(student_counts.items())
+                ])
+            
+            # 最后更新数据版本，缩短热点行的加锁时间
+            cursor.execute(BUMP_DATA_VERSION_SQL)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
 
-def process_record(record_info):
-    """处理单条会议记录"""
-    record_id = record_info["meeting_record_id"]
-    print(f"🔍 处理会议记录: {record_id}")
+class RecordBatchWriter:
+    """批量入库
+
+    add() 收集记录，攒满 batch_size 条或距首条超过 flush_interval 秒时，
+    从共享连接池借出连接，用一个事务写入；flush() 返回本次成功写入的条数。
+    written / failed 为累计写入成功 / 失败的条数，failed_ids 为写入失败的录制ID。
+    """
     
-    # 获取下载地址
-    download_info = get_record_download_url(record_id)
-    if not download_info:
-        print(f"❌ 无法获取记录 {record_id} 的下载地址")
-        return False
+    def __init__(self, batch_size=None, flush_interval=None):
+        self.batch_size = batch_size or DB_BATCH_SIZE
+        self.flush_interval = flush_interval or DB_FLUSH_INTERVAL
+        self._buffer = []
+        self._first_added = None
+        self._lock = threading.Lock()
+        self.written = 0
+        self.failed = 0
+        self.failed_ids = []
     
-    download_url = download_info["record_file_list"][0]["download_url"]
-    play_url = download_info["record_file_list"][0]["play_url"]
+    def add(self, record_data):
+        """加入待写缓冲，需要时触发写入，返回本次写入的条数"""
+        with self._lock:
+            self._buffer.append(record_data)
+            if self._first_added is None:
+                self._first_added = time.time()
+            due = (len(self._buffer) >= self.batch_size or
+                   time.time() - self._first_added >= self.flush_interval)
+        return self.flush() if due else 0
     
-    # 下载并提取音频
-    audio_path = download_and_extract_audio(download_url, record_id)
-    if not audio_path:
-        print(f"❌ 无法处理记录 {record_id} 的音频")
-        return False
+    def write(self, records):
+        """立即在一个事务内写入给定记录，返回与 records 对应的是否成功列表
+
+        整批失败（如某条的分类不在枚举内）时逐条重写，只有出错的记录计为失败。
+        """
+        if not records:
+            return []
+        with self._lock:
+            try:
+                with get_db_manager().connection() as conn:
+                    write_records(conn, records)
+                self.written += len(records)
+                print(f"✅ {len(records)} 条记录已保存到数据库")
+                return [True] * len(records)
+            except Exception as e:
+                if len(records) == 1:
+                    self.failed += 1
+                    self.failed_ids.append(str(records[0]["id"]))
+                    print(f"❌ 记录 {records[0]['id']} 保存异常: {e}")
+                    return [False]
+                print(f"⚠️ 批量保存 {len(records)} 条失败，逐条重试: {e}")
+            
+            results = []
+            for record_data in records:
+                try:
+                    with get_db_manager().connection() as conn:
+                        write_records(conn, [record_data])
+                    self.written += 1
+                    results.append(True)
+                except Exception as e:
+                    self.failed += 1
+                    self.failed_ids.append(str(record_data["id"]))
+                    print(f"❌ 记录 {record_data['id']} 保存异常: {e}")
+                    results.append(False)
+            print(f"✅ 逐条重试保存 {sum(results)}/{len(records)} 条记录")
+            return results
     
-    # 语音转写
-    transcript = kimi_asr_transcribe(audio_path)
-    if not transcript:
-        print(f"❌ 无法转写记录 {record_id} 的音频")
-        return False
+    def flush(self):
+        """写入缓冲中的全部记录，返回成功写入的条数"""
+        with self._lock:
+            batch, self._buffer, self._first_added = self._buffer, [], None
+        return sum(self.write(batch))
     
-    # 摘要和分类
-    summary, phase = kimi_summarize_and_classify(transcript)
+    def close(self):
+        """写入剩余记录，返回最后一次写入的条数"""
+        return self.flush()
+
+def save_to_database(record_data):
+    """保存单条记录到数据库"""
+    writer = RecordBatchWriter()
+    try:
+        return all(writer.write([record_data]))
+    finally:
+        writer.close()
+
+def fetch_stored_ids(record_ids):
+    """一次查询返回已入库的录制ID集合"""
+    if not record_ids:
+        return set()
+    placeholders = ", ".join(["%s"] * len(record_ids))
+    with get_db_manager().connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(f"SELECT id FROM recordings WHERE id IN ({placeholders})", list(record_ids))
+            return {str(row[0]) for row in cursor.fetchall()}
+
+class StoredRecordFilter:
+    """下载前过滤已入库的录制
+
+    默认每页一次 WHERE id IN (...) 查询；preload 时启动时把全部已入库ID读入内存，
+    之后不再查库（适合大批量回填）。
+    """
     
-    # 准备数据
-    record_data = {
-        "id": record_id,
+    def __init__(self, preload=None):
+        preload = STORED_ID_PRELOAD if preload is None else preload
+        self._ids = self._load_all() if preload else None
+    
+    @staticmethod
+    def _load_all():
+        with get_db_manager().connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT id FROM recordings")
+                ids = {str(row[0]) for row in cursor.fetchall()}
+        print(f"📥 已加载已入库录制ID {len(ids)} 个")
+        return ids
+    
+    def filter(self, records):
+        """返回 (未入库的记录列表, 跳过条数)"""
+        ids = [str(r["meeting_record_id"]) for r in records]
+        if self._ids is not None:
+            stored = self._ids.intersection(ids)
+        else:
+            stored = fetch_stored_ids(ids)
+        if not stored:
+            return records, 0
+        print(f"⏭️ 跳过已入库记录 {len(stored)} 条")
+        return [r for r in records if str(r["meeting_record_id"]) not in stored], len(stored)
+
+def build_record_data(record_info, download_url, play_url, transcript, summary, phase):
+    """组装入库数据"""
+    return {
+        "id": record_info["meeting_record_id"],
         "meeting_id": record_info["meeting_id"],
         "start_ts": datetime.fromtimestamp(record_info["start_time"]),
         "end_ts": datetime.fromtimestamp(record_info["end_time"]),
@@ -310,61 +748,631 @@ def process_record(record_info):
         "play_url": play_url,
         "download_url": download_url
     }
+
+def prepare_record(record_info):
+    """处理单条会议记录直到可入库，返回入库数据，失败返回None"""
+    record_id = record_info["meeting_record_id"]
+    print(f"🔍 处理会议记录: {record_id}")
+    
+    # 获取下载地址（_prefetch_addresses 已并发获取的直接复用）
+    download_info = record_info.get("address") or get_record_download_url(record_id)
+    if not download_info:
+        print(f"❌ 无法获取记录 {record_id} 的下载地址")
+        return None
+    
+    download_url = download_info["record_file_list"][0]["download_url"]
+    play_url = download_info["record_file_list"][0]["play_url"]
+    
+    # 下载、提取音频并转写；转写完成后临时目录即删除
+    with reserve_scratch(record_info, download_info) as scratch:
+        audio_path = download_and_extract_audio(download_url, record_id, scratch)
+        if not audio_path:
+            print(f"❌ 无法处理记录 {record_id} 的音频")
+            return None
+        
+        # 语音转写
+        transcript = kimi_asr_transcribe(audio_path)
+    if not transcript:
+        print(f"❌ 无法转写记录 {record_id} 的音频")
+        return None
     
-    # 保存到数据库
+    # 摘要和分类
+    result = kimi_summarize_and_classify(transcript, record_id)
+    if not result:
+        print(f"❌ 无法生成记录 {record_id} 的摘要")
+        return None
+    summary, phase = result
+    
+    # 准备数据
+    return build_record_data(record_info, download_url, play_url, transcript, summary, phase)
+
+def process_record(record_info):
+    """处理单条会议记录并保存"""
+    record_data = prepare_record(record_info)
+    if not record_data:
+        return False
     return save_to_database(record_data)
 
-def run_batch_processing(start_time, end_time):
-    """批量处理会议记录"""
-    print(f"🚀 开始批量处理: {datetime.fromtimestamp(start_time)} - {datetime.fromtimestamp(end_time)}")
+def _safe_prepare_record(record_info):
+    """处理单条记录，异常计为失败而不中断整批"""
+    try:
+        return prepare_record(record_info)
+    except Exception as e:
+        print(f"❌ 处理记录 {record_info.get('meeting_record_id')} 异常: {e}")
+        return None
+
+def run_batch_processing(start_time, end_time, workers=None, force=False):
+    """批量处理会议记录
+
+    workers > 1 时使用有界线程池并发处理，在途记录数不超过 workers，
+    长录制只占用一个工作线程，不会阻塞后续记录和翻页。
+    处理完的记录由 RecordBatchWriter 攒批，每页（或每 DB_BATCH_SIZE 条）一个事务写入。
+    每页先批量查库跳过已入库的录制，force 时不跳过（重新处理）；剩下的录制用异步客户端并发获取下载地址。
+    
+    返回 {"processed", "failed", "failed_ids", "skipped", "complete"}，complete 表示列表已完整翻完，
+    failed_ids 为处理或写入失败的录制ID。
+    """
+    workers = max(1, workers or WORKER_COUNT)
+    print(f"🚀 开始批量处理: {datetime.fromtimestamp(start_time)} - {datetime.fromtimestamp(end_time)} (并发数: {workers})")
     
     page = 1
-    total_processed = 0
+    failed_ids = []
+    total_skipped = 0
+    complete = False
     
-    while True:
-        print(f"📄 处理第 {page} 页...")
+    writer = RecordBatchWriter()
+    stored_filter = None if force else StoredRecordFilter()
+    executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+    pending = set()
+    pending_ids = {}
+    
+    def accept(record_id, record_data):
+        if record_data:
+            writer.add(record_data)
+        else:
+            failed_ids.append(str(record_id))
+    
+    def collect(futures):
+        for future in futures:
+            accept(pending_ids.pop(future), future.result())
+    
+    try:
+        while True:
+            print(f"📄 处理第 {page} 页...")
+            
+            records_data = list_meeting_records(start_time, end_time, page, 50)
+            if not records_data:
+                print("❌ 无法获取会议记录列表")
+                break
+            
+            records = records_data.get("records", [])
+            if not records:
+                print("📭 没有更多记录")
+                complete = True
+                break
+            
+            if stored_filter:
+                records, skipped = stored_filter.filter(records)
+                total_skipped += skipped
+            
+            # 整页下载地址并发获取，处理时不再逐条阻塞请求
+            _prefetch_addresses(records)
+            
+            for record in records:
+                if executor is None:
+                    accept(record["meeting_record_id"], _safe_prepare_record(record))
+                    continue
+                
+                # 在途任务达到上限时等待任意一个完成（背压）
+                while len(pending) >= workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+                future = executor.submit(_safe_prepare_record, record)
+                pending_ids[future] = record["meeting_record_id"]
+                pending.add(future)
+            
+            # 每页结束写入一次
+            writer.flush()
+            
+            # 检查是否还有更多页
+            total_pages = records_data.get("total_pages", 1)
+            if page >= total_pages:
+                complete = True
+                break
+            page += 1
         
-        records_data = list_meeting_records(start_time, end_time, page, 50)
-        if not records_data:
+        # 等待剩余任务完成
+        if pending:
+            done, pending = wait(pending)
+            collect(done)
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True)
+        writer.close()
+    
+    # 写入成功的计为已处理，写入失败的记录计为失败
+    total_processed = writer.written
+    failed_ids += writer.failed_ids
+    total_failed = len(failed_ids)
+    print(f"✅ 批量处理完成，共处理 {total_processed} 条记录，失败 {total_failed} 条，跳过 {total_skipped} 条")
+    print(f"📦 转写缓存: {get_transcript_cache().stats()}")
+    if get_llm_memo():
+        print(f"📦 LLM结果记忆: {get_llm_memo().stats()}")
+    print(f"🚦 接口限流: {limiter_stats()}")
+    print(f"🔌 服务熔断: {breaker_stats()}")
+    return {
+        "processed": total_processed,
+        "failed": total_failed,
+        "failed_ids": failed_ids,
+        "skipped": total_skipped,
+        "complete": complete
+    }
+
+# ---------------------------------------------------------------------------
+# 流水线模式：process_record 拆成多个阶段，阶段间用有界队列连接
+# 每个阶段的条目是一个 dict，至少包含 "record"（列表接口返回的原始记录）；
+# 以 "_" 开头的键是进程内对象（如临时空间预留），不落库
+# ---------------------------------------------------------------------------
+
+# 各阶段并发数
+PIPELINE_CONFIG = {
+    'address_workers': int(os.getenv('PIPELINE_ADDRESS_WORKERS', 4)),
+    'download_workers': int(os.getenv('PIPELINE_DOWNLOAD_WORKERS', 8)),
+    'ffmpeg_workers': int(os.getenv('PIPELINE_FFMPEG_WORKERS', 2)),
+    'asr_workers': int(os.getenv('PIPELINE_ASR_WORKERS', 4)),
+    'llm_workers': int(os.getenv('PIPELINE_LLM_WORKERS', 4)),
+    'db_batch_size': int(os.getenv('PIPELINE_DB_BATCH_SIZE', 20)),
+    'queue_size': int(os.getenv('PIPELINE_QUEUE_SIZE', 4)),
+}
+
+def stage_resolve_address(item):
+    """阶段1：获取下载地址"""
+    record_id = item["record"]["meeting_record_id"]
+    download_info = item["record"].get("address") or get_record_download_url(record_id)
+    if not download_info or not download_info.get("record_file_list"):
+        print(f"❌ 无法获取记录 {record_id} 的下载地址")
+        return None
+    item["download_url"] = download_info["record_file_list"][0]["download_url"]
+    item["play_url"] = download_info["record_file_list"][0]["play_url"]
+    item["file_size"] = download_info["record_file_list"][0].get("file_size")
+    return item
+
+def stage_download(item):
+    """阶段2：预留临时空间并下载录制文件
+
+    stream 模式下在本阶段直接流式拉取音频（不落盘MP4），因此两种模式的并发下载数
+    都由 PIPELINE_DOWNLOAD_WORKERS 控制。临时空间不足时在此阻塞，磁盘占用不超过 SCRATCH_BUDGET_BYTES。
+    """
+    download_info = {"record_file_list": [{"file_size": item.get("file_size")}]}
+    scratch = item["_scratch"] = reserve_scratch(item["record"], download_info)
+    record_id = item["record"]["meeting_record_id"]
+    if AUDIO_FETCH_MODE == 'stream':
+        item["mp4_path"] = None
+        item["audio_path"] = download_and_extract_audio(item["download_url"], record_id, scratch)
+        return item if item["audio_path"] else None
+    item["mp4_path"] = download_video(item["download_url"], record_id, scratch.dir)
+    return item if item["mp4_path"] else None
+
+def stage_extract_audio(item):
+    """阶段3：从MP4提取音频，完成后删除MP4（stream 模式下下载阶段已产出音频，直接放行）"""
+    if not item["mp4_path"]:
+        return item
+    item["audio_path"] = extract_audio(item["mp4_path"])
+    _discard_scratch_file(item.get("_scratch"), item["mp4_path"])
+    item["mp4_path"] = None
+    return item if item["audio_path"] else None
+
+def stage_transcribe(item):
+    """阶段4：语音转写，完成后（无论成败）删除临时目录"""
+    try:
+        item["transcript"] = kimi_asr_transcribe(item["audio_path"])
+    finally:
+        release_item_scratch(item)
+    if not item["transcript"]:
+        print(f"❌ 无法转写记录 {item['record']['meeting_record_id']} 的音频")
+        return None
+    return item
+
+def stage_summarize(item):
+    """阶段5：摘要和分类"""
+    result = kimi_summarize_and_classify(item["transcript"], item["record"]["meeting_record_id"])
+    if not result:
+        print(f"❌ 无法生成记录 {item['record']['meeting_record_id']} 的摘要")
+        return None
+    item["summary"], item["phase"] = result
+    return item
+
+def stage_store(items):
+    """阶段6：批量入库（一个事务写入整批，失败时逐条重写，只丢弃出错的记录）"""
+    records = [build_record_data(
+        item["record"], item["download_url"], item["play_url"],
+        item["transcript"], item["summary"], item["phase"]
+    ) for item in items]
+    
+    writer = _get_stage_writer()
+    results = writer.write(records)
+    return [item if ok else None for item, ok in zip(items, results)]
+
+def release_item_scratch(item):
+    """释放条目占用的临时空间（失败的条目也需调用）"""
+    scratch = item.pop("_scratch", None)
+    if scratch:
+        scratch.close()
+
+_stage_writer = None
+_stage_writer_lock = threading.Lock()
+
+def _get_stage_writer():
+    """流水线/任务队列入库阶段共用的写入器"""
+    global _stage_writer
+    with _stage_writer_lock:
+        if _stage_writer is None:
+            _stage_writer = RecordBatchWriter()
+        return _stage_writer
+
+def build_record_pipeline(config=None):
+    """按配置创建处理流水线"""
+    from pipeline import Stage, StagedPipeline
+    
+    config = {**PIPELINE_CONFIG, **(config or {})}
+    queue_size = config['queue_size']
+    return StagedPipeline([
+        Stage("address", stage_resolve_address, config['address_workers'], queue_size),
+        Stage("download", stage_download, config['download_workers'], queue_size),
+        Stage("ffmpeg", stage_extract_audio, config['ffmpeg_workers'], queue_size),
+        Stage("asr", stage_transcribe, config['asr_workers'], queue_size),
+        Stage("llm", stage_summarize, config['llm_workers'], queue_size),
+        Stage("db", stage_store, 1, queue_size, batch_size=config['db_batch_size']),
+    ], on_failure=release_item_scratch)
+
+def fetch_all_meeting_records(start_time, end_time):
+    """用异步客户端并发列出时间范围内的全部录制，任一页失败返回None"""
+    from meeting_api import fetch_all_records
+    
+    print("📄 并发列出全部录制...")
+    try:
+        records = fetch_all_records(start_time, end_time, 50)
+    except Exception as e:
+        print(f"❌ 获取会议记录异常: {e}")
+        return None
+    if records is not None:
+        print(f"📋 共列出 {len(records)} 条录制")
+    return records
+
+def _prefetch_addresses(records):
+    """用异步客户端并发获取一批录制的下载地址，放入记录的 "address" 字段
+
+    stage_resolve_address / prepare_record 直接复用；获取失败的记录处理时再单独获取。
+    """
+    from meeting_api import fetch_record_addresses
+    
+    if not records:
+        return
+    try:
+        addresses = fetch_record_addresses([r["meeting_record_id"] for r in records])
+    except Exception as e:
+        print(f"⚠️ 并发获取下载地址失败，处理时逐条获取: {e}")
+        return
+    for record in records:
+        address = addresses.get(record["meeting_record_id"])
+        if address:
+            record["address"] = address
+
+def run_pipeline_processing(start_time, end_time, config=None, force=False):
+    """流水线模式批量处理会议记录（已入库的录制不进入流水线，force 时除外）
+
+    全部页并发列出；每 50 条为一组并发获取下载地址后送入流水线，
+    流水线满时 submit 阻塞，下载地址在即将处理时才获取，不会提前过期。
+    """
+    print(f"🚀 开始流水线处理: {datetime.fromtimestamp(start_time)} - {datetime.fromtimestamp(end_time)}")
+    
+    stored_filter = None if force else StoredRecordFilter()
+    pipeline = build_record_pipeline(config)
+    total_skipped = 0
+    
+    try:
+        records = fetch_all_meeting_records(start_time, end_time)
+        if records is None:
             print("❌ 无法获取会议记录列表")
-            break
-        
-        records = records_data.get("records", [])
-        if not records:
+            records = []
+        elif not records:
             print("📭 没有更多记录")
-            break
         
-        for record in records:
-            if process_record(record):
-                total_processed += 1
+        for offset in range(0, len(records), 50):
+            group = records[offset:offset + 50]
+            if stored_filter:
+                group, skipped = stored_filter.filter(group)
+                total_skipped += skipped
+            
+            _prefetch_addresses(group)
+            for record in group:
+                pipeline.submit({"record": record})
+    finally:
+        total_processed, total_failed = pipeline.close()
+    
+    for name, stats in pipeline.stats().items():
+        print(f"   - {name}: 成功 {stats['succeeded']}，失败 {stats['failed']}")
+    print(f"✅ 流水线处理完成，共处理 {total_processed} 条记录，失败 {total_failed} 条，跳过 {total_skipped} 条")
+    print(f"📦 转写缓存: {get_transcript_cache().stats()}")
+    if get_llm_memo():
+        print(f"📦 LLM结果记忆: {get_llm_memo().stats()}")
+    print(f"🚦 接口限流: {limiter_stats()}")
+    print(f"🔌 服务熔断: {breaker_stats()}")
+    return total_processed
+
+# ---------------------------------------------------------------------------
+# 持久化任务队列模式：每条录制的处理进度落库，重启后从中断处继续
+# ---------------------------------------------------------------------------
+
+def _job_fetch_audio(item):
+    """任务阶段：下载并提取音频"""
+    item = stage_download(item)
+    return stage_extract_audio(item) if item else None
+
+def _job_store(item):
+    """任务阶段：入库"""
+    return stage_store([item])[0]
+
+# (起始状态, 处理函数, 完成后的状态, 失败后重试的起始状态)
+# 下载失败时从 listed 重试，重新获取可能已过期的下载地址
+JOB_TRANSITIONS = [
+    ('listed', stage_resolve_address, 'address_resolved', 'listed'),
+    ('address_resolved', _job_fetch_audio, 'downloaded', 'listed'),
+    ('downloaded', stage_transcribe, 'transcribed', 'downloaded'),
+    ('transcribed', stage_summarize, 'summarized', 'transcribed'),
+    ('summarized', _job_store, 'stored', 'summarized'),
+]
+
+def _job_payload(item):
+    """落库的阶段产出：去掉原始记录和进程内对象"""
+    return {k: v for k, v in item.items() if k != "record" and not k.startswith("_")}
+
+def process_job(queue, job):
+    """按状态机推进单个任务，每完成一个阶段落库一次"""
+    from job_queue import JOB_STATES
+    
+    record_id = job["record_id"]
+    item = {"record": job["record_info"], **job["payload"]}
+    state = job["state"]
+    
+    # 音频文件不在了（转写失败后已删除、换机器或被清理）则从头获取
+    if state == 'downloaded' and not os.path.exists(item.get("audio_path") or ""):
+        state = 'listed'
+    
+    print(f"🔍 处理任务 {record_id}（状态: {state}，已失败 {job['attempts']} 次）")
+    for from_state, func, to_state, retry_state in JOB_TRANSITIONS:
+        if JOB_STATES.index(state) > JOB_STATES.index(from_state):
+            continue
         
-        # 检查是否还有更多页
-        total_pages = records_data.get("total_pages", 1)
-        if page >= total_pages:
-            break
-        page += 1
+        error = f"阶段 {from_state} → {to_state} 失败"
+        try:
+            result = func(item)
+        except Exception as e:
+            result, error = None, f"{error}: {e}"
+        
+        payload = _job_payload(item)
+        if result is None:
+            print(f"❌ 任务 {record_id} {error}")
+            release_item_scratch(item)
+            queue.fail(record_id, retry_state, error, payload)
+            return False
+        
+        item = result
+        payload = _job_payload(item)
+        if to_state == 'stored':
+            queue.complete(record_id, payload)
+        else:
+            queue.advance(record_id, to_state, payload)
+        state = to_state
+    return True
+
+def _run_job_worker(queue, worker_id, results):
+    """工作线程：循环领取任务直到没有可处理的任务
+
+    领取为空时先做一次不加锁的计数：仍有租约空闲的任务说明正被其他线程锁住或处于失败退避中，稍后重试。
+    """
+    from job_queue import JOB_CLAIM_RETRY_DELAY
     
-    print(f"✅ 批量处理完成，共处理 {total_processed} 条记录")
+    while True:
+        jobs = queue.claim(worker_id)
+        if not jobs:
+            if not queue.claimable_count():
+                return
+            time.sleep(JOB_CLAIM_RETRY_DELAY)
+            continue
+        for job in jobs:
+            try:
+                ok = process_job(queue, job)
+            except Exception as e:
+                print(f"❌ 任务 {job['record_id']} 异常: {e}")
+                queue.fail(job["record_id"], job["state"], e)
+                ok = False
+            results.append(ok)
 
-def run_incremental_processing():
-    """增量处理（处理昨天的记录）"""
-    yesterday = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=1)
-    today = yesterday + timedelta(days=1)
+def run_queue_processing(start_time, end_time, workers=None, range_key=None, force=False):
+    """基于持久化任务队列的批量处理
+
+    先用异步客户端并发列出时间范围内的全部录制并登记为任务（列完后落库标记），再由工作线程领取处理。
+    同一 range_key 重启时沿用首次运行的结束时间；列表未完整获取时重新列出，未完成的任务继续。
+    已入库的录制不登记任务；force 时全部登记，并把已有任务重置为 listed 重新处理。
+    下载地址有时效，不在登记时获取，由工作线程处理到该任务时获取。
+    """
+    from job_queue import JobQueue, default_worker_id
+    
+    workers = max(1, workers or WORKER_COUNT)
+    queue = JobQueue(get_db_manager())
+    # 上次崩溃遗留在本机的租约立即收回，重启后从中断处继续
+    queue.release_dead_leases()
+    stored_filter = None if force else StoredRecordFilter()
+    range_key = range_key or f"{start_time}-{end_time}"
+    
+    cursor = queue.get_cursor(range_key)
+    if cursor:
+        start_time, end_time = cursor["start_time"], cursor["end_time"]
+        done = cursor["done"]
+        print(f"♻️ 恢复任务 {range_key}（已列完: {done}）")
+    else:
+        done = False
+        # 先落库时间范围，列表获取失败后重跑也沿用本次的结束时间
+        queue.save_cursor(range_key, start_time, end_time, False)
+    
+    print(f"🚀 开始队列处理: {datetime.fromtimestamp(start_time)} - {datetime.fromtimestamp(end_time)} (并发数: {workers})")
     
-    start_time = int(yesterday.timestamp())
-    end_time = int(today.timestamp())
+    # 1. 列出录制并登记任务
+    if not done:
+        records = fetch_all_meeting_records(start_time, end_time)
+        if records is None:
+            print("❌ 无法获取会议记录列表，先处理已登记的任务")
+        else:
+            for offset in range(0, len(records), 50):
+                group = records[offset:offset + 50]
+                if stored_filter:
+                    group, _ = stored_filter.filter(group)
+                queue.enqueue(group, reset=force)
+            queue.save_cursor(range_key, start_time, end_time, True)
+    
+    # 2. 工作线程领取任务处理
+    results = []
+    threads = [
+        threading.Thread(target=_run_job_worker, args=(queue, default_worker_id(f"-{n}"), results))
+        for n in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
     
-    print(f"📅 增量处理: {yesterday.date()}")
-    run_batch_processing(start_time, end_time)
+    total_processed = sum(1 for ok in results if ok)
+    print(f"✅ 队列处理完成，本次成功 {total_processed} 条，失败 {len(results) - total_processed} 条")
+    print(f"📊 任务状态: {queue.counts()}")
+    return total_processed
+
+# ---------------------------------------------------------------------------
+# 增量同步水位线：每次从 (上次水位线 - 重叠窗口) 处理到当前时间，成功后才推进
+# ---------------------------------------------------------------------------
+
+SYNC_OVERLAP_SECONDS = int(os.getenv('SYNC_OVERLAP_SECONDS', 12 * 3600))  # 重叠窗口，覆盖晚上传的录制
+INCREMENTAL_MAX_ATTEMPTS = int(os.getenv('INCREMENTAL_MAX_ATTEMPTS', 3))   # 单条录制累计失败多少次后不再阻塞水位线
+
+_CREATE_SYNC_STATE_SQL = """
+CREATE TABLE IF NOT EXISTS sync_state (
+    name VARCHAR(64) PRIMARY KEY,
+    watermark BIGINT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
+_CREATE_SYNC_FAILURES_SQL = """
+CREATE TABLE IF NOT EXISTS sync_failures (
+    name VARCHAR(64) NOT NULL,
+    record_id BIGINT NOT NULL,
+    attempts INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (name, record_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
+def record_sync_failures(name, failed_ids):
+    """累计本次失败录制的失败次数，清除已入库录制的失败记录，返回 {录制ID: 累计失败次数}"""
+    with get_db_manager().connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(_CREATE_SYNC_FAILURES_SQL)
+            cursor.execute("""
+                DELETE f FROM sync_failures f JOIN recordings r ON r.id = f.record_id
+                WHERE f.name = %s
+            """, (name,))
+            attempts = {}
+            record_ids = sorted(set(failed_ids))
+            if record_ids:
+                cursor.executemany("""
+                    INSERT INTO sync_failures (name, record_id, attempts) VALUES (%s, %s, 1)
+                    ON DUPLICATE KEY UPDATE attempts = attempts + 1
+                """, [(name, record_id) for record_id in record_ids])
+                placeholders = ", ".join(["%s"] * len(record_ids))
+                cursor.execute(
+                    f"SELECT record_id, attempts FROM sync_failures WHERE name = %s AND record_id IN ({placeholders})",
+                    [name, *record_ids]
+                )
+                attempts = {str(record_id): cnt for record_id, cnt in cursor.fetchall()}
+        conn.commit()
+    return attempts
+
+def load_watermark(name):
+    """读取同步水位线（时间戳），不存在返回None"""
+    with get_db_manager().connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(_CREATE_SYNC_STATE_SQL)
+            cursor.execute("SELECT watermark FROM sync_state WHERE name = %s", (name,))
+            row = cursor.fetchone()
+    return row[0] if row else None
+
+def save_watermark(name, watermark):
+    """保存同步水位线"""
+    with get_db_manager().connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(_CREATE_SYNC_STATE_SQL)
+            cursor.execute("""
+                INSERT INTO sync_state (name, watermark) VALUES (%s, %s)
+                ON DUPLICATE KEY UPDATE watermark = VALUES(watermark)
+            """, (name, watermark))
+        conn.commit()
+
+def run_incremental_processing(workers=None, name="incremental", force=False):
+    """增量处理
+
+    从 (上次水位线 - SYNC_OVERLAP_SECONDS) 处理到当前时间，已入库的录制直接跳过；
+    列表完整翻完且没有失败时才把水位线推进到本次结束时间，否则下次从原水位线重试。
+    每条录制的失败次数记在 sync_failures，累计失败达到 INCREMENTAL_MAX_ATTEMPTS 次的录制
+    不再阻塞水位线（记录保留，便于排查后用指定时间范围重跑）。
+    首次运行（没有水位线）从昨天0点开始。可以安全地每小时运行。
+    """
+    end_time = int(time.time())
+    watermark = load_watermark(name)
+    if watermark is None:
+        yesterday = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=1)
+        start_time = int(yesterday.timestamp())
+    else:
+        start_time = watermark - SYNC_OVERLAP_SECONDS
+    
+    print(f"📅 增量处理: {datetime.fromtimestamp(start_time)} - {datetime.fromtimestamp(end_time)}"
+          f"（水位线: {datetime.fromtimestamp(watermark) if watermark else '无'}）")
+    result = run_batch_processing(start_time, end_time, workers=workers, force=force)
+    
+    attempts = record_sync_failures(name, result["failed_ids"])
+    blocking = [record_id for record_id, cnt in attempts.items() if cnt < INCREMENTAL_MAX_ATTEMPTS]
+    given_up = sorted(set(attempts) - set(blocking))
+    if given_up:
+        print(f"⚠️ {len(given_up)} 条录制已失败 {INCREMENTAL_MAX_ATTEMPTS} 次以上，不再阻塞水位线: {', '.join(given_up)}")
+    
+    if result["complete"] and not blocking:
+        save_watermark(name, end_time)
+        print(f"🔖 水位线推进到 {datetime.fromtimestamp(end_time)}")
+    else:
+        print("⚠️ 本次未完整成功，水位线保持不变，下次运行将重试")
+    return result
 
 if __name__ == "__main__":
-    import sys
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="会议记录处理系统")
+    parser.add_argument("start_time", nargs="?", type=int, help="开始时间戳（不指定则增量处理昨天的记录）")
+    parser.add_argument("end_time", nargs="?", type=int, help="结束时间戳")
+    parser.add_argument("--workers", type=int, default=WORKER_COUNT, help="并发处理的记录数，默认读取 WORKER_COUNT")
+    parser.add_argument("--pipeline", action="store_true", help="使用分阶段流水线模式（各阶段并发数见 PIPELINE_* 环境变量）")
+    parser.add_argument("--queue", action="store_true", help="使用持久化任务队列模式，中断后重新运行可从断点继续")
+    parser.add_argument("--force", action="store_true", help="不跳过已入库的录制，全部重新处理")
+    args = parser.parse_args()
+    
+    # 启动时清理上次崩溃遗留的临时文件
+    get_scratch_space()
     
-    if len(sys.argv) > 2:
+    if args.start_time is not None and args.end_time is not None and args.queue:
+        run_queue_processing(args.start_time, args.end_time, workers=args.workers, force=args.force)
+    elif args.start_time is not None and args.end_time is not None and args.pipeline:
+        run_pipeline_processing(args.start_time, args.end_time, force=args.force)
+    elif args.start_time is not None and args.end_time is not None:
         # 指定时间范围
-        start_time = int(sys.argv[1])
-        end_time = int(sys.argv[2])
-        run_batch_processing(start_time, end_time)
+        run_batch_processing(args.start_time, args.end_time, workers=args.workers, force=args.force)
     else:
         # 增量处理
-        run_incremental_processing() 
\ No newline at end of file
+        run_incremental_processing(workers=args.workers, force=args.force)
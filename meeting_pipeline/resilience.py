@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+外部调用的重试与熔断
+- 重试：指数退避 + 随机抖动，只重试可重试的错误（网络异常、超时、429、5xx）；
+  429 带 Retry-After 时至少等待该时长。这是唯一的重试层，限流器（rate_limit.py）不重试
+- 熔断：每个服务一个熔断器，连续失败达到阈值后打开；打开期间调用方等待而不是失败，
+  冷却后放行一个探测请求，成功即恢复。服务整体不可用时流水线暂停，而不是把积压全部记为失败。
+"""
+
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from functools import wraps
+
+import requests
+from dotenv import load_dotenv
+
+# 加载环境变量
+load_dotenv()
+
+# 重试配置
+RETRY_MAX_ATTEMPTS = int(os.getenv('RETRY_MAX_ATTEMPTS', 4))
+RETRY_BASE_DELAY = float(os.getenv('RETRY_BASE_DELAY', 1))     # 首次重试的最长等待(秒)
+RETRY_MAX_DELAY = float(os.getenv('RETRY_MAX_DELAY', 30))      # 单次等待上限(秒)
+
+# 熔断配置
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('BREAKER_FAILURE_THRESHOLD', 5))  # 连续失败多少次后熔断
+BREAKER_RESET_SECONDS = float(os.getenv('BREAKER_RESET_SECONDS', 60))      # 熔断后多久放行探测请求
+BREAKER_MAX_WAIT = float(os.getenv('BREAKER_MAX_WAIT', 1800))              # 调用方最长等待恢复的时间(秒)
+
+
+class RetryableError(Exception):
+    """可重试的错误（429、5xx 等）；retry_after 为服务端要求的最短等待秒数"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class PermanentError(Exception):
+    """重试也不会成功的错误（4xx、签名错误、响应格式错误等）"""
+
+
+class CircuitOpenError(Exception):
+    """熔断器在 BREAKER_MAX_WAIT 内未恢复"""
+
+
+def is_retryable(error):
+    """错误分类：网络异常、超时和 RetryableError 可重试，其余不重试"""
+    if isinstance(error, PermanentError):
+        return False
+    return isinstance(error, (
+        RetryableError,
+        requests.ConnectionError,
+        requests.Timeout,
+        ConnectionError,
+        TimeoutError,
+    ))
+
+
+def parse_retry_after(value):
+    """解析 Retry-After（秒数或HTTP日期），无法解析返回None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def check_response(response, what):
+    """按状态码抛出对应错误：429/5xx 为 RetryableError（带 Retry-After），其余非200为 PermanentError"""
+    if response.status_code == 200:
+        return response
+    message = f"{what}失败: {response.status_code} - {response.text[:500]}"
+    if response.status_code == 429 or response.status_code >= 500:
+        raise RetryableError(message, parse_retry_after(response.headers.get('Retry-After')))
+    raise PermanentError(message)
+
+
+class RetryPolicy:
+    """指数退避 + 全抖动：第 n 次重试等待 [0, min(max_delay, base_delay * 2^(n-1))] 内的随机时长
+
+    服务端给出 Retry-After 时至少等待该时长。
+    """
+
+    def __init__(self, max_attempts=None, base_delay=None, max_delay=None):
+        self.max_attempts = max(1, max_attempts or RETRY_MAX_ATTEMPTS)
+        self.base_delay = RETRY_BASE_DELAY if base_delay is None else base_delay
+        self.max_delay = RETRY_MAX_DELAY if max_delay is None else max_delay
+
+    def delay(self, attempt, retry_after=None):
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+
+class CircuitBreaker:
+    """单个服务的熔断器
+
+    closed：正常放行；连续 failure_threshold 次可重试错误后转为 open。
+    open：调用方在 before_call() 中等待，reset_seconds 后转为 half_open。
+    half_open：只放行一个探测请求，成功回到 closed，失败重新 open。
+    """
+
+    def __init__(self, name, failure_threshold=None, reset_seconds=None, max_wait=None):
+        self.name = name
+        self.failure_threshold = failure_threshold or BREAKER_FAILURE_THRESHOLD
+        self.reset_seconds = reset_seconds or BREAKER_RESET_SECONDS
+        self.max_wait = max_wait or BREAKER_MAX_WAIT
+        self.state = 'closed'
+        self.failures = 0
+        self.opened = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._cond = threading.Condition()
+
+    def before_call(self):
+        """熔断期间阻塞等待，超过 max_wait 抛 CircuitOpenError"""
+        deadline = time.monotonic() + self.max_wait
+        with self._cond:
+            while True:
+                if self.state == 'closed':
+                    return
+                now = time.monotonic()
+                if self.state == 'open' and now - self._opened_at >= self.reset_seconds:
+                    self.state = 'half_open'
+                if self.state == 'half_open' and not self._probing:
+                    self._probing = True
+                    return
+                if now >= deadline:
+                    raise CircuitOpenError(f"{self.name} 熔断中，等待 {self.max_wait:.0f} 秒仍未恢复")
+                wake = deadline
+                if self.state == 'open':
+                    wake = min(deadline, self._opened_at + self.reset_seconds)
+                self._cond.wait(max(0.01, wake - now))
+
+    def record_success(self):
+        with self._cond:
+            if self.state != 'closed':
+                print(f"✅ {self.name} 已恢复，关闭熔断")
+            self.state = 'closed'
+            self.failures = 0
+            self._probing = False
+            self._cond.notify_all()
+
+    def record_failure(self):
+        with self._cond:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    self.opened += 1
+                    print(f"🔌 {self.name} 连续失败 {self.failures} 次，熔断 {self.reset_seconds:.0f} 秒")
+                self.state = 'open'
+                self._opened_at = time.monotonic()
+            self._probing = False
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {'state': self.state, 'failures': self.failures, 'opened': self.opened}
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(service):
+    """进程内共享的服务熔断器"""
+    with _breakers_lock:
+        breaker = _breakers.get(service)
+        if breaker is None:
+            breaker = CircuitBreaker(service)
+            _breakers[service] = breaker
+        return breaker
+
+
+def call_with_retry(service, func, *args, policy=None, **kwargs):
+    """经熔断器调用 func，可重试的错误按 policy 退避重试，最终失败抛出最后一次的异常"""
+    policy = policy or RetryPolicy()
+    breaker = get_breaker(service)
+    for attempt in range(1, policy.max_attempts + 1):
+        breaker.before_call()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            if not is_retryable(e):
+                # 服务有响应，只是这次请求本身有问题，不计入熔断
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            if attempt == policy.max_attempts:
+                raise
+            delay = policy.delay(attempt, getattr(e, 'retry_after', None))
+            print(f"⚠️ {service} 第 {attempt} 次调用失败，{delay:.1f}秒后重试: {e}")
+            time.sleep(delay)
+            continue
+        breaker.record_success()
+        return result
+
+
+def retrying(service, policy=None):
+    """装饰器：被装饰函数的每次调用都经过 call_with_retry"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            return call_with_retry(service, func, *args, policy=policy, **kwargs)
+        return wrapper
+    return decorator
+
+
+def breaker_stats():
+    """所有已创建熔断器的状态"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.stats() for breaker in breakers}
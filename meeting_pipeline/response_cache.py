@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+可视化后台接口的响应缓存
+- 缓存键为 请求路径+查询参数，值为序列化后的JSON响应
+- 数据版本：worker 每次提交都在同一事务内把 data_version 加一；
+  版本号变化即失效，最多每 DASHBOARD_VERSION_CHECK_INTERVAL 秒查询一次
+- TTL 兜底：没有写入时也按 DASHBOARD_CACHE_TTL 刷新（"今日/本周"等随时间变化的统计）
+- 同一个键同时未命中时只计算一次，其余请求等待结果
+- 条件请求：ETag 由数据版本和日期生成，If-None-Match 匹配时直接返回304，不执行统计查询
+N 个页面轮询时，每个刷新周期只执行一组查询；数据未变的刷新只需一次数据版本查询和一个空响应。
+"""
+
+import os
+import threading
+import time
+from functools import wraps
+
+from dotenv import load_dotenv
+from flask import current_app, request
+
+# 加载环境变量
+load_dotenv()
+
+DASHBOARD_CACHE_TTL = float(os.getenv('DASHBOARD_CACHE_TTL', 30))                         # 响应最长缓存时间(秒)
+DASHBOARD_VERSION_CHECK_INTERVAL = float(os.getenv('DASHBOARD_VERSION_CHECK_INTERVAL', 2))  # 数据版本查询间隔(秒)
+
+
+class ResponseCache:
+    """按数据版本失效的TTL缓存
+
+    read_version 返回当前数据版本（读取失败返回 None，此时只按 TTL 失效）。
+    """
+
+    def __init__(self, read_version, ttl=None, version_check_interval=None):
+        self.read_version = read_version
+        self.ttl = DASHBOARD_CACHE_TTL if ttl is None else ttl
+        self.version_check_interval = (DASHBOARD_VERSION_CHECK_INTERVAL
+                                       if version_check_interval is None else version_check_interval)
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self._entries = {}
+        self._key_locks = {}  # key -> [锁, 等待/持有该锁的请求数]，计数归零即删除
+        self._lock = threading.Lock()
+        self._version = None
+        self._version_checked_at = 0.0
+        self._version_lock = threading.Lock()
+
+    def current_version(self):
+        """当前数据版本，间隔内复用上次查询结果（并发请求只查询一次）"""
+        with self._version_lock:
+            now = time.monotonic()
+            if now - self._version_checked_at >= self.version_check_interval:
+                try:
+                    self._version = self.read_version()
+                except Exception as e:
+                    print(f"⚠️ 读取数据版本失败: {e}")
+                    self._version = None
+                self._version_checked_at = now
+            return self._version
+
+    def _lookup(self, key, version):
+        entry = self._entries.get(key)
+        if entry and entry[0] == version and time.monotonic() < entry[1]:
+            return entry[2]
+        return None
+
+    def get_or_compute(self, key, compute):
+        """返回缓存值，未命中时调用 compute() 计算；compute 返回 None 表示不缓存"""
+        version = self.current_version()
+        with self._lock:
+            value = self._lookup(key, version)
+            if value is not None:
+                self.hits += 1
+                return value
+            key_lock = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            key_lock[1] += 1
+
+        try:
+            with key_lock[0]:
+                # 等锁期间其他请求可能已算好
+                with self._lock:
+                    value = self._lookup(key, version)
+                    if value is not None:
+                        self.hits += 1
+                        return value
+                    self.misses += 1
+                value = compute()
+                if value is not None:
+                    with self._lock:
+                        self._prune(version)
+                        self._entries[key] = (version, time.monotonic() + self.ttl, value)
+                return value
+        finally:
+            # 单飞结束后删除该键的锁，避免不同查询参数的锁无限累积
+            with self._lock:
+                key_lock[1] -= 1
+                if key_lock[1] == 0:
+                    del self._key_locks[key]
+
+    def _prune(self, version):
+        """删除已过期或数据版本已变化的条目（调用方持有 self._lock）"""
+        now = time.monotonic()
+        stale = [k for k, (v, expires_at, _) in self._entries.items() if v != version or now >= expires_at]
+        for k in stale:
+            del self._entries[k]
+
+    def invalidate(self):
+        """清空缓存，并在下次请求时重新读取数据版本"""
+        with self._lock:
+            self._entries.clear()
+        with self._version_lock:
+            self._version_checked_at = 0.0
+
+    @staticmethod
+    def etag_for(version):
+        """数据版本对应的 ETag；本地或UTC日期变化时"今日/本周"等统计也会变，一并计入"""
+        if version is None:
+            return None
+        return f"{version}-{time.strftime('%Y%m%d')}-{time.strftime('%Y%m%d', time.gmtime())}"
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'key_locks': len(self._key_locks),
+                    'hits': self.hits, 'misses': self.misses,
+                    'not_modified': self.not_modified}
+
+    def cached_view(self, view):
+        """Flask 视图装饰器：按 路径+查询参数 缓存 JSON 响应，带 error 字段的响应不缓存
+
+        成功的响应带 ETag，浏览器再次请求时 If-None-Match 与当前数据版本一致则返回304。
+        """
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag = self.etag_for(self.current_version())
+            if etag and request.if_none_match.contains(etag):
+                with self._lock:
+                    self.not_modified += 1
+                response = current_app.response_class(status=304)
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = 'no-cache'
+                return response
+
+            uncached = []
+
+            def compute():
+                response = current_app.make_response(view(*args, **kwargs))
+                payload = response.get_json(silent=True)
+                if response.status_code != 200 or (isinstance(payload, dict) and 'error' in payload):
+                    uncached.append(response)
+                    return None
+                return response.status_code, response.mimetype, response.get_data()
+
+            result = self.get_or_compute(request.full_path, compute)
+            if result is None:
+                return uncached[0]
+            status, mimetype, body = result
+            response = current_app.response_class(body, status=status, mimetype=mimetype)
+            if etag:
+                response.set_etag(etag)
+                # 浏览器每次都带 If-None-Match 重新验证
+                response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+媒体临时文件空间管理
+每条录制在 SCRATCH_DIR 下占用一个独立目录，开始下载前按预估大小预留磁盘额度，
+在途总量超过 SCRATCH_BUDGET_BYTES 时阻塞等待；阶段完成后立即删除产物并归还额度。
+启动时清理崩溃进程遗留的目录。
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+from dotenv import load_dotenv
+
+# 加载环境变量
+load_dotenv()
+
+# 临时空间配置
+SCRATCH_DIR = os.getenv('SCRATCH_DIR', os.path.join(os.getenv('CACHE_DIR', tempfile.gettempdir()), 'meeting_scratch'))
+SCRATCH_BUDGET_BYTES = int(os.getenv('SCRATCH_BUDGET_BYTES', 20 * 1024 ** 3))
+SCRATCH_ORPHAN_SECONDS = int(os.getenv('SCRATCH_ORPHAN_SECONDS', 24 * 3600))  # 超过此时长的目录视为遗留
+
+# 大小预估：16kHz 单声道 16bit WAV 每秒 32000 字节；MP4 码率按配置估算
+WAV_BYTES_PER_SECOND = 32000
+MP4_BYTES_PER_SECOND = int(os.getenv('SCRATCH_MP4_BYTES_PER_SECOND', 250000))
+
+
+def estimate_scratch_bytes(duration_seconds, with_video, file_size=None):
+    """预估一条录制处理过程中的峰值磁盘占用
+
+    WAV 按两倍计（分片转写时原文件和分片同时存在）；下载完整 MP4 时再加上视频大小。
+    """
+    duration_seconds = max(duration_seconds or 0, 60)
+    total = WAV_BYTES_PER_SECOND * duration_seconds * 2
+    if with_video:
+        total += int(file_size) if file_size else MP4_BYTES_PER_SECOND * duration_seconds
+    return total
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class ScratchReservation:
+    """一条录制的临时目录及其预留额度"""
+
+    def __init__(self, space, record_id, nbytes):
+        self.space = space
+        self.record_id = record_id
+        self.nbytes = nbytes
+        self.dir = os.path.join(space.root, f"{os.getpid()}-{record_id}")
+        os.makedirs(self.dir, exist_ok=True)
+        self._closed = False
+
+    def grow(self, nbytes):
+        """追加计入额度（如流式提取失败回退下载MP4）；不阻塞，超出预算时由新的 reserve 等待"""
+        self.space._take(self, nbytes)
+
+    def discard(self, path):
+        """阶段完成后删除产物，归还对应额度"""
+        if not path or not os.path.exists(path):
+            return
+        size = os.path.getsize(path)
+        os.remove(path)
+        self.space._give_back(self, min(size, self.nbytes))
+
+    def close(self):
+        """删除整个目录并归还剩余额度（可重复调用）"""
+        if self._closed:
+            return
+        self._closed = True
+        shutil.rmtree(self.dir, ignore_errors=True)
+        self.space._give_back(self, self.nbytes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ScratchSpace:
+    """带磁盘预算的临时空间"""
+
+    def __init__(self, root=None, budget_bytes=None):
+        self.root = root or SCRATCH_DIR
+        self.budget_bytes = budget_bytes or SCRATCH_BUDGET_BYTES
+        self.in_flight = 0
+        self._cond = threading.Condition()
+        os.makedirs(self.root, exist_ok=True)
+
+    def reserve(self, record_id, nbytes):
+        """预留额度并创建目录；额度不足时阻塞直到有空间释放
+
+        单条超过整个预算时，等到没有其他在途录制后放行，避免永久阻塞。
+        """
+        waited = False
+        with self._cond:
+            while self.in_flight and self.in_flight + nbytes > self.budget_bytes:
+                if not waited:
+                    print(f"⏳ 临时空间不足，等待释放（在途 {self.in_flight >> 20}MB，"
+                          f"需要 {nbytes >> 20}MB，预算 {self.budget_bytes >> 20}MB）")
+                    waited = True
+                self._cond.wait()
+            self.in_flight += nbytes
+        return ScratchReservation(self, record_id, nbytes)
+
+    def _take(self, reservation, nbytes):
+        with self._cond:
+            reservation.nbytes += nbytes
+            self.in_flight += nbytes
+
+    def _give_back(self, reservation, nbytes):
+        with self._cond:
+            reservation.nbytes -= nbytes
+            self.in_flight -= nbytes
+            self._cond.notify_all()
+
+    def sweep_orphans(self):
+        """删除崩溃进程遗留的目录（所属进程已不存在，或超过 SCRATCH_ORPHAN_SECONDS）"""
+        removed = 0
+        now = time.time()
+        for entry in os.scandir(self.root):
+            if not entry.is_dir():
+                continue
+            pid_part = entry.name.split('-', 1)[0]
+            pid = int(pid_part) if pid_part.isdigit() else None
+            if pid == os.getpid():
+                continue
+            stale = now - entry.stat().st_mtime > SCRATCH_ORPHAN_SECONDS
+            if pid is None or not _pid_alive(pid) or stale:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+        if removed:
+            print(f"🧹 清理遗留临时目录 {removed} 个")
+        return removed
+
+    def stats(self):
+        with self._cond:
+            return {'in_flight_bytes': self.in_flight, 'budget_bytes': self.budget_bytes}
+
+
+_default_space = None
+_default_lock = threading.Lock()
+
+
+def get_scratch_space():
+    """进程内共享的临时空间，首次获取时清理遗留目录"""
+    global _default_space
+    with _default_lock:
+        if _default_space is None:
+            _default_space = ScratchSpace()
+            _default_space.sweep_orphans()
+        return _default_space
@@ -20,43 +20,203 @@ CREATE TABLE IF NOT EXISTS recordings (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
     INDEX idx_meeting_id (meeting_id),
     INDEX idx_start_ts (start_ts),
-    INDEX idx_phase (phase)
+    INDEX idx_phase (phase),
+    INDEX idx_created_at (created_at)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='会议录制记录表';
 
+-- 已有库升级（可重复执行）：MySQL 8 的 ALTER TABLE 不支持 IF NOT EXISTS，
+-- 先查 information_schema，再用预处理语句执行，不需要时执行空语句 DO 0
+SET @sql = IF((SELECT COUNT(*) FROM information_schema.STATISTICS
+               WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'recordings' AND INDEX_NAME = 'idx_created_at') = 0,
+              'ALTER TABLE recordings ADD INDEX idx_created_at (created_at)', 'DO 0');
+PREPARE stmt FROM @sql; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+
 -- 学生统计表
 CREATE TABLE IF NOT EXISTS student_stats (
     student_id VARCHAR(64) PRIMARY KEY COMMENT '学生ID',
     record_cnt INT DEFAULT 0 COMMENT '录制次数',
+    total_duration BIGINT DEFAULT 0 COMMENT '累计会议时长(秒)',
+    last_record_at DATETIME COMMENT '最近一次会议开始时间',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
     INDEX idx_record_cnt (record_cnt)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='学生统计表';
 
+-- 已有库升级：补齐累计时长、最近会议时间两列（数值由文末的汇总重建填充）
+SET @sql = IF((SELECT COUNT(*) FROM information_schema.COLUMNS
+               WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'student_stats' AND COLUMN_NAME = 'total_duration') = 0,
+              'ALTER TABLE student_stats ADD COLUMN total_duration BIGINT DEFAULT 0 COMMENT ''累计会议时长(秒)'' AFTER record_cnt',
+              'DO 0');
+PREPARE stmt FROM @sql; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+
+SET @sql = IF((SELECT COUNT(*) FROM information_schema.COLUMNS
+               WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'student_stats' AND COLUMN_NAME = 'last_record_at') = 0,
+              'ALTER TABLE student_stats ADD COLUMN last_record_at DATETIME COMMENT ''最近一次会议开始时间'' AFTER total_duration',
+              'DO 0');
+PREPARE stmt FROM @sql; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+
+-- 已有库升级：旧表 processing_logs 改名为 process_logs（列 processing_time 改名为 process_time）
+-- 只有旧表时直接改名；新旧表都存在时（已按新脚本建过空表）把旧表数据复制过去，旧表改名为 processing_logs_migrated 保留
+SET @old_logs = (SELECT COUNT(*) FROM information_schema.TABLES
+                 WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'processing_logs');
+SET @new_logs = (SELECT COUNT(*) FROM information_schema.TABLES
+                 WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'process_logs');
+
+SET @sql = IF(@old_logs = 1 AND @new_logs = 0, 'RENAME TABLE processing_logs TO process_logs', 'DO 0');
+PREPARE stmt FROM @sql; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+
+SET @sql = IF(@old_logs = 1 AND @new_logs = 1,
+              'INSERT INTO process_logs (record_id, status, error_message, process_time, created_at)
+               SELECT record_id, status, error_message, processing_time, created_at FROM processing_logs',
+              'DO 0');
+PREPARE stmt FROM @sql; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+
+SET @sql = IF(@old_logs = 1 AND @new_logs = 1, 'RENAME TABLE processing_logs TO processing_logs_migrated', 'DO 0');
+PREPARE stmt FROM @sql; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+
+SET @sql = IF((SELECT COUNT(*) FROM information_schema.COLUMNS
+               WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'process_logs' AND COLUMN_NAME = 'processing_time') = 1,
+              'ALTER TABLE process_logs CHANGE processing_time process_time INT COMMENT ''处理耗时(秒)''',
+              'DO 0');
+PREPARE stmt FROM @sql; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+
 -- 处理日志表
-CREATE TABLE IF NOT EXISTS processing_logs (
+CREATE TABLE IF NOT EXISTS process_logs (
     id INT AUTO_INCREMENT PRIMARY KEY COMMENT '日志ID',
     record_id BIGINT NOT NULL COMMENT '记录ID',
     status ENUM('success','failed','processing') NOT NULL COMMENT '处理状态',
     error_message TEXT COMMENT '错误信息',
-    processing_time INT COMMENT '处理耗时(秒)',
+    process_time INT COMMENT '处理耗时(秒)',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
     INDEX idx_record_id (record_id),
     INDEX idx_status (status),
     INDEX idx_created_at (created_at)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='处理日志表';
 
+-- 按天×分类汇总表（写入 recordings 的同一事务内更新，看板直接读取）
+CREATE TABLE IF NOT EXISTS daily_phase_stats (
+    day DATE NOT NULL COMMENT '入库日期',
+    phase VARCHAR(32) NOT NULL COMMENT '会议阶段',
+    record_cnt INT NOT NULL DEFAULT 0 COMMENT '记录数',
+    PRIMARY KEY (day, phase)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='按天分类汇总表';
+
+-- 按天×处理状态汇总表
+CREATE TABLE IF NOT EXISTS daily_status_stats (
+    day DATE NOT NULL COMMENT '日志日期',
+    status VARCHAR(16) NOT NULL COMMENT '处理状态',
+    log_cnt INT NOT NULL DEFAULT 0 COMMENT '日志条数',
+    PRIMARY KEY (day, status)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='按天处理状态汇总表';
+
+-- 数据版本表（worker 每次写入 recordings 时在同一事务内加一，可视化后台据此让响应缓存失效）
+CREATE TABLE IF NOT EXISTS data_version (
+    name VARCHAR(64) PRIMARY KEY COMMENT '数据集名',
+    version BIGINT NOT NULL DEFAULT 0 COMMENT '版本号',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间'
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='数据版本表';
+
+-- LLM结果记忆表（键为 转写哈希+提示词版本+模型+temperature 的哈希）
+CREATE TABLE IF NOT EXISTS llm_memo (
+    memo_key CHAR(64) PRIMARY KEY COMMENT '记忆键',
+    result JSON NOT NULL COMMENT 'LLM结果',
+    model VARCHAR(64) NOT NULL COMMENT '模型',
+    prompt_version VARCHAR(32) NOT NULL COMMENT '提示词版本',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间'
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='LLM结果记忆表';
+
+-- 录制处理任务表（状态机：listed → address_resolved → downloaded → transcribed → summarized → stored / failed）
+CREATE TABLE IF NOT EXISTS record_jobs (
+    record_id BIGINT PRIMARY KEY COMMENT '会议录制ID',
+    record_info JSON NOT NULL COMMENT '列表接口返回的原始记录',
+    state ENUM('listed','address_resolved','downloaded','transcribed','summarized','stored','failed')
+        NOT NULL DEFAULT 'listed' COMMENT '任务状态',
+    resume_state VARCHAR(32) COMMENT '失败前所处状态，重试时从此继续',
+    payload JSON COMMENT '各阶段产出（下载地址、音频路径、转写、摘要等）',
+    attempts INT NOT NULL DEFAULT 0 COMMENT '失败次数',
+    last_error TEXT COMMENT '最近一次错误',
+    not_before DATETIME COMMENT '失败后最早可重试的时间',
+    claimed_by VARCHAR(64) COMMENT '领取者',
+    claimed_until DATETIME COMMENT '租约到期时间',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
+    INDEX idx_state_claim (state, claimed_until),
+    INDEX idx_state_record (state, record_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='录制处理任务表';
+
+-- 已有库升级：按状态内 record_id 顺序领取任务所需的索引
+SET @sql = IF((SELECT COUNT(*) FROM information_schema.STATISTICS
+               WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'record_jobs' AND INDEX_NAME = 'idx_state_record') = 0,
+              'ALTER TABLE record_jobs ADD INDEX idx_state_record (state, record_id)', 'DO 0');
+PREPARE stmt FROM @sql; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+
+-- 已有库升级：失败任务的退避时间
+SET @sql = IF((SELECT COUNT(*) FROM information_schema.COLUMNS
+               WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'record_jobs' AND COLUMN_NAME = 'not_before') = 0,
+              'ALTER TABLE record_jobs ADD COLUMN not_before DATETIME COMMENT ''失败后最早可重试的时间'' AFTER last_error',
+              'DO 0');
+PREPARE stmt FROM @sql; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+
+-- 列表进度表（时间范围和是否已列完）
+CREATE TABLE IF NOT EXISTS listing_cursors (
+    range_key VARCHAR(64) PRIMARY KEY COMMENT '列表任务标识',
+    start_time BIGINT NOT NULL COMMENT '开始时间戳',
+    end_time BIGINT NOT NULL COMMENT '结束时间戳',
+    done TINYINT NOT NULL DEFAULT 0 COMMENT '是否已列完',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间'
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='列表进度表';
+
+-- 已有库升级：列表改为一次并发列完，不再按页记录进度
+SET @sql = IF((SELECT COUNT(*) FROM information_schema.COLUMNS
+               WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'listing_cursors' AND COLUMN_NAME = 'next_page') = 1,
+              'ALTER TABLE listing_cursors DROP COLUMN next_page', 'DO 0');
+PREPARE stmt FROM @sql; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+
+-- 增量同步水位线表
+CREATE TABLE IF NOT EXISTS sync_state (
+    name VARCHAR(64) PRIMARY KEY COMMENT '同步任务名',
+    watermark BIGINT NOT NULL COMMENT '已成功同步到的时间戳',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间'
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='增量同步水位线表';
+
+-- 增量同步失败记录表（累计失败达到 INCREMENTAL_MAX_ATTEMPTS 次的录制不再阻塞水位线）
+CREATE TABLE IF NOT EXISTS sync_failures (
+    name VARCHAR(64) NOT NULL COMMENT '同步任务名',
+    record_id BIGINT NOT NULL COMMENT '会议录制ID',
+    attempts INT NOT NULL DEFAULT 0 COMMENT '累计失败次数',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
+    PRIMARY KEY (name, record_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='增量同步失败记录表';
+
 -- 插入示例数据（可选）
 INSERT IGNORE INTO recordings (id, meeting_id, start_ts, end_ts, student_ids, phase, transcript, summary, play_url, download_url) VALUES
 (1001, 'meeting_001', '2025-01-15 10:00:00', '2025-01-15 11:00:00', '["student_001", "student_002"]', '面试模拟', '这是一次面试模拟会议，讨论了候选人的技术背景...', '面试模拟会议，主要讨论了技术栈和项目经验', 'https://example.com/play/1001', 'https://example.com/download/1001'),
 (1002, 'meeting_002', '2025-01-16 14:00:00', '2025-01-16 15:30:00', '["student_003"]', '简历优化', '简历优化会议，帮助候选人完善简历内容...', '简历优化指导，重点改进了项目描述部分', 'https://example.com/play/1002', 'https://example.com/download/1002');
 
-INSERT IGNORE INTO student_stats (student_id, record_cnt) VALUES
-('student_001', 1),
-('student_002', 1),
-('student_003', 1);
+INSERT IGNORE INTO student_stats (student_id, record_cnt, total_duration, last_record_at) VALUES
+('student_001', 1, 3600, '2025-01-15 10:00:00'),
+('student_002', 1, 3600, '2025-01-15 10:00:00'),
+('student_003', 1, 5400, '2025-01-16 14:00:00');
+
+-- 由明细重建汇总表（首次部署或升级后执行；可重复执行，执行期间应暂停写入）
+-- 已有库升级后新增的 total_duration、last_record_at 也在这里按明细补齐
+REPLACE INTO daily_phase_stats (day, phase, record_cnt)
+SELECT DATE(created_at), phase, COUNT(*) FROM recordings GROUP BY DATE(created_at), phase;
+
+REPLACE INTO daily_status_stats (day, status, log_cnt)
+SELECT DATE(created_at), status, COUNT(*) FROM process_logs GROUP BY DATE(created_at), status;
+
+REPLACE INTO student_stats (student_id, record_cnt, total_duration, last_record_at)
+SELECT s.student_id, COUNT(*), SUM(TIMESTAMPDIFF(SECOND, r.start_ts, r.end_ts)), MAX(r.start_ts)
+FROM recordings r,
+     JSON_TABLE(r.student_ids, '$[*]' COLUMNS (student_id VARCHAR(64) PATH '$')) s
+GROUP BY s.student_id;
 
 -- 显示表结构
 SHOW TABLES;
 DESCRIBE recordings;
 DESCRIBE student_stats;
-DESCRIBE processing_logs; 
\ No newline at end of file
+DESCRIBE process_logs;
+DESCRIBE daily_phase_stats;
+DESCRIBE daily_status_stats;
+DESCRIBE data_version;
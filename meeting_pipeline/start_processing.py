@@ -14,7 +14,7 @@ from loguru import logger
 # 添加项目路径
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from record_worker import RecordProcessor
+from record_worker import run_queue_processing
 
 # 加载环境变量
 load_dotenv()
@@ -40,11 +40,10 @@ def main():
     logger.info(f"时间戳范围: {start_ts} 到 {end_ts}")
     
     try:
-        # 创建处理器
-        processor = RecordProcessor()
-        
-        # 开始批量处理
-        processor.run_batch(start_ts, end_ts)
+        # 基于持久化任务队列处理；中断后重新运行会沿用首次的结束时间，
+        # 从未列完的页和未完成的任务继续
+        run_queue_processing(start_ts, end_ts, range_key=f"backfill-{start_date.strftime('%Y%m%d')}",
+                             force="--force" in sys.argv)
         
         logger.info("会议记录处理完成")
         
@@ -10,7 +10,7 @@ import random
 import hmac
 import hashlib
 import base64
-import requests
+import http_client
 import json
 
 # 最新重置的密钥配置
@@ -76,7 +76,7 @@ def list_records(start_time, end_time, page=1, page_size=50):
     headers = generate_signature("GET", uri)
     
     try:
-        response = requests.get(
+        response = http_client.get(
             API_BASE + uri,
             headers=headers,
             timeout=10
@@ -108,7 +108,7 @@ def get_record_address(meeting_record_id):
     headers = generate_signature("GET", uri)
     
     try:
-        response = requests.get(
+        response = http_client.get(
             API_BASE + uri,
             headers=headers,
             timeout=10
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+腾讯会议API签名客户端（时钟偏差补偿）
+本机时钟漂移时 X-TC-Timestamp 超出服务端允许范围，每次请求都会被 200003 拒绝。
+首次签名前从服务端响应的 Date 头测量时间偏差，之后的时间戳都加上偏差；
+请求仍因签名/时间被拒时重新测量，由调用方重试一次。
+HMAC 密钥对象只创建一次，每次签名 copy() 后使用。
+"""
+
+import base64
+import hashlib
+import hmac
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import http_client
+
+# 签名错误码（时间戳超出范围也返回此码）
+SIGNATURE_ERROR_CODE = "200003"
+
+
+class SigningClient:
+    """带时钟偏差补偿的签名器
+
+    offset 为 服务端时间 - 本机时间（秒），由 sync() 测量。
+    """
+
+    def __init__(self, app_id, sdk_id, secret_id, secret_key, api_base):
+        self.app_id = app_id
+        self.sdk_id = sdk_id
+        self.secret_id = secret_id
+        self.api_base = api_base
+        self.offset = 0.0
+        self.synced = False
+        self.resyncs = 0
+        self._hmac = hmac.new(secret_key.encode(), digestmod=hashlib.sha256)
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+    def sync(self):
+        """请求一次服务端，按 Date 头测量时间偏差；失败时沿用原偏差"""
+        try:
+            started = time.time()
+            response = http_client.get(self.api_base, timeout=5)
+            finished = time.time()
+            server_time = parsedate_to_datetime(response.headers['Date']).timestamp()
+        except Exception as e:
+            print(f"⚠️ 腾讯会议服务端时间同步失败，使用本机时间: {e}")
+            with self._lock:
+                self.synced = True
+            return self.offset
+
+        # Date 精确到秒，以请求往返的中点作为对应的本机时间
+        offset = server_time - (started + finished) / 2
+        with self._lock:
+            self.offset = offset
+            self.synced = True
+        if abs(offset) >= 5:
+            print(f"🕒 本机时钟与腾讯会议服务端相差 {offset:+.1f} 秒，签名时已补偿")
+        return offset
+
+    def ensure_synced(self):
+        """首次签名前测量一次（并发调用时只测量一次）"""
+        if self.synced:
+            return
+        with self._sync_lock:
+            if not self.synced:
+                self.sync()
+
+    def resync(self):
+        """签名被拒后重新测量偏差"""
+        with self._lock:
+            self.resyncs += 1
+        return self.sync()
+
+    def sign(self, method, uri, body=""):
+        """生成带签名的请求头"""
+        self.ensure_synced()
+        ts = str(int(time.time() + self.offset))
+        # 并发请求可能落在同一毫秒，nonce 用随机数避免重复
+        nonce = str(random.randint(100000, 99999999))
+
+        # 按ASCII升序排列所有参与签名的header
+        hl_items = [
+            ("SdkId", self.sdk_id),
+            ("X-TC-Key", self.secret_id),
+            ("X-TC-Nonce", nonce),
+            ("X-TC-Timestamp", ts)
+        ]
+        hl = "&".join(f"{k}={v}" for k, v in hl_items)
+
+        sts = f"{method}\n{hl}\n{uri}\n{body}"
+        mac = self._hmac.copy()
+        mac.update(sts.encode())
+        signature = base64.b64encode(mac.digest()).decode()
+
+        return {
+            "AppId": self.app_id,
+            "SdkId": self.sdk_id,
+            "X-TC-Key": self.secret_id,
+            "X-TC-Nonce": nonce,
+            "X-TC-Timestamp": ts,
+            "X-TC-Signature": signature,
+            "Content-Type": "application/json"
+        }
+
+    @staticmethod
+    def is_signature_rejection(status_code, text):
+        """是否为签名/时间戳被拒（HTTP 4xx 且错误码 200003）"""
+        return 400 <= status_code < 500 and SIGNATURE_ERROR_CODE in (text or "")
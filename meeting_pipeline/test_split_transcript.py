@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+split_transcript 单元测试
+可用 pytest 运行，也可直接 python test_split_transcript.py
+"""
+
+from record_worker import split_transcript
+from token_estimator import estimate_tokens
+
+
+def _assert_order_kept(transcript, chunks):
+    """各段首尾相接后与原文逐字一致（切分只发生在行间或超长行内部）"""
+    assert "".join(chunk.replace("\n", "") for chunk in chunks) == transcript.replace("\n", "")
+
+
+def test_short_transcript_single_chunk():
+    transcript = "第一行\n第二行\n第三行"
+    assert split_transcript(transcript, 1000) == [transcript]
+
+
+def test_lines_grouped_within_limit():
+    lines = [f"第{i}行：" + "讨论项目经历" * 5 for i in range(40)]
+    transcript = "\n".join(lines)
+    chunks = split_transcript(transcript, 120)
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 120 for chunk in chunks)
+    assert "\n".join(chunks) == transcript
+
+
+def test_oversize_line_after_buffered_lines_keeps_order():
+    # 超长行之前缓冲的行必须先输出，不能排到超长行的切片后面
+    lines = ["一" * 30, "二" * 30, "三" * 200, "四" * 30]
+    transcript = "\n".join(lines)
+    chunks = split_transcript(transcript, 100)
+    _assert_order_kept(transcript, chunks)
+    assert chunks[0].startswith("一")
+    assert chunks[-1].endswith("四" * 30)
+
+
+def test_oversize_lines_back_to_back():
+    lines = ["三" * 250, "三" * 250, "一" * 10, "二" * 10]
+    transcript = "\n".join(lines)
+    chunks = split_transcript(transcript, 100)
+    _assert_order_kept(transcript, chunks)
+    assert all(len(chunk) <= 100 + chunk.count("\n") for chunk in chunks)
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"✅ {name}")
@@ -16,7 +16,9 @@ from loguru import logger
 # 添加项目路径
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from record_worker import TokenManager, MeetingAPI, KimiProcessor, DatabaseManager
+import asyncio
+from record_worker import TokenManager, KimiProcessor, DatabaseManager
+from meeting_api import MeetingAPI
 
 # 加载环境变量
 load_dotenv()
@@ -41,22 +43,26 @@ def test_token_manager():
 def test_meeting_api():
     """测试腾讯会议API"""
     print("📞 测试腾讯会议API...")
+    
+    async def _run():
+        async with MeetingAPI() as api:
+            # 测试获取记录列表
+            end_time = int(datetime.now().timestamp())
+            start_time = end_time - 86400  # 24小时前
+            
+            records, total_pages = await api.list_records(start_time, end_time, page=1, page_size=10)
+            print(f"✅ API连接成功，获取到 {len(records)} 条记录")
+            
+            if records:
+                # 测试并发获取记录地址
+                record_ids = [r['meeting_record_id'] for r in records]
+                started = time.time()
+                addresses = await api.get_record_addresses(record_ids)
+                ok = sum(1 for v in addresses.values() if v)
+                print(f"✅ 记录地址获取成功: {ok}/{len(record_ids)}，耗时 {time.time() - started:.2f}s")
+    
     try:
-        api = MeetingAPI()
-        
-        # 测试获取记录列表
-        end_time = int(datetime.now().timestamp())
-        start_time = end_time - 86400  # 24小时前
-        
-        records, total_pages = api.list_records(start_time, end_time, page=1, page_size=10)
-        print(f"✅ API连接成功，获取到 {len(records)} 条记录")
-        
-        if records:
-            # 测试获取记录地址
-            record_id = records[0]['meeting_record_id']
-            address_data = api.get_record_address(record_id)
-            print(f"✅ 记录地址获取成功: {record_id}")
-        
+        asyncio.run(_run())
         return True
     except Exception as e:
         print(f"❌ API测试失败: {e}")
@@ -69,9 +75,8 @@ def test_database():
     try:
         db_manager = DatabaseManager()
         
-        # 测试连接
-        import pymysql
-        conn = pymysql.connect(**db_manager.config)
+        # 测试连接（从连接池借出）
+        conn = db_manager.connect()
         cursor = conn.cursor()
         
         # 测试查询
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地token数估算（中英混合转写）
+按字符类别计数后线性加权：汉字、中文标点、英文字母、英文单词数、数字、空白、英文标点、其他。
+批量估算把多段文本拼成一个码点数组，用 numpy 一次完成分类和按文本计数。
+权重可用真实调用的 usage.prompt_tokens 校准（见 benchmark_token_estimator.py）。
+"""
+
+import json
+import os
+import threading
+
+import numpy as np
+from dotenv import load_dotenv
+
+# 加载环境变量
+load_dotenv()
+
+# 校准后的权重文件；真实调用的token用量记录（为空则不记录）
+TOKEN_WEIGHTS_FILE = os.getenv('TOKEN_WEIGHTS_FILE', os.path.join(os.getenv('CACHE_DIR', '/tmp'), 'token_weights.json'))
+TOKEN_USAGE_LOG = os.getenv('TOKEN_USAGE_LOG', '')
+
+# 字符类别（顺序即特征顺序），words 为英文单词个数，base 为每次调用的固定开销
+FEATURES = ['han', 'cjk_punct', 'alpha', 'words', 'digit', 'space', 'ascii_punct', 'other', 'base']
+
+# 未校准时的默认权重（每个字符/单词对应的token数）
+DEFAULT_WEIGHTS = {
+    'han': 0.6,
+    'cjk_punct': 1.0,
+    'alpha': 0.18,
+    'words': 0.35,
+    'digit': 0.5,
+    'space': 0.05,
+    'ascii_punct': 0.6,
+    'other': 1.0,
+    'base': 0.0,
+}
+
+_HAN, _CJK_PUNCT, _ALPHA, _DIGIT, _SPACE, _ASCII_PUNCT, _OTHER = range(7)
+_NUM_CLASSES = 7
+
+
+def _build_class_table():
+    """基本多文种平面（BMP）码点 → 类别的查找表"""
+    table = np.full(0x10000, _OTHER, dtype=np.uint8)
+    table[0x3400:0x4DC0] = _HAN      # 扩展A
+    table[0x4E00:0xA000] = _HAN      # 基本汉字
+    table[0xF900:0xFB00] = _HAN      # 兼容汉字
+    table[0x3000:0x3040] = _CJK_PUNCT
+    table[0xFF00:0xFFF0] = _CJK_PUNCT  # 全角符号
+    table[0x21:0x7F] = _ASCII_PUNCT
+    table[ord('0'):ord('9') + 1] = _DIGIT
+    table[ord('A'):ord('Z') + 1] = _ALPHA
+    table[ord('a'):ord('z') + 1] = _ALPHA
+    for ch in ' \t\r\n\x0b\x0c':
+        table[ord(ch)] = _SPACE
+    return table
+
+
+_CLASS_TABLE = _build_class_table()
+
+
+def count_features_batch(texts):
+    """返回 (len(texts), len(FEATURES)) 的特征计数矩阵"""
+    n = len(texts)
+    lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=n)
+    counts = np.zeros((n, len(FEATURES)), dtype=np.float64)
+    counts[:, FEATURES.index('base')] = 1.0
+    total = int(lengths.sum())
+    if total == 0:
+        return counts
+
+    codepoints = np.frombuffer(''.join(texts).encode('utf-32-le'), dtype=np.uint32)
+    classes = _CLASS_TABLE[np.minimum(codepoints, 0xFFFF)]
+    # 补充平面：扩展B及以后的汉字，其余归为其他
+    astral = codepoints > 0xFFFF
+    if astral.any():
+        classes = classes.copy()
+        classes[astral] = np.where(
+            (codepoints[astral] >= 0x20000) & (codepoints[astral] < 0x30000), _HAN, _OTHER
+        )
+
+    text_index = np.repeat(np.arange(n), lengths)
+    per_class = np.bincount(
+        text_index * _NUM_CLASSES + classes, minlength=n * _NUM_CLASSES
+    ).reshape(n, _NUM_CLASSES)
+
+    # 英文单词数：前一个字符不是字母（或是文本开头）的字母
+    alpha = classes == _ALPHA
+    word_start = alpha.copy()
+    word_start[1:] &= ~alpha[:-1]
+    starts = np.cumsum(lengths) - lengths
+    word_start[starts[lengths > 0]] = alpha[starts[lengths > 0]]
+    words = np.bincount(text_index[word_start], minlength=n)
+
+    counts[:, FEATURES.index('han')] = per_class[:, _HAN]
+    counts[:, FEATURES.index('cjk_punct')] = per_class[:, _CJK_PUNCT]
+    counts[:, FEATURES.index('alpha')] = per_class[:, _ALPHA]
+    counts[:, FEATURES.index('words')] = words
+    counts[:, FEATURES.index('digit')] = per_class[:, _DIGIT]
+    counts[:, FEATURES.index('space')] = per_class[:, _SPACE]
+    counts[:, FEATURES.index('ascii_punct')] = per_class[:, _ASCII_PUNCT]
+    counts[:, FEATURES.index('other')] = per_class[:, _OTHER]
+    return counts
+
+
+_weights = None
+_weights_lock = threading.Lock()
+
+
+def load_weights(path=None):
+    """读取校准权重，文件不存在时使用默认权重"""
+    path = path or TOKEN_WEIGHTS_FILE
+    weights = dict(DEFAULT_WEIGHTS)
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            weights.update(json.load(f))
+    return weights
+
+
+def get_weights():
+    """进程内共享的权重（首次使用时加载）"""
+    global _weights
+    with _weights_lock:
+        if _weights is None:
+            _weights = load_weights()
+        return _weights
+
+
+def _weight_vector(weights):
+    return np.array([weights[name] for name in FEATURES], dtype=np.float64)
+
+
+def estimate_tokens_batch(texts, weights=None):
+    """批量估算token数，返回与 texts 等长的 int 数组（向上取整）"""
+    if not texts:
+        return np.zeros(0, dtype=np.int64)
+    vector = _weight_vector(weights or get_weights())
+    return np.ceil(count_features_batch(texts) @ vector).astype(np.int64)
+
+
+def estimate_tokens(text, weights=None):
+    """估算单段文本的token数"""
+    return int(estimate_tokens_batch([text], weights)[0])
+
+
+def fit_weights(features, actual):
+    """按真实token数最小二乘拟合权重
+
+    拟合出负值的特征权重置0后对其余特征重新拟合；样本中没出现过的特征保持默认权重。
+    """
+    features = np.asarray(features, dtype=np.float64)
+    actual = np.asarray(actual, dtype=np.float64)
+    seen = features.any(axis=0)
+    active = seen.copy()
+    solution = np.zeros(features.shape[1])
+    while active.any():
+        coef, *_ = np.linalg.lstsq(features[:, active], actual, rcond=None)
+        if (coef >= 0).all():
+            solution[active] = coef
+            break
+        active[np.flatnonzero(active)[coef < 0]] = False
+    solution[~seen] = _weight_vector(DEFAULT_WEIGHTS)[~seen]
+    return {name: round(float(value), 6) for name, value in zip(FEATURES, solution)}
+
+
+def save_weights(weights, path=None):
+    path = path or TOKEN_WEIGHTS_FILE
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(weights, f, ensure_ascii=False, indent=2)
+
+
+_usage_lock = threading.Lock()
+
+
+def log_usage(text, prompt_tokens, model):
+    """记录一次真实调用的特征计数和 usage.prompt_tokens，供校准使用（TOKEN_USAGE_LOG 为空时不记录）"""
+    if not TOKEN_USAGE_LOG or prompt_tokens is None:
+        return
+    try:
+        features = count_features_batch([text])[0]
+        line = json.dumps({
+            'model': model,
+            'features': dict(zip(FEATURES, features.tolist())),
+            'estimated': estimate_tokens(text),
+            'prompt_tokens': int(prompt_tokens),
+        }, ensure_ascii=False)
+        with _usage_lock:
+            with open(TOKEN_USAGE_LOG, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+    except Exception as e:
+        print(f"⚠️ 记录token用量失败: {e}")
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ASR转写结果磁盘缓存
+以提取后音频内容的哈希（加ASR模型/版本）为键，重复处理同一录制时不再重复转写。
+按文件最近访问时间做LRU淘汰，总大小不超过上限。
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from dotenv import load_dotenv
+
+# 加载环境变量
+load_dotenv()
+
+# 缓存配置
+CACHE_DIR = os.getenv('CACHE_DIR', '/tmp')
+ASR_CACHE_MAX_BYTES = int(os.getenv('ASR_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+
+
+class TranscriptCache:
+    """内容寻址的转写缓存
+
+    每条缓存是 <cache_dir>/asr_transcripts/<key>.txt，命中时更新文件 mtime，
+    写入后总大小超过 max_bytes 则从最久未访问的开始删除。
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=None):
+        self.cache_dir = os.path.join(cache_dir or CACHE_DIR, 'asr_transcripts')
+        self.max_bytes = max_bytes or ASR_CACHE_MAX_BYTES
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(audio_path, model, version):
+        """音频内容 + 模型 + 版本的 SHA-256"""
+        digest = hashlib.sha256()
+        with open(audio_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        digest.update(f"\0{model}\0{version}".encode())
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.txt")
+
+    def get(self, key):
+        """读取缓存，未命中返回None"""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                text = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return text
+
+    def put(self, key, text):
+        """写入缓存（先写临时文件再原子替换），然后按大小淘汰"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, self._path(key))
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.cache_dir):
+                if not entry.name.endswith('.txt'):
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+            if total <= self.max_bytes:
+                return
+            for _, size, path in sorted(entries):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+                total -= size
+                self.evictions += 1
+                if total <= self.max_bytes:
+                    break
+
+    def stats(self):
+        """命中/未命中/淘汰计数及命中率"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_transcript_cache():
+    """进程内共享的默认缓存实例"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = TranscriptCache()
+        return _default_cache